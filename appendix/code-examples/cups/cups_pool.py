@@ -0,0 +1,143 @@
+"""CUPS Connection Pool
+
+Process-wide pool of ``cups.Connection`` objects shared by the workers,
+the Flask API and CUPSPrinterManager, so a print does not pay the connect
+and authentication cost again. A connection is used by one thread at a
+time, checked with a cheap IPP request after sitting idle for
+HEALTH_INTERVAL seconds, and dropped and replaced after any error.
+
+Connections are not shared across a fork; a forked child starts with an
+empty pool. RQ's default worker forks for every job, so run the workers
+with ``--worker-class rq.SimpleWorker`` to keep connections between jobs.
+
+Pool counters (connects, reuses, reconnects, connect time) are added to
+each job hash as ``cups_*`` fields and to the ``cups:pool:stats`` totals.
+A job's usage is counted in a context variable set by ``track_job()``, so
+jobs running side by side in the asyncio worker (whose CUPS calls run in
+``asyncio.to_thread`` with a copy of the task's context) count only their
+own connections.
+
+Source: components/cups-printer.md - Example 112
+"""
+
+import os
+import time
+import threading
+import logging
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import cups
+
+_logger = logging.getLogger(__name__)
+
+POOL_SIZE = 4  # idle connections kept per process
+HEALTH_INTERVAL = 30  # seconds idle before a connection is checked
+STATS_KEY = 'cups:pool:stats'
+
+_job_usage = ContextVar('cups_job_usage', default=None)
+
+
+class CUPSConnectionPool:
+    """Reusable CUPS connections with health checks and reconnect on error"""
+    
+    def __init__(self, size=POOL_SIZE, connect=cups.Connection, health_interval=HEALTH_INTERVAL):
+        self.size = size
+        self.connect = connect
+        self.health_interval = health_interval
+        self.stats = Counter()
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it is discarded if the block raises"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            # The connection may be half way through a request; start fresh
+            self._count('reconnects')
+            raise
+        else:
+            self.release(conn)
+    
+    def acquire(self):
+        """Take an idle healthy connection, or open a new one"""
+        while True:
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Inherited sockets belong to the parent process
+                    self._idle.clear()
+                    self._pid = os.getpid()
+                if not self._idle:
+                    break
+                conn, idle_since = self._idle.pop()
+            
+            if time.monotonic() - idle_since < self.health_interval or self._healthy(conn):
+                self._count('reuses')
+                return conn
+        
+        started = time.perf_counter()
+        conn = self.connect()
+        self._count('connects')
+        self._count('connect_ms', (time.perf_counter() - started) * 1000)
+        return conn
+    
+    def release(self, conn):
+        """Return a connection for reuse, dropping it if the pool is full"""
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+    
+    def clear(self):
+        """Drop every idle connection"""
+        with self._lock:
+            self._idle.clear()
+    
+    def snapshot(self):
+        """Copy of the pool counters, to measure one job against"""
+        with self._lock:
+            return dict(self.stats)
+    
+    def track_job(self):
+        """Count pool usage of the current context for one job; returns the counter"""
+        usage = Counter()
+        _job_usage.set(usage)
+        return usage
+    
+    def record_job(self, redis_conn, job_id, usage):
+        """Add a job's pool usage (from ``track_job``) to the job hash and the totals"""
+        usage = {key: value for key, value in usage.items() if value}
+        if not usage:
+            return
+        
+        pipe = redis_conn.pipeline(transaction=False)
+        for key, value in usage.items():
+            pipe.hincrbyfloat(STATS_KEY, key, value)
+        pipe.hset(f"job:{job_id}", mapping={
+            f"cups_{key}": round(value, 1) for key, value in usage.items()
+        })
+        pipe.execute()
+    
+    def _healthy(self, conn):
+        self._count('health_checks')
+        try:
+            conn.getDefault()
+            return True
+        except (cups.IPPError, cups.HTTPError, RuntimeError) as e:
+            _logger.info(f"Dropping stale CUPS connection: {e}")
+            self._count('reconnects')
+            return False
+    
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+            usage = _job_usage.get()
+            if usage is not None:
+                usage[key] += value
+
+
+cups_pool = CUPSConnectionPool()
\ No newline at end of file
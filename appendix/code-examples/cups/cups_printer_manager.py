@@ -3,21 +3,48 @@
 Complete Python class for managing CUPS printers including listing, status checks,
 and raw ZPL printing.
 
+CUPS connections come from the process-wide pool in cups_pool.py.
+
+Raw ZPL is streamed straight into the IPP request (createJob, startDocument,
+writeRequestData, finishDocument) without touching the disk. The temp file +
+printFile path is kept as a fallback for older pycups builds, and for a
+stream that breaks before its document is finished: the half-written job
+is cancelled and never prints, so spooling the ZPL cannot print it twice.
+A failed finishDocument is raised instead.
+
+Each submission is timed into the ``cups_submit_seconds`` histogram (see
+print_metrics.py).
+
 Source: components/cups-printer.md - Example 74
 """
 
 import cups
 import tempfile
 import os
+import time
+import logging
+
+from cups_pool import cups_pool
+from print_metrics import metrics
+
+_logger = logging.getLogger(__name__)
+
+WRITE_BLOCK_SIZE = 64 * 1024
+
+
+class PrintError(Exception):
+    """Raised when CUPS did not accept a print job"""
 
 
 class CUPSPrinterManager:
-    def __init__(self):
-        self.conn = cups.Connection()
+    def __init__(self, pool=cups_pool):
+        # Connections are borrowed per call from the process-wide pool
+        self.pool = pool
     
     def list_printers(self):
         """Get all configured printers"""
-        printers = self.conn.getPrinters()
+        with self.pool.connection() as conn:
+            printers = conn.getPrinters()
         return [
             {
                 'name': name,
@@ -30,7 +57,8 @@ class CUPSPrinterManager:
     def get_printer_status(self, printer_name):
         """Check if printer is online and accepting jobs"""
         try:
-            attrs = self.conn.getPrinterAttributes(printer_name)
+            with self.pool.connection() as conn:
+                attrs = conn.getPrinterAttributes(printer_name)
             state = attrs.get('printer-state', 0)
             
             # State codes: 3=idle, 4=processing, 5=stopped
@@ -46,38 +74,22 @@ class CUPSPrinterManager:
         except cups.IPPError as e:
             return f'error: {e}'
     
-    def print_raw_zpl(self, printer_name, zpl_code, job_title="Label"):
+    def print_raw_zpl(self, printer_name, zpl_code, job_title="Label", stream=True):
         """Send raw ZPL to printer"""
-        # Create temporary file with ZPL
-        with tempfile.NamedTemporaryFile(
-            mode='w',
-            suffix='.zpl',
-            delete=False
-        ) as f:
-            f.write(zpl_code)
-            temp_path = f.name
-        
         try:
-            # Submit print job
-            job_id = self.conn.printFile(
-                printer_name,
-                temp_path,
-                job_title,
-                {'raw': 'true'}  # Important: disable all processing
-            )
-            return job_id
-            
-        except cups.IPPError as e:
-            raise Exception(f"Print failed: {e}")
+            # Streamed from memory; stream=False uses a temp file instead
+            with self.pool.connection() as conn:
+                return submit_raw_zpl(conn, printer_name, zpl_code, job_title, stream)
             
-        finally:
-            # Clean up temp file
-            os.unlink(temp_path)
+        except (cups.IPPError, cups.HTTPError, RuntimeError) as e:
+            # RuntimeError: pycups could not reach the CUPS server
+            raise PrintError(f"Print failed: {e}") from e
     
     def cancel_job(self, printer_name, job_id):
         """Cancel a print job"""
         try:
-            self.conn.cancelJob(job_id)
+            with self.pool.connection() as conn:
+                conn.cancelJob(job_id)
             return True
         except cups.IPPError:
             return False
@@ -85,11 +97,103 @@ class CUPSPrinterManager:
     def get_jobs(self, printer_name):
         """Get current jobs in printer queue"""
         try:
-            jobs = self.conn.getJobs(
-                which_jobs='not-completed',
-                my_jobs=False,
-                requested_attributes=['job-id', 'job-name', 'job-state']
-            )
+            with self.pool.connection() as conn:
+                jobs = conn.getJobs(
+                    which_jobs='not-completed',
+                    my_jobs=False,
+                    requested_attributes=['job-id', 'job-name', 'job-state']
+                )
             return jobs
         except cups.IPPError:
-            return {}
\ No newline at end of file
+            return {}
+
+
+def submit_raw_zpl(conn, printer_name, zpl_code, job_title="Label", stream=True):
+    """Submit ZPL as one raw CUPS job and return the CUPS job ID"""
+    started = time.perf_counter()
+    mode, job_id = 'stream', None
+    if stream and hasattr(conn, 'createJob'):
+        job_id = _stream_raw_zpl(conn, printer_name, zpl_code, job_title)
+    if job_id is None:
+        mode = 'spool'
+        job_id = _spool_raw_zpl(conn, printer_name, zpl_code, job_title)
+    
+    metrics.observe(
+        'cups_submit_seconds', time.perf_counter() - started, printer=printer_name, mode=mode
+    )
+    return job_id
+
+
+def _stream_raw_zpl(conn, printer_name, zpl_code, job_title):
+    """Write ZPL bytes directly into the IPP request, no temp file
+    
+    Returns None if the stream broke before the document was finished, so
+    the caller spools the ZPL instead.
+    """
+    data = zpl_code.encode('utf-8')
+    try:
+        job_id = conn.createJob(printer_name, job_title, {'raw': 'true'})
+    except cups.IPPError as e:
+        _logger.warning(f"Streaming to {printer_name} failed, spooling instead: {e}")
+        return None
+    
+    try:
+        status = conn.startDocument(
+            printer_name, job_id, job_title, cups.CUPS_FORMAT_RAW, 1
+        )
+        if status != cups.HTTP_CONTINUE:
+            raise cups.IPPError(status, 'startDocument failed')
+        
+        for offset in range(0, len(data), WRITE_BLOCK_SIZE):
+            block = data[offset:offset + WRITE_BLOCK_SIZE]
+            status = conn.writeRequestData(block, len(block))
+            if status != cups.HTTP_CONTINUE:
+                raise cups.IPPError(status, 'writeRequestData failed')
+    
+    except cups.IPPError as e:
+        # The unfinished job never prints, so spooling can't print it twice
+        _cancel_job(conn, job_id)
+        _logger.warning(f"Streaming to {printer_name} failed, spooling instead: {e}")
+        return None
+    
+    try:
+        status = conn.finishDocument(printer_name)
+        if status >= cups.IPP_BAD_REQUEST:
+            raise cups.IPPError(status, 'finishDocument failed')
+    except cups.IPPError:
+        # Don't leave a half-written job held in the queue
+        _cancel_job(conn, job_id)
+        raise
+    
+    return job_id
+
+
+def _cancel_job(conn, job_id):
+    try:
+        conn.cancelJob(job_id)
+    except cups.IPPError:
+        pass
+
+
+def _spool_raw_zpl(conn, printer_name, zpl_code, job_title):
+    """Fallback: write ZPL to a temp file and submit it with printFile"""
+    # Create temporary file with ZPL
+    with tempfile.NamedTemporaryFile(
+        mode='w',
+        suffix='.zpl',
+        delete=False
+    ) as f:
+        f.write(zpl_code)
+        temp_path = f.name
+    
+    try:
+        return conn.printFile(
+            printer_name,
+            temp_path,
+            job_title,
+            {'raw': 'true'}  # Important: disable all processing
+        )
+    
+    finally:
+        # Clean up temp file
+        os.unlink(temp_path)
\ No newline at end of file
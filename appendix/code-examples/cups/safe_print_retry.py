@@ -1,37 +1,40 @@
 """Safe Print with Automatic Retry
 
 Prints with automatic retry logic and exponential backoff for error recovery.
+The printer status comes from the shared status cache (printer_status.py);
+a failed attempt refreshes it before the next one. Only submissions CUPS
+refused are retried; any other error is raised at once.
 
 Source: components/cups-printer.md - Example 75
 """
 
-import cups
 import time
 
+from cups_printer_manager import CUPSPrinterManager, PrintError
+from printer_status import status_cache
 
-def safe_print(printer_name, zpl_code, max_retries=3):
+
+def safe_print(printer_name, zpl_code, max_retries=3, manager=None):
     """Print with automatic retry on failure"""
-    manager = CUPSPrinterManager()
+    # Connections come from the process-wide pool, not one per call
+    manager = manager or CUPSPrinterManager()
     
     for attempt in range(max_retries):
-        try:
-            # Check printer status first
-            status = manager.get_printer_status(printer_name)
-            if status == 'stopped':
-                raise Exception("Printer is stopped/offline")
+        # Check printer status first (cached, refreshed by the dispatcher)
+        status = status_cache.get(printer_name)
+        if status and status['status'] == 'stopped':
+            raise PrintError("Printer is stopped/offline")
             
+        try:
             # Attempt to print
             job_id = manager.print_raw_zpl(printer_name, zpl_code)
             return job_id
             
-        except cups.IPPError as e:
+        except PrintError as e:
+            # The cached status may be stale; re-check before retrying
+            status_cache.refresh_printer(printer_name)
             if attempt < max_retries - 1:
                 time.sleep(2 ** attempt)  # Exponential backoff
                 continue
             else:
-                raise Exception(f"Failed after {max_retries} attempts: {e}")
-
-
-class CUPSPrinterManager:
-    """Placeholder - see cups_printer_manager.py for full implementation"""
-    pass
\ No newline at end of file
+                raise PrintError(f"Failed after {max_retries} attempts: {e}") from e
\ No newline at end of file
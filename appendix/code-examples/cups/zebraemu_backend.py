@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Zebra Emulator CUPS Backend
+
+CUPS backend that sends a queue's jobs to the Zebra emulator
+(tests/zebra_emulator.py), so the CUPS path - queue state, job completion
+and flow control on pending CUPS jobs - can be load tested like a real
+printer.
+
+    sudo install -m 0755 zebraemu_backend.py /usr/lib/cups/backend/zebraemu
+    sudo lpadmin -p zebra_emulator -E -v zebraemu://127.0.0.1:9100 -m raw
+
+Before sending, the backend asks the emulator for ``~HS``. Paper out or an
+open head is reported as a printer-state-reason and the backend exits with
+CUPS_BACKEND_STOP, so CUPS stops the queue as it would for a real fault
+(``cupsenable zebra_emulator`` resumes it). After sending, the backend
+waits until the emulator has printed everything, so a CUPS job stays
+pending for as long as its labels take to print.
+
+Source: components/cups-printer.md - Example 123
+"""
+
+import os
+import socket
+import sys
+import time
+from urllib.parse import urlparse
+
+CUPS_BACKEND_OK = 0
+CUPS_BACKEND_FAILED = 1
+CUPS_BACKEND_STOP = 4
+CUPS_BACKEND_RETRY = 6
+
+POLL_INTERVAL = 0.5  # seconds
+TIMEOUT = 10  # seconds
+
+FAULT_REASONS = {'paper_out': 'media-empty-error', 'head_open': 'cover-open-error'}
+
+
+def host_status(address):
+    """Paper out, head open and buffered format count from ~HS"""
+    with socket.create_connection(address, TIMEOUT) as sock:
+        sock.sendall(b'~HS')
+        response = b''
+        while response.count(b'\x03') < 3:
+            data = sock.recv(1024)
+            if not data:
+                raise ConnectionError('printer closed the connection')
+            response += data
+    
+    first, second = [
+        line.strip(b'\x02\x03').split(b',') for line in response.split(b'\r\n')[:2]
+    ]
+    return {
+        'paper_out': first[1] == b'1',
+        'head_open': second[2] == b'1',
+        'formats': int(first[4])
+    }
+
+
+def faults(status):
+    return [reason for flag, reason in FAULT_REASONS.items() if status[flag]]
+
+
+def main():
+    if len(sys.argv) == 1:
+        # Device discovery (lpinfo -v)
+        print('network zebraemu "Unknown" "Zebra Printer Emulator"')
+        return CUPS_BACKEND_OK
+    if len(sys.argv) not in (6, 7):
+        sys.stderr.write('Usage: zebraemu job-id user title copies options [file]\n')
+        return CUPS_BACKEND_FAILED
+    
+    uri = urlparse(os.environ.get('DEVICE_URI', ''))
+    address = (uri.hostname or '127.0.0.1', uri.port or 9100)
+    if len(sys.argv) == 7:
+        with open(sys.argv[6], 'rb') as f:
+            data = f.read()
+    else:
+        data = sys.stdin.buffer.read()
+    
+    try:
+        status = host_status(address)
+        if faults(status):
+            sys.stderr.write(f"STATE: +{','.join(faults(status))}\n")
+            sys.stderr.write(f"ERROR: Printer reports {', '.join(faults(status))}\n")
+            return CUPS_BACKEND_STOP
+        sys.stderr.write(f"STATE: -{','.join(FAULT_REASONS.values())}\n")
+        
+        with socket.create_connection(address, TIMEOUT) as sock:
+            # A full printer buffer blocks the send until labels print
+            sock.settimeout(None)
+            sock.sendall(data * int(sys.argv[4]))
+        
+        # Finish the CUPS job only once the labels have printed; a fault
+        # while printing is shown on the queue until it clears
+        reported = []
+        while True:
+            time.sleep(POLL_INTERVAL)
+            status = host_status(address)
+            if faults(status) != reported:
+                if reported:
+                    sys.stderr.write(f"STATE: -{','.join(reported)}\n")
+                if faults(status):
+                    sys.stderr.write(f"STATE: +{','.join(faults(status))}\n")
+                reported = faults(status)
+            if not status['formats'] and not reported:
+                break
+            sys.stderr.write(f"INFO: {status['formats']} labels waiting to print\n")
+    except OSError as e:
+        sys.stderr.write(f"ERROR: Unable to reach the printer at {address[0]}:{address[1]}: {e}\n")
+        return CUPS_BACKEND_RETRY
+    
+    return CUPS_BACKEND_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,316 @@
+"""Flask Print API
+
+REST API that receives print jobs from Odoo and hands them to the print
+queue manager. Submissions may carry an ``Idempotency-Key`` header; a
+retried submission with the same key returns the original job instead of
+printing the batch again. ``/api/print/bulk`` takes several jobs in one
+request and queues them in one Redis transaction. ``/api/print/stream``
+takes an NDJSON body (job header line, then one label per line) and queues
+the job before the labels have finished uploading. ``/api/events`` pushes
+job status and progress as server-sent events. ``/api/status?ids=`` returns
+the status of many jobs from one pipelined Redis read. A job's printer
+must be a network printer (configured in the job, its pool or the printer
+registry) or one CUPS knows; the CUPS check reads the shared printer status
+cache (printer_status.py) instead of CUPS.
+``/api/metrics`` exposes queue, worker and CUPS timings for Prometheus.
+Submissions and status responses carry an ``estimated_completion`` from
+each printer's measured throughput and queued work (job_eta.py).
+
+Source: components/flask-api.md - Example 103
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+from flask import Flask, Response, request, jsonify, stream_with_context
+from redis import Redis, RedisError
+from rq import Worker
+
+from job_eta import estimate_completion
+from job_events import format_sse, iter_events
+from label_stream import LabelStreamWriter
+from print_metrics import metrics, render_metrics
+from printer_registry import get_printer_config, is_network_printer
+from printer_status import STATUS_TTL, status_cache
+from queue_manager import PrintQueueManager
+
+app = Flask(__name__)
+redis_conn = Redis(host='localhost', port=6379)
+manager = PrintQueueManager()
+
+API_KEY = os.getenv('API_KEY', 'your-secret-key-here')
+
+# Job IDs per GET /api/status?ids= request
+MAX_STATUS_IDS = 100
+
+
+@app.route('/api/print', methods=['POST'])
+def submit_print_job():
+    # Validate API key
+    if not validate_api_key(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json()
+    
+    # Validate request; pooled jobs may leave the printer to the queue manager
+    if not (data.get('printer') or data.get('pool')) or not data.get('labels'):
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    if data.get('printer') and not printer_exists(data):
+        return jsonify({'error': f"Printer {data['printer']} not found"}), 404
+    
+    priority = data.get('job_metadata', {}).get('priority', 'normal')
+    result = manager.enqueue_print_job(
+        data, priority, idempotency_key=request.headers.get('Idempotency-Key')
+    )
+    add_estimates([result])
+    
+    # A replayed submission is not a new resource
+    return jsonify(result), 200 if result.get('duplicate') else 201
+
+
+@app.route('/api/print/bulk', methods=['POST'])
+def submit_print_jobs():
+    if not validate_api_key(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    jobs = (request.get_json() or {}).get('jobs')
+    if not jobs:
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    statuses = status_cache.all()
+    for idx, data in enumerate(jobs):
+        if not (data.get('printer') or data.get('pool')) or not data.get('labels'):
+            return jsonify({'error': f'Job {idx}: missing required fields'}), 400
+        if data.get('printer') and not printer_exists(data, statuses):
+            return jsonify({'error': f"Job {idx}: printer {data['printer']} not found"}), 404
+    
+    results = manager.enqueue_print_jobs([
+        (data, data.get('job_metadata', {}).get('priority', 'normal'), data.get('idempotency_key'))
+        for data in jobs
+    ])
+    add_estimates(results)
+    
+    return jsonify({'jobs': results}), 201
+
+
+@app.route('/api/print/stream', methods=['POST'])
+def submit_print_stream():
+    if not validate_api_key(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Read the body line by line instead of parsing it in one piece
+    lines = (line for line in request.stream if line.strip())
+    try:
+        data = json.loads(next(lines, b'{}'))
+    except ValueError:
+        return jsonify({'error': 'Invalid job header'}), 400
+    
+    if not data.get('printer') or not data.get('quantity'):
+        return jsonify({'error': 'Missing required fields'}), 400
+    
+    if not printer_exists(data):
+        return jsonify({'error': f"Printer {data['printer']} not found"}), 404
+    
+    priority = data.get('job_metadata', {}).get('priority', 'normal')
+    result = manager.enqueue_print_job(
+        dict(data, stream=True), priority,
+        idempotency_key=request.headers.get('Idempotency-Key')
+    )
+    if result.get('duplicate'):
+        return jsonify(result), 200
+    
+    # The worker starts printing while the rest of the body arrives
+    writer = LabelStreamWriter(redis_conn, result['job_id'])
+    try:
+        for line in lines:
+            writer.append(json.loads(line))
+    except ValueError as e:
+        writer.close(error=f"Invalid label line {writer.count + 1}: {e}")
+        return jsonify(dict(result, error='Invalid label line')), 400
+    writer.close()
+    add_estimates([result])
+    
+    return jsonify(dict(result, quantity=writer.count)), 201
+
+
+@app.route('/api/status/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    job_data = redis_conn.hgetall(f"job:{job_id}")
+    
+    if not job_data:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    failed = redis_conn.llen(f"job:{job_id}:failed")
+    estimate = estimate_completion(redis_conn, {job_id: job_data}).get(job_id)
+    return jsonify(job_status(job_id, job_data, failed, estimate)), 200
+
+
+@app.route('/api/status', methods=['GET'])
+def get_jobs_status():
+    """Status of several jobs (?ids=a,b,c) from one pipelined Redis read"""
+    if not validate_api_key(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    job_ids = list(dict.fromkeys(filter(None, request.args.get('ids', '').split(','))))
+    if not job_ids:
+        return jsonify({'error': 'No job IDs given'}), 400
+    if len(job_ids) > MAX_STATUS_IDS:
+        return jsonify({'error': f"At most {MAX_STATUS_IDS} job IDs per request"}), 400
+    
+    pipe = redis_conn.pipeline(transaction=False)
+    for job_id in job_ids:
+        pipe.hgetall(f"job:{job_id}")
+        pipe.llen(f"job:{job_id}:failed")
+    results = pipe.execute()
+    
+    # Each printer's backlog is read once for all of its jobs
+    estimates = estimate_completion(
+        redis_conn, {job_id: job_data for job_id, job_data in zip(job_ids, results[::2]) if job_data}
+    )
+    
+    jobs, not_found = {}, []
+    for job_id, job_data, failed in zip(job_ids, results[::2], results[1::2]):
+        if job_data:
+            jobs[job_id] = job_status(job_id, job_data, failed, estimates.get(job_id))
+        else:
+            not_found.append(job_id)
+    
+    return jsonify({'jobs': jobs, 'not_found': not_found}), 200
+
+
+def job_status(job_id, job_data, failed, estimate=None):
+    """Status response for one job hash"""
+    status = {
+        'job_id': job_id,
+        'status': job_data.get(b'status').decode(),
+        'current_label': int(job_data.get(b'current_label', 0)),
+        'error': job_data.get(b'error', b'').decode() or None,
+        'progress': {
+            'total': int(job_data.get(b'quantity', 0)),
+            'completed': int(job_data.get(b'current_label', 0)),
+            # A pooled job's failures are counted across its shards
+            'failed': failed or int(job_data.get(b'failed', 0))
+        },
+        'estimated_completion': format_timestamp(estimate) if estimate else None
+    }
+    if job_data.get(b'shards'):
+        status['shards'] = job_data[b'shards'].decode().split(',')
+    return status
+
+
+def add_estimates(results):
+    """Add the completion estimate to each submission result"""
+    pipe = redis_conn.pipeline(transaction=False)
+    for result in results:
+        pipe.hgetall(f"job:{result['job_id']}")
+    job_ids = [result['job_id'] for result in results]
+    estimates = estimate_completion(redis_conn, dict(zip(job_ids, pipe.execute())))
+    
+    for result in results:
+        estimate = estimates.get(result['job_id'])
+        result['estimated_completion'] = format_timestamp(estimate) if estimate else None
+
+
+def format_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+@app.route('/api/events', methods=['GET'])
+def stream_job_events():
+    """Server-sent job events, optionally filtered by ?job= and ?printer="""
+    if not validate_api_key(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Reconnecting clients resume after the last event they saw
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id', '$')
+    job_ids = set(filter(None, request.args.get('job', '').split(',')))
+    printers = set(filter(None, request.args.get('printer', '').split(',')))
+    
+    events = iter_events(redis_conn, last_id, job_ids, printers)
+    return Response(
+        stream_with_context(format_sse(*event) for event in events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/printers', methods=['GET'])
+def list_printers():
+    """Printers and their status from the shared status cache"""
+    if not validate_api_key(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify({'printers': list(status_cache.all().values())}), 200
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Print pipeline metrics of every process, in Prometheus text format"""
+    if not validate_api_key(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Include this process's own buffered observations
+    metrics.flush(redis_conn)
+    return Response(render_metrics(redis_conn), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    try:
+        redis_conn.ping()
+        workers = Worker.count(connection=redis_conn)
+    except RedisError:
+        return jsonify({'status': 'unhealthy', 'redis': 'disconnected'}), 503
+    
+    # The dispatcher sweep keeps the status cache fresh while CUPS answers
+    status_cache.all()
+    cups_ok = time.time() - status_cache.updated_at <= STATUS_TTL
+    
+    return jsonify({
+        'status': 'healthy' if cups_ok else 'degraded',
+        'cups': 'running' if cups_ok else 'unavailable',
+        'redis': 'connected',
+        'workers': workers
+    }), 200 if cups_ok else 503
+
+
+def printer_exists(data, statuses=None):
+    """The job's printer is a network printer or a printer CUPS knows
+    
+    Network printers are printed to over raw TCP and may be missing from
+    CUPS. An entry a failed status check left in the cache (status
+    'error') does not show that CUPS knows the printer.
+    """
+    printer_name = data['printer']
+    pool_config = (data.get('pool') or {}).get('printers', {}).get(printer_name)
+    for config in (data.get('printer_config'), pool_config):
+        if config and is_network_printer(config):
+            return True
+    if is_network_printer(get_printer_config(printer_name)):
+        return True
+    
+    status = (status_cache.all() if statuses is None else statuses).get(printer_name)
+    return status is not None and status['status'] != 'error'
+
+
+def validate_api_key(auth_header):
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return False
+    return auth_header.split(' ')[1] == API_KEY
+
+
+@app.errorhandler(400)
+def bad_request(error):
+    return jsonify({'error': 'Bad request', 'message': str(error)}), 400
+
+
+@app.errorhandler(500)
+def internal_error(error):
+    app.logger.error(f'Server error: {error}')
+    return jsonify({'error': 'Internal server error'}), 500
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
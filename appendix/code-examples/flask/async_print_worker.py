@@ -0,0 +1,282 @@
+"""Asyncio Print Worker
+
+Single-process worker that drives many printers at once. Instead of one RQ
+worker process per concurrent job, admitted jobs are read from the
+``dispatch:{tier}`` lists (``WORKER_MODE=async``) and each runs as its own
+task as soon as it is taken; the dispatcher's printer leases already cap
+how many jobs run per printer, so no job waits in worker memory where a
+crash would lose it. A job taken by a worker that dies before starting
+it is recovered when its lease expires. Network printers are written to
+with non-blocking sockets, CUPS submits run in a thread, and Redis is
+accessed through redis.asyncio. Each job is an AsyncPrintJobRun, which
+shares its chunk, checkpoint and cleanup handling with the RQ worker's
+print_worker.PrintJobRun.
+
+    WORKER_MODE=async python async_print_worker.py
+
+Source: F04-batch-print-queue.md - Example 94
+"""
+
+import asyncio
+import json
+import logging
+import time
+import redis.asyncio as aioredis
+
+from cups_pool import cups_pool
+from flow_control import get_flow_controller
+from graphic_cache import AsyncGraphicCache
+from job_checkpoint import AsyncJobCheckpoint, JobSuperseded
+from job_eta import record_rate
+from job_resume import park_job, suspend_job
+from label_stream import stream_labels
+from print_metrics import metrics
+from print_worker import PrintJobRun, iter_label_chunks
+from printer_breaker import AsyncPrinterBreaker, PrinterUnavailable
+from printer_leases import (
+    LEASE_TTL, PREEMPT_LOCK_MS, PREEMPT_SCRIPT, TIERS, JobPreempted, leases_key, preempt_keys
+)
+from printer_status import status_cache
+from printer_transport import PrintTransportError, get_async_transport
+from progress_reporter import AsyncProgressReporter
+from queue_manager import PrintQueueManager
+from stored_formats import download_format
+
+_logger = logging.getLogger(__name__)
+
+# BLPOP checks keys in order, so high priority jobs are taken first
+DISPATCH_KEYS = [f"dispatch:{tier}" for tier in TIERS]
+
+
+class AsyncPrintWorker:
+    def __init__(self):
+        self.redis_conn = aioredis.Redis(host='localhost', port=6379)
+        self.manager = PrintQueueManager()
+        self.graphics = AsyncGraphicCache(self.redis_conn)
+        self.breaker = AsyncPrinterBreaker(self.redis_conn)
+        self._preempt = self.redis_conn.register_script(PREEMPT_SCRIPT)
+        self.transports = {}
+        self.tasks = set()
+    
+    async def run(self):
+        """Pull admitted jobs and start each one right away"""
+        while True:
+            item = await self.redis_conn.blpop(DISPATCH_KEYS, timeout=5)
+            if item is None:
+                continue
+            
+            job_id = item[1].decode()
+            try:
+                job_data = json.loads(await self.redis_conn.get(f"job:{job_id}:data"))
+            except (TypeError, ValueError) as e:
+                # Missing or corrupt job data fails the job, not the worker
+                await self._fail_unreadable(job_id, e)
+                continue
+            task = asyncio.create_task(self._run_job(job_id, job_data))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+    
+    async def _fail_unreadable(self, job_id, error):
+        """Fail a job whose data can't be read and free its printer slot"""
+        _logger.error(f"Job {job_id} has no readable data: {error}")
+        printer = await self.redis_conn.hget(f"job:{job_id}", 'printer')
+        if printer is None:
+            return
+        
+        printer_name = printer.decode()
+        progress = AsyncProgressReporter(self.redis_conn, job_id, printer_name=printer_name)
+        await progress.set_status('failed', error='Job data is missing or unreadable')
+        await self.redis_conn.zrem(leases_key(printer_name), job_id)
+        await asyncio.to_thread(self.manager.dispatch, printer_name)
+    
+    async def _get_transport(self, printer_name):
+        """One transport per printer, shared by that printer's running jobs
+        
+        Replaced when the printer's configuration changes, like the RQ
+        worker's socket pool.
+        """
+        current = self.transports.get(printer_name)
+        transport = await asyncio.to_thread(get_async_transport, printer_name, current)
+        if transport is not current:
+            # Closed here, on the event loop that owns its stream
+            if current is not None:
+                current.close()
+            self.transports[printer_name] = transport
+        return transport
+    
+    async def _run_job(self, job_id, job_data):
+        try:
+            await self.process_batch_print(job_id, job_data)
+        except Exception as e:
+            _logger.error(f"Job {job_id} failed: {e}")
+    
+    async def process_batch_print(self, job_id, job_data):
+        """Process a batch print job with progress tracking"""
+        await AsyncPrintJobRun(self, job_id, job_data).run()
+    
+    async def _should_yield(self, printer_name, tier):
+        """Async counterpart of PrinterLeases.should_yield"""
+        keys = preempt_keys(printer_name, tier)
+        if len(keys) == 1:
+            return False
+        return bool(await self._preempt(keys=keys, args=[PREEMPT_LOCK_MS]))
+    
+    async def _renew_lease(self, printer_name, job_id):
+        await self.redis_conn.zadd(
+            leases_key(printer_name), {job_id: time.time() + LEASE_TTL}, xx=True
+        )
+
+
+class AsyncPrintJobRun(PrintJobRun):
+    """PrintJobRun on the asyncio worker's connections, transports and caches"""
+    
+    progress_class = AsyncProgressReporter
+    checkpoint_class = AsyncJobCheckpoint
+    
+    def __init__(self, worker, job_id, job_data):
+        self.worker = worker
+        self.streamed = job_data.get('stream', False)
+        # Streamed labels block on XREAD, so they are read in a thread
+        source = stream_labels(worker.manager.redis_conn, job_id) if self.streamed else None
+        super().__init__(worker.redis_conn, job_id, job_data, source)
+    
+    async def run(self):
+        try:
+            await self.claim()
+            chunks = iter_label_chunks(self.labels, self.chunk_size, self.start)
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None) if self.streamed else next(chunks, None)
+                if chunk is None:
+                    break
+                await self.send_chunk(chunk)
+            await self.complete()
+        
+        except JobSuperseded as e:
+            self.taken_over = await self.checkpoint.taken_over()
+            _logger.warning(f"Stopped job {self.job_id}: {e}")
+        
+        except PrinterUnavailable as e:
+            await self.progress.flush()
+            await asyncio.to_thread(park_job, self.job_id)
+            _logger.warning(f"Parked job {self.job_id}: {e}")
+        
+        except JobPreempted as e:
+            await self.progress.flush()
+            await asyncio.to_thread(suspend_job, self.job_id)
+            _logger.info(f"Suspended job {self.job_id}: {e}")
+        
+        except Exception as e:
+            await self.progress.set_status('failed', error=str(e))
+            raise
+        
+        finally:
+            await self.close()
+    
+    async def claim(self):
+        await self.worker._renew_lease(self.printer_name, self.job_id)
+        self.start = await self.checkpoint.claim()
+        job = await self.redis_conn.hmget(f"job:{self.job_id}", 'priority', 'queued_at')
+        await self.progress.set_status('printing', chunk_size=self._status_chunk_size())
+        self._started(job)
+        
+        self.transport = await self.worker._get_transport(self.printer_name)
+        self.flow = await asyncio.to_thread(
+            get_flow_controller, self.printer_name, self.transport,
+            lambda: self.worker._renew_lease(self.printer_name, self.job_id)
+        )
+    
+    async def send_chunk(self, chunk):
+        worker = self.worker
+        if chunk['first'] > self.start and await worker._should_yield(self.printer_name, self.tier):
+            raise JobPreempted(f"Higher-priority job waiting for {self.printer_name}")
+        
+        state = await worker.breaker.state(self.printer_name)
+        self._check_breaker(state)
+        
+        waited = time.monotonic()
+        await self.flow.wait_async()
+        self._flow_waited(waited)
+        
+        zpl = await self._prepare(chunk)
+        await self.checkpoint.mark(chunk['first'], chunk['last'], self.transport.ATOMIC_JOBS)
+        submitted = time.monotonic()
+        success = zpl is not None and await print_single_label(
+            self.transport, zpl, self._title(chunk), breaker=worker.breaker, printer_name=self.printer_name
+        )
+        failed = self._chunk_sent(chunk, success, submitted)
+        
+        if success and state == 'half_open':
+            await asyncio.to_thread(worker.manager.dispatch, self.printer_name)
+        if not success:
+            await worker.graphics.invalidate(self.printer_name)
+            await asyncio.to_thread(status_cache.refresh_printer, self.printer_name)
+        
+        await self.checkpoint.ack(chunk['last'], failed)
+        await self.progress.update(chunk['last'], labels=self._size(chunk))
+        await worker._renew_lease(self.printer_name, self.job_id)
+        if metrics.is_due():
+            await metrics.flush_async(self.redis_conn)
+    
+    async def _prepare(self, chunk):
+        graphics = self.worker.graphics
+        try:
+            if self.template and not self.format_stored:
+                zpl = await graphics.prepare(
+                    self.printer_name, self.transport, self.template['zpl'], send=self._download
+                )
+                await download_format(self.transport, dict(self.template, zpl=zpl), send=self._download)
+                self.format_stored = True
+            return await graphics.prepare(self.printer_name, self.transport, chunk['zpl'], send=self._download)
+        except PrintTransportError as e:
+            _logger.error(f"Could not prepare labels {chunk['first']}-{chunk['last']}: {e}")
+            return None
+    
+    async def _download(self, zpl_code, title):
+        if not await print_single_label(
+            self.transport, zpl_code, title, breaker=self.worker.breaker, printer_name=self.printer_name
+        ):
+            raise PrintTransportError(f"{title} was not stored on {self.printer_name}")
+    
+    async def complete(self):
+        await self.progress.set_status('completed')
+        elapsed = self._finished()
+        if elapsed:
+            await record_rate(self.redis_conn, self.printer_name, self.sent, elapsed)
+    
+    async def close(self):
+        if not self.taken_over:
+            await self.redis_conn.zrem(leases_key(self.printer_name), self.job_id)
+        await asyncio.to_thread(self.worker.manager.dispatch, self.printer_name)
+        await asyncio.to_thread(
+            cups_pool.record_job, self.worker.manager.redis_conn, self.job_id, self.cups_usage
+        )
+        await metrics.flush_async(self.redis_conn)
+
+
+async def print_single_label(transport, zpl_code, title="Label", max_retries=3,
+                             breaker=None, printer_name=None):
+    """Print single label (or chunk of labels) with retry logic"""
+    for attempt in range(max_retries):
+        try:
+            await transport.send(zpl_code, title)
+            if breaker:
+                await breaker.record_success(printer_name)
+            return True
+        
+        except PrintTransportError as e:
+            if breaker and await breaker.record_failure(printer_name) == 'open':
+                raise PrinterUnavailable(f"Printer {printer_name} is offline: {e}") from e
+            if attempt < max_retries - 1:
+                metrics.inc('print_retries_total', printer=printer_name or 'unknown')
+                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                continue
+            else:
+                _logger.error(f"Failed after {max_retries} attempts: {e}")
+                return False
+    
+    return False
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(AsyncPrintWorker().run())
\ No newline at end of file
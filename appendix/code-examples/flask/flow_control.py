@@ -0,0 +1,92 @@
+"""Adaptive Flow Control
+
+Replaces the fixed pause between labels with backpressure from the printer.
+Before each chunk the worker checks the printer's backlog: pending CUPS jobs
+for a CUPS queue (a stopped printer counts as full), or unsent bytes in the
+socket's send queue for a direct connection. Sending continues at full
+speed below the high watermark; once the backlog reaches it, the worker
+backs off until the backlog drains to the low watermark.
+
+Watermarks are tunable per printer with ``flow_high_watermark`` and
+``flow_low_watermark`` in the printer configuration; the units are jobs for
+CUPS queues and bytes for raw sockets. While backing off, the optional
+``heartbeat`` is called on every poll so the job's printer lease stays alive.
+
+Source: F04-batch-print-queue.md - Example 95
+"""
+
+import asyncio
+import time
+import logging
+
+from printer_registry import get_printer_config
+from printer_transport import PrintTransportError
+
+_logger = logging.getLogger(__name__)
+
+
+class FlowController:
+    """Hysteresis backoff on a transport's backlog()"""
+    
+    def __init__(self, transport, high_watermark, low_watermark,
+                 poll_interval=0.05, max_interval=2.0, timeout=300, heartbeat=None):
+        self.transport = transport
+        self.heartbeat = heartbeat
+        self.high_watermark = high_watermark
+        self.low_watermark = min(low_watermark, high_watermark)
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+    
+    def wait(self):
+        """Block until the printer can take more; returns seconds waited"""
+        backlog = self.transport.backlog()
+        if backlog < self.high_watermark:
+            return 0
+        
+        waited = 0
+        interval = self.poll_interval
+        while backlog > self.low_watermark:
+            if waited >= self.timeout:
+                raise PrintTransportError(
+                    f"Printer backlog stuck at {backlog} for {waited:.0f}s"
+                )
+            time.sleep(interval)
+            if self.heartbeat:
+                self.heartbeat()
+            waited += interval
+            interval = min(interval * 2, self.max_interval)
+            backlog = self.transport.backlog()
+        
+        _logger.debug(f"Backed off {waited:.2f}s for printer backlog")
+        return waited
+    
+    async def wait_async(self):
+        """Same as wait(), for the asyncio worker"""
+        backlog = await asyncio.to_thread(self.transport.backlog)
+        if backlog < self.high_watermark:
+            return 0
+        
+        waited = 0
+        interval = self.poll_interval
+        while backlog > self.low_watermark:
+            if waited >= self.timeout:
+                raise PrintTransportError(
+                    f"Printer backlog stuck at {backlog} for {waited:.0f}s"
+                )
+            await asyncio.sleep(interval)
+            if self.heartbeat:
+                await self.heartbeat()
+            waited += interval
+            interval = min(interval * 2, self.max_interval)
+            backlog = await asyncio.to_thread(self.transport.backlog)
+        
+        return waited
+
+
+def get_flow_controller(printer_name, transport, heartbeat=None):
+    """Build a FlowController using the printer's tuned watermarks"""
+    config = get_printer_config(printer_name)
+    high = int(config.get('flow_high_watermark') or transport.HIGH_WATERMARK)
+    low = int(config.get('flow_low_watermark') or transport.LOW_WATERMARK)
+    return FlowController(transport, high, low, heartbeat=heartbeat)
\ No newline at end of file
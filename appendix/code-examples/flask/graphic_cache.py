@@ -0,0 +1,121 @@
+"""Printer Graphic Cache
+
+Takes embedded ``^GF`` graphics (logos, certification marks) out of the
+label stream. Each graphic is downloaded once per printer as a stored
+object named after its content hash - ``~DG`` for ASCII hex data, ``~DY``
+for Z64/B64 encoded data - and the label recalls it with ``^XG``.
+
+Objects resident on a printer are tracked in the Redis set
+``printer:{name}:graphics``. Objects are stored in printer RAM (``R:``), so
+the set is dropped whenever a reboot is possible: the transport had to
+reconnect, or a send failed. It also expires after RESIDENT_TTL as a
+backstop. An edited graphic hashes to a new name and is downloaded on first
+use. Workers pass a ``send`` that retries downloads and counts them towards
+the printer's breaker, like the chunks that recall them.
+
+Source: F06-template-management.md - Example 99
+"""
+
+import hashlib
+import re
+
+# ^GFA,<byte count>,<graphic field count>,<bytes per row>,<data>
+GRAPHIC_FIELD = re.compile(r'\^GFA,(\d+),(\d+),(\d+),([^\^~]+)')
+
+RESIDENT_TTL = 12 * 3600
+
+
+def graphics_key(printer_name):
+    return f"printer:{printer_name}:graphics"
+
+
+def extract_graphics(zpl_code):
+    """Replace ^GF fields with ^XG recalls, returning (zpl, {name: download})"""
+    downloads = {}
+    
+    def to_recall(match):
+        _, total, row, data = match.groups()
+        data = data.strip()
+        name = f"R:{hashlib.sha1(data.encode()).hexdigest()[:8].upper()}.GRF"
+        
+        if data.startswith((':Z64:', ':B64:')):
+            downloads[name] = f"~DY{name[:-4]},A,G,{total},{row},{data}"
+        else:
+            downloads[name] = f"~DG{name},{total},{row},{data}"
+        return f"^XG{name},1,1"
+    
+    return GRAPHIC_FIELD.sub(to_recall, zpl_code), downloads
+
+
+class GraphicCache:
+    """Downloads a printer's graphics on first use and rewrites ZPL to recall them"""
+    
+    def __init__(self, redis_conn, ttl=RESIDENT_TTL):
+        self.redis_conn = redis_conn
+        self.ttl = ttl
+        self._connects = {}
+    
+    def prepare(self, printer_name, transport, zpl_code, send=None):
+        """Return ZPL using ^XG, after making sure its graphics are resident
+        
+        Downloads go through ``send`` (default transport.send), which raises
+        PrintTransportError if a graphic could not be stored.
+        """
+        zpl_code, downloads = extract_graphics(zpl_code)
+        if not downloads:
+            return zpl_code
+        
+        if self._reconnected(printer_name, transport):
+            self.invalidate(printer_name)
+        
+        key = graphics_key(printer_name)
+        resident = {name.decode() for name in self.redis_conn.smembers(key)}
+        
+        for name, download in downloads.items():
+            if name not in resident:
+                (send or transport.send)(download, f"Graphic {name}")
+                self.redis_conn.sadd(key, name)
+                self.redis_conn.expire(key, self.ttl)
+        
+        return zpl_code
+    
+    def invalidate(self, printer_name):
+        """Forget what the printer holds; the next label downloads again"""
+        self.redis_conn.delete(graphics_key(printer_name))
+    
+    def _reconnected(self, printer_name, transport):
+        """True if the transport opened a new connection since the last check
+        
+        Only raw socket transports count connections; a CUPS queue relies on
+        send failures and the TTL.
+        """
+        connects = getattr(transport, 'connects', None)
+        previous = self._connects.get(printer_name)
+        self._connects[printer_name] = connects
+        return bool(previous) and connects != previous
+
+
+class AsyncGraphicCache(GraphicCache):
+    """GraphicCache for redis.asyncio connections and async transports"""
+    
+    async def prepare(self, printer_name, transport, zpl_code, send=None):
+        zpl_code, downloads = extract_graphics(zpl_code)
+        if not downloads:
+            return zpl_code
+        
+        if self._reconnected(printer_name, transport):
+            await self.invalidate(printer_name)
+        
+        key = graphics_key(printer_name)
+        resident = {name.decode() for name in await self.redis_conn.smembers(key)}
+        
+        for name, download in downloads.items():
+            if name not in resident:
+                await (send or transport.send)(download, f"Graphic {name}")
+                await self.redis_conn.sadd(key, name)
+                await self.redis_conn.expire(key, self.ttl)
+        
+        return zpl_code
+    
+    async def invalidate(self, printer_name):
+        await self.redis_conn.delete(graphics_key(printer_name))
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""Job Checkpoints
+
+Durable record of how far a batch got, so a job stopped by a crashed
+worker, an RQ timeout or a cancel resumes at the exact next label on any
+worker. Before a chunk is sent the worker marks it in flight; once the
+transport has accepted it, the checkpoint moves to the chunk's last label
+and the chunk's failed labels are recorded in the same script. These two
+writes are not buffered like progress reporting.
+
+Fields on ``job:{id}``:
+
+- ``checkpoint``: last label handed to the printer (0 before the first chunk)
+- ``inflight``: ``first-last`` range of the chunk being sent
+- ``runner``: token of the execution that owns the job
+
+Every write checks ``runner``, so a worker that has lost the job (cancelled,
+or resumed elsewhere after its lease lapsed) stops at its next chunk rather
+than printing labels twice.
+
+A chunk still in flight when a worker died is sent again, and its range is
+pushed to ``job:{id}:uncertain`` for the operator to check: on a raw
+socket part of the chunk may already have printed, and a CUPS job may have
+been finished just before the worker died, before its ack. A CUPS chunk
+whose send failed did not print (CUPS discards a job whose document was
+never finished), so parking the job clears it instead (see job_resume.py).
+
+Source: F04-batch-print-queue.md - Example 101
+"""
+
+import uuid
+
+# KEYS: job hash, uncertain list; ARGV: runner token
+CLAIM_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') == 'cancelled' then
+    return false
+end
+local inflight = redis.call('HGET', KEYS[1], 'inflight')
+if inflight then
+    redis.call('RPUSH', KEYS[2], inflight)
+end
+redis.call('HDEL', KEYS[1], 'inflight', 'inflight_atomic')
+redis.call('HSET', KEYS[1], 'runner', ARGV[1])
+return tonumber(redis.call('HGET', KEYS[1], 'checkpoint') or '0')
+"""
+
+# KEYS: job hash; ARGV: runner token, inflight range, atomic flag
+MARK_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'runner') ~= ARGV[1]
+        or redis.call('HGET', KEYS[1], 'status') == 'cancelled' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'inflight', ARGV[2], 'inflight_atomic', ARGV[3])
+return 1
+"""
+
+# KEYS: job hash, failed list; ARGV: runner token, last label, failed labels...
+ACK_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'runner') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'checkpoint', ARGV[2])
+redis.call('HDEL', KEYS[1], 'inflight', 'inflight_atomic')
+for i = 3, #ARGV do
+    redis.call('RPUSH', KEYS[2], ARGV[i])
+end
+return 1
+"""
+
+
+class JobSuperseded(Exception):
+    """Raised when the job was cancelled or taken over by another worker"""
+
+
+class JobCheckpoint:
+    """Fenced per-chunk checkpoint for one execution of a job"""
+    
+    def __init__(self, redis_conn, job_id):
+        self.redis_conn = redis_conn
+        self.job_id = job_id
+        self.token = uuid.uuid4().hex
+        self._claim = redis_conn.register_script(CLAIM_SCRIPT)
+        self._mark = redis_conn.register_script(MARK_SCRIPT)
+        self._ack = redis_conn.register_script(ACK_SCRIPT)
+    
+    def claim(self):
+        """Take ownership of the job; returns the first label still to print"""
+        checkpoint = self._claim(
+            keys=[f"job:{self.job_id}", f"job:{self.job_id}:uncertain"],
+            args=[self.token]
+        )
+        if checkpoint is None:
+            raise JobSuperseded(f"Job {self.job_id} was cancelled")
+        return checkpoint + 1
+    
+    def mark(self, first, last, atomic):
+        """Record the chunk about to be sent"""
+        if not self._mark(keys=[f"job:{self.job_id}"], args=self._mark_args(first, last, atomic)):
+            raise JobSuperseded(f"Job {self.job_id} is no longer owned by this worker")
+    
+    def ack(self, last, failed=()):
+        """Advance the checkpoint past a sent chunk, recording its failures"""
+        if not self._ack(keys=self._ack_keys(), args=[self.token, last, *failed]):
+            raise JobSuperseded(f"Job {self.job_id} is no longer owned by this worker")
+    
+    def taken_over(self):
+        """True if another execution has claimed the job since this one"""
+        runner = self.redis_conn.hget(f"job:{self.job_id}", 'runner')
+        return runner is not None and runner.decode() != self.token
+    
+    def _mark_args(self, first, last, atomic):
+        return [self.token, f"{first}-{last}", int(bool(atomic))]
+    
+    def _ack_keys(self):
+        return [f"job:{self.job_id}", f"job:{self.job_id}:failed"]
+
+
+class AsyncJobCheckpoint(JobCheckpoint):
+    """JobCheckpoint for redis.asyncio connections in the asyncio worker"""
+    
+    async def claim(self):
+        checkpoint = await self._claim(
+            keys=[f"job:{self.job_id}", f"job:{self.job_id}:uncertain"],
+            args=[self.token]
+        )
+        if checkpoint is None:
+            raise JobSuperseded(f"Job {self.job_id} was cancelled")
+        return checkpoint + 1
+    
+    async def mark(self, first, last, atomic):
+        if not await self._mark(keys=[f"job:{self.job_id}"], args=self._mark_args(first, last, atomic)):
+            raise JobSuperseded(f"Job {self.job_id} is no longer owned by this worker")
+    
+    async def ack(self, last, failed=()):
+        if not await self._ack(keys=self._ack_keys(), args=[self.token, last, *failed]):
+            raise JobSuperseded(f"Job {self.job_id} is no longer owned by this worker")
+    
+    async def taken_over(self):
+        runner = await self.redis_conn.hget(f"job:{self.job_id}", 'runner')
+        return runner is not None and runner.decode() != self.token
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""Job Completion Estimates
+
+Estimates when a job will finish from the measured throughput of its
+printer and the work queued ahead of it, instead of a fixed time per label.
+
+Workers record every finished job run in ``printer:{name}:rate`` with
+RATE_SCRIPT. The hash keeps time-decayed sums of labels printed and of
+seconds the printer was busy (RATE_HALF_LIFE), and their ratio is the
+printer's labels/sec. Runs that overlap on a printer with two slots count
+their shared time once, so the rate is the printer's and not a single
+job's. Printers without history use DEFAULT_RATE.
+
+A job's ETA is now plus the labels printed before it is done, divided by
+its printer's rate:
+
+- a pending job waits for every running job and for the pending jobs ahead
+  of it in its own and higher tiers
+- a running job shares the printer with the other running jobs, and waits
+  for as many of each one's labels as it has left itself
+
+A pooled job finishes with its last shard. Each printer's backlog is read
+once per estimate, so ``/api/status?ids=`` stays a few round trips. Pooled
+jobs sent without a printer go to the pool printer that drains first.
+
+Source: F04-batch-print-queue.md - Example 125
+"""
+
+import time
+
+from printer_leases import TIERS, leases_key, pending_key
+
+DEFAULT_RATE = 4.0  # labels/sec, a Z230 at 6 ips on 1.5" labels
+RATE_HALF_LIFE = 1800  # seconds; older runs count half as much
+
+FINISHED_STATUSES = (b'completed', b'failed', b'cancelled')
+
+# KEYS: rate hash
+# ARGV: labels, run seconds, now, half-life
+RATE_SCRIPT = """
+local h = redis.call('HMGET', KEYS[1], 'labels', 'seconds', 'busy_until', 'updated_at')
+local now = tonumber(ARGV[3])
+local busy_until = tonumber(h[3] or '0')
+-- Time already counted for an overlapping run on the printer is not counted again
+local busy = now - math.max(now - tonumber(ARGV[2]), busy_until)
+if busy < 0 then
+    busy = 0
+end
+local decay = 0.5 ^ ((now - tonumber(h[4] or ARGV[3])) / tonumber(ARGV[4]))
+local labels = tonumber(h[1] or '0') * decay + tonumber(ARGV[1])
+local seconds = tonumber(h[2] or '0') * decay + busy
+redis.call('HSET', KEYS[1], 'labels', labels, 'seconds', seconds,
+    'busy_until', math.max(now, busy_until), 'updated_at', now)
+return 1
+"""
+
+
+def rate_key(printer_name):
+    return f"printer:{printer_name}:rate"
+
+
+def record_rate(redis_conn, printer_name, labels, seconds):
+    """Add a finished job run to the printer's throughput
+    
+    Works on sync and asyncio connections; await the result of the latter.
+    """
+    return redis_conn.eval(
+        RATE_SCRIPT, 1, rate_key(printer_name), labels, seconds, time.time(), RATE_HALF_LIFE
+    )
+
+
+def _remaining(job):
+    quantity, current = job
+    return max(int(quantity or 0) - int(current or 0), 0)
+
+
+class PrinterBacklog:
+    """Running and pending jobs of one printer, with its measured rate"""
+    
+    def __init__(self, redis_conn, printer_name):
+        self.read_at = time.time()
+        
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.zrangebyscore(leases_key(printer_name), self.read_at, '+inf')
+        for tier in TIERS:
+            pipe.lrange(pending_key(printer_name, tier), 0, -1)
+        pipe.hmget(rate_key(printer_name), 'labels', 'seconds')
+        running, *pending, rate = pipe.execute()
+        
+        self.running = [job_id.decode() for job_id in running]
+        self.pending = {
+            tier: [job_id.decode() for job_id in job_ids] for tier, job_ids in zip(TIERS, pending)
+        }
+        labels, seconds = (float(value or 0) for value in rate)
+        self.rate = labels / seconds if seconds else DEFAULT_RATE
+        
+        job_ids = self.running + [job_id for job_ids in self.pending.values() for job_id in job_ids]
+        pipe = redis_conn.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hmget(f"job:{job_id}", 'quantity', 'current_label')
+        self.remaining = dict(zip(job_ids, map(_remaining, pipe.execute())))
+    
+    def labels_ahead(self, job_id, tier, remaining):
+        """Labels the printer prints until the job is done, its own included"""
+        if job_id in self.running:
+            return remaining + sum(
+                min(remaining, self.remaining[other]) for other in self.running if other != job_id
+            )
+        
+        ahead = remaining + sum(self.remaining[other] for other in self.running)
+        tier = tier if tier in TIERS else 'default'
+        for queued_tier in TIERS[:TIERS.index(tier) + 1]:
+            queue = self.pending[queued_tier]
+            if job_id in queue:
+                queue = queue[:queue.index(job_id)]
+            ahead += sum(self.remaining[other] for other in queue)
+        return ahead
+    
+    def eta(self, job_id, tier, remaining):
+        return self.read_at + self.labels_ahead(job_id, tier, remaining) / self.rate
+    
+    def drain_seconds(self):
+        """Seconds until everything queued on the printer has printed"""
+        return sum(self.remaining.values()) / self.rate
+
+
+def least_loaded(redis_conn, printers):
+    """The printer whose queued work finishes first"""
+    return min(sorted(printers), key=lambda name: PrinterBacklog(redis_conn, name).drain_seconds())
+
+
+def estimate_completion(redis_conn, jobs):
+    """Estimated completion time (epoch seconds) of each unfinished job
+    
+    ``jobs`` maps job IDs to their ``job:{id}`` hash; finished jobs are
+    left out of the result.
+    """
+    backlogs = {}
+    estimates = {}
+    
+    for job_id, job_data in jobs.items():
+        if job_data.get(b'status') in FINISHED_STATUSES:
+            continue
+        
+        parts = [(job_id, job_data)]
+        if job_data.get(b'shards'):
+            shard_ids = job_data[b'shards'].decode().split(',')
+            pipe = redis_conn.pipeline(transaction=False)
+            for shard_id in shard_ids:
+                pipe.hgetall(f"job:{shard_id}")
+            parts = [
+                (shard_id, shard) for shard_id, shard in zip(shard_ids, pipe.execute())
+                if shard and shard.get(b'status') not in FINISHED_STATUSES
+            ]
+        
+        times = []
+        for part_id, part in parts:
+            printer_name = part[b'printer'].decode()
+            if printer_name not in backlogs:
+                backlogs[printer_name] = PrinterBacklog(redis_conn, printer_name)
+            remaining = _remaining((part.get(b'quantity'), part.get(b'current_label')))
+            times.append(backlogs[printer_name].eta(
+                part_id, part.get(b'priority', b'default').decode(), remaining
+            ))
+        if times:
+            estimates[job_id] = max(times)
+    
+    return estimates
\ No newline at end of file
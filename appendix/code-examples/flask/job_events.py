@@ -0,0 +1,49 @@
+"""Job Event Stream
+
+Job status and progress changes are appended to the Redis stream
+``events:jobs`` by the queue manager and the workers, in the same pipeline
+as the writes they describe. ``GET /api/events`` relays the stream to
+clients as server-sent events, filtered by job or printer. Stream entry IDs
+are used as SSE event IDs, so a client that reconnects with
+``Last-Event-ID`` continues where it left off.
+
+Source: F07-job-monitoring.md - Example 106
+"""
+
+import json
+
+EVENTS_KEY = 'events:jobs'
+EVENTS_MAXLEN = 100000  # approximate; older events are trimmed
+KEEPALIVE = 15  # seconds between keepalive comments on an idle stream
+
+
+def queue_event(pipe, job_id, printer_name, **fields):
+    """Append a job event; pipe may be a pipeline or a connection"""
+    event = {'job_id': job_id, 'printer': printer_name or ''}
+    event.update({key: value for key, value in fields.items() if value is not None})
+    pipe.xadd(EVENTS_KEY, event, maxlen=EVENTS_MAXLEN, approximate=True)
+
+
+def iter_events(redis_conn, last_id='$', job_ids=None, printers=None, block=KEEPALIVE):
+    """Yield (event_id, event) after last_id, or (None, None) when idle"""
+    while True:
+        entries = redis_conn.xread({EVENTS_KEY: last_id}, count=100, block=int(block * 1000))
+        if not entries:
+            yield None, None
+            continue
+        
+        for entry_id, fields in entries[0][1]:
+            last_id = entry_id
+            event = {key.decode(): value.decode() for key, value in fields.items()}
+            if job_ids and event['job_id'] not in job_ids:
+                continue
+            if printers and event['printer'] not in printers:
+                continue
+            yield entry_id.decode(), event
+
+
+def format_sse(event_id, event):
+    """Render one server-sent event (or a keepalive comment)"""
+    if event_id is None:
+        return ": keepalive\n\n"
+    return f"id: {event_id}\nevent: job\ndata: {json.dumps(event)}\n\n"
\ No newline at end of file
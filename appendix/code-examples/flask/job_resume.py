@@ -1,23 +1,205 @@
 """Job Resume Functionality
 
-Resumes failed print jobs by retrieving failed label indices and creating
-a new high-priority job for only the failed labels.
+Resumes interrupted, cancelled or failed print jobs from their checkpoint
+(see job_checkpoint.py). The job's labels are already stored server-side in
+``job:{id}:data``, so callers only pass the job ID. Resuming puts the same
+job back at the head of its printer's pending list; the next worker skips
+every label up to the checkpoint. Both resume functions are idempotent:
+calling them again while the job is queued or running does nothing.
+
+Jobs stopped by an open printer circuit breaker, or suspended for a
+higher-priority job, are requeued the same way at the head of their tier,
+without waiting for anyone to resume them.
+
+Failed labels can also be reprinted as a new high-priority job.
 
 Source: F04-batch-print-queue.md - Example 16
 """
 
+import json
 from redis import Redis
 
+from job_events import queue_event
+from label_stream import read_labels
+from printer_leases import leases_key, pending_key
+
 redis_conn = Redis(host='localhost', port=6379)
 
+RESUMABLE_STATUSES = ('failed', 'cancelled', 'interrupted')
+RETRY_CLAIM_TTL = 60  # seconds a failed-label retry may take to enqueue
+
+# KEYS: job hash, pending list, printers:known; ARGV: job ID, printer
+RESUME_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if status ~= 'failed' and status ~= 'cancelled' and status ~= 'interrupted' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'queued')
+redis.call('HDEL', KEYS[1], 'runner', 'error')
+redis.call('LPUSH', KEYS[2], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[2])
+return 1
+"""
+
+# KEYS: job hash, pending list; ARGV: job ID
+INTERRUPT_SCRIPT = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if status == 'queued' or status == 'parked' or status == 'suspended' then
+    -- Taken by a worker that died before starting it, unless already requeued
+    if redis.call('LPOS', KEYS[2], ARGV[1]) then
+        return 0
+    end
+elseif status ~= 'printing' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', 'interrupted')
+redis.call('HDEL', KEYS[1], 'runner')
+return 1
+"""
+
+# KEYS: job hash, pending list, printers:known, leases zset
+# ARGV: job ID, printer, status
+PARK_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'printing' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[3])
+redis.call('HDEL', KEYS[1], 'runner')
+-- The CUPS job of a failed send was never finished, so it did not print
+if redis.call('HGET', KEYS[1], 'inflight_atomic') == '1' then
+    redis.call('HDEL', KEYS[1], 'inflight', 'inflight_atomic')
+end
+-- A job waiting in its pending list holds no slot
+redis.call('ZREM', KEYS[4], ARGV[1])
+redis.call('LPUSH', KEYS[2], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[2])
+return 1
+"""
+
+resume_script = redis_conn.register_script(RESUME_SCRIPT)
+interrupt_script = redis_conn.register_script(INTERRUPT_SCRIPT)
+park_script = redis_conn.register_script(PARK_SCRIPT)
+
+
+def resume_job(job_id):
+    """Requeue a stopped job to continue after its checkpoint
+    
+    Returns True if the job was requeued; the caller dispatches the printer.
+    """
+    job = redis_conn.hmget(f"job:{job_id}", 'printer', 'priority')
+    if job[0] is None:
+        return False
+    
+    printer_name, tier = job[0].decode(), job[1].decode()
+    resumed = resume_script(
+        keys=[f"job:{job_id}", pending_key(printer_name, tier), 'printers:known'],
+        args=[job_id, printer_name]
+    )
+    if resumed:
+        queue_event(redis_conn, job_id, printer_name, status='queued')
+    return bool(resumed)
+
+
+def recover_job(job_id):
+    """Resume a job whose worker stopped renewing its printer lease
+    
+    That is a job that was printing, or one a worker took from RQ or its
+    dispatch list and died before starting.
+    """
+    job = redis_conn.hmget(f"job:{job_id}", 'printer', 'priority')
+    if job[0] is None:
+        return False
+    
+    pending = pending_key(job[0].decode(), job[1].decode())
+    if interrupt_script(keys=[f"job:{job_id}", pending], args=[job_id]):
+        return resume_job(job_id)
+    return False
+
+
+def park_job(job_id, status='parked'):
+    """Requeue a running job at its checkpoint while its printer is down
+    
+    The job waits at the head of its tier as ``parked``; the dispatcher
+    admits it again once the printer's circuit breaker lets jobs through.
+    """
+    job = redis_conn.hmget(f"job:{job_id}", 'printer', 'priority')
+    if job[0] is None:
+        return False
+    
+    printer_name, tier = job[0].decode(), job[1].decode()
+    parked = park_script(
+        keys=[
+            f"job:{job_id}", pending_key(printer_name, tier), 'printers:known',
+            leases_key(printer_name)
+        ],
+        args=[job_id, printer_name, status]
+    )
+    if parked:
+        queue_event(redis_conn, job_id, printer_name, status=status)
+    return bool(parked)
+
+
+def suspend_job(job_id):
+    """Requeue a running job at its checkpoint so an urgent job can print
+    
+    It waits at the head of its tier as ``suspended`` and continues once
+    the higher-priority work has been admitted.
+    """
+    return park_job(job_id, status='suspended')
+
 
-def resume_failed_job(job_id, original_labels, enqueue_func):
-    """Resume a failed job by reprinting only failed labels"""
-    failed_indices = redis_conn.lrange(f"job:{job_id}:failed", 0, -1)
-    failed_labels = [original_labels[int(i)-1] for i in failed_indices]
+def cancel_job(job_id):
+    """Cancel a job; a running worker stops before its next chunk"""
+    job = redis_conn.hmget(f"job:{job_id}", 'printer', 'priority', 'status', 'shards')
+    if job[0] is None or job[2] == b'completed':
+        return False
+    
+    pipe = redis_conn.pipeline()
+    pipe.hset(f"job:{job_id}", 'status', 'cancelled')
+    pipe.lrem(pending_key(job[0].decode(), job[1].decode()), 0, job_id)
+    queue_event(pipe, job_id, job[0].decode(), status='cancelled')
+    pipe.execute()
+    
+    # A pooled job's labels are printed by its shards
+    for shard_id in job[3].decode().split(',') if job[3] else []:
+        cancel_job(shard_id)
+    return True
+
+
+def resume_failed_job(job_id, enqueue_func):
+    """Reprint only the failed labels of a job as a new high-priority job
+    
+    Returns None if there is nothing to reprint, or while another call is
+    still creating the retry job.
+    """
+    failed_indices = sorted({int(i) for i in redis_conn.lrange(f"job:{job_id}:failed", 0, -1)})
+    if not failed_indices:
+        return None
+    
+    # Claim the retry first so repeated calls return the same job; the
+    # claim expires if this call dies before the job exists
+    retry_key = f"job:{job_id}:retry"
+    if not redis_conn.set(retry_key, 'pending', nx=True, ex=RETRY_CLAIM_TTL):
+        retry_id = redis_conn.get(retry_key)
+        if retry_id in (None, b'pending'):
+            return None
+        return {'job_id': retry_id.decode(), 'status': 'queued'}
+    
+    job_data = json.loads(redis_conn.get(f"job:{job_id}:data"))
+    labels = job_data['labels'] if 'labels' in job_data else read_labels(redis_conn, job_id)
+    failed_labels = [labels[i - 1] for i in failed_indices]
+    
+    # Keep the printer config, pool and options of the original job; a
+    # retried shard is a job of its own, not another shard of its parent
+    retry_data = dict(job_data, labels=failed_labels)
+    retry_data.pop('parent', None)
+    retry_data.pop('first_label', None)
     
     # Create new high-priority job for failed labels
-    return enqueue_func(
-        {'labels': failed_labels, 'printer': job_data['printer']}, 
-        priority='high'
-    )
\ No newline at end of file
+    try:
+        result = enqueue_func(retry_data, priority='high')
+    except Exception:
+        redis_conn.delete(retry_key)
+        raise
+    redis_conn.set(retry_key, result['job_id'])
+    return result
\ No newline at end of file
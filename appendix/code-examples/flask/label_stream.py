@@ -0,0 +1,96 @@
+"""Streamed Label Upload
+
+Labels of a job submitted through ``POST /api/print/stream`` are not kept
+in ``job:{id}:data``. The API appends them to the Redis stream
+``job:{id}:labels`` as the NDJSON body arrives, and the worker reads that
+stream in batches while it prints. Printing starts as soon as the first
+chunk of labels is uploaded, and neither the API nor the worker holds the
+whole batch in memory.
+
+The stream ends with an entry carrying ``end`` (the label count), or
+``error`` if the upload was rejected part way through.
+
+Source: F04-batch-print-queue.md - Example 104
+"""
+
+import json
+
+STREAM_BATCH = 100  # labels per XADD pipeline / XREAD
+UPLOAD_TIMEOUT = 60  # seconds without a new label before the job fails
+
+
+class LabelUploadError(Exception):
+    """Raised when a streamed upload stalls or was aborted"""
+
+
+def labels_key(job_id):
+    return f"job:{job_id}:labels"
+
+
+def label_count(job_data):
+    """Number of labels in a job, streamed or not"""
+    if 'labels' in job_data:
+        return len(job_data['labels'])
+    return int(job_data['quantity'])
+
+
+class LabelStreamWriter:
+    """Appends uploaded labels to a job's stream, one pipeline per batch"""
+    
+    def __init__(self, redis_conn, job_id, batch_size=STREAM_BATCH):
+        self.redis_conn = redis_conn
+        self.job_id = job_id
+        self.batch_size = batch_size
+        self.count = 0
+        self._pipe = redis_conn.pipeline(transaction=False)
+        self._pending = 0
+    
+    def append(self, label):
+        self._pipe.xadd(labels_key(self.job_id), {'label': json.dumps(label)})
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        if self._pending:
+            self._pipe.execute()
+            self._pending = 0
+    
+    def close(self, error=None):
+        """End the stream; the job's quantity becomes the uploaded count"""
+        if error:
+            self._pipe.xadd(labels_key(self.job_id), {'error': error})
+        else:
+            self._pipe.xadd(labels_key(self.job_id), {'end': self.count})
+            self._pipe.hset(f"job:{self.job_id}", 'quantity', self.count)
+        self._pending += 1
+        self.flush()
+
+
+def stream_labels(redis_conn, job_id, timeout=UPLOAD_TIMEOUT):
+    """Yield a job's labels as they are uploaded"""
+    key = labels_key(job_id)
+    last_id = '0'
+    
+    while True:
+        entries = redis_conn.xread({key: last_id}, count=STREAM_BATCH, block=int(timeout * 1000))
+        if not entries:
+            raise LabelUploadError(f"No labels uploaded for job {job_id} in {timeout}s")
+        
+        for entry_id, fields in entries[0][1]:
+            last_id = entry_id
+            if b'error' in fields:
+                raise LabelUploadError(f"Upload aborted: {fields[b'error'].decode()}")
+            if b'end' in fields:
+                return
+            yield json.loads(fields[b'label'])
+
+
+def read_labels(redis_conn, job_id):
+    """All labels of a completed upload"""
+    return [
+        json.loads(fields[b'label'])
+        for _, fields in redis_conn.xrange(labels_key(job_id))
+        if b'label' in fields
+    ]
\ No newline at end of file
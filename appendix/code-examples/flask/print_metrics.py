@@ -0,0 +1,177 @@
+"""Print Pipeline Metrics
+
+Histograms and counters for the hot path of a print job, aggregated in
+Redis so every API, dispatcher and worker process adds to the same numbers:
+
+- ``print_queue_wait_seconds``: enqueue to the job's first chunk
+- ``print_flow_wait_seconds``: time a chunk waited for the printer to drain
+- ``print_label_submit_seconds``: chunk send time (retries included) per label
+- ``cups_submit_seconds``: one raw CUPS job submission
+- ``print_job_labels_per_second``: throughput of each completed job run
+- ``print_retries_total`` / ``print_labels_total``: per printer counters
+- ``print_queue_depth``: pending jobs per printer and tier, read at scrape
+
+Observations are buffered in process memory and written with HINCRBY in one
+pipeline at most every FLUSH_INTERVAL seconds, so the per-chunk cost is a
+dict update. Each metric is a hash ``metrics:{name}`` keyed by its label set;
+histograms keep one (non-cumulative) counter per bucket plus the sum.
+
+``/api/metrics`` renders everything in the Prometheus text format.
+
+Source: F04-batch-print-queue.md - Example 118
+"""
+
+import threading
+import time
+from collections import Counter
+
+from printer_leases import TIERS, pending_key
+
+FLUSH_INTERVAL = 1  # seconds
+
+WAIT_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+HISTOGRAMS = {
+    'print_queue_wait_seconds': ('Time from enqueue to the first chunk sent', WAIT_BUCKETS),
+    'print_flow_wait_seconds': ('Time a chunk waited for the printer backlog to drain', LATENCY_BUCKETS),
+    'print_label_submit_seconds': ('Chunk send time per label, retries included', LATENCY_BUCKETS),
+    'cups_submit_seconds': ('Raw CUPS job submission time', LATENCY_BUCKETS),
+    'print_job_labels_per_second': ('Labels per second of each completed job run', RATE_BUCKETS),
+}
+COUNTERS = {
+    'print_retries_total': 'Chunk sends retried after a transport error',
+    'print_labels_total': 'Labels handed to the printer',
+    'print_jobs_enqueued_total': 'Jobs accepted by the queue manager',
+}
+
+
+def metric_key(name):
+    return f"metrics:{name}"
+
+
+def format_labels(labels):
+    """Prometheus label set, e.g. printer="zebra1",tier="default" """
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class PrintMetrics:
+    """In-process buffer of metric increments, flushed to Redis hashes"""
+    
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+    
+    def observe(self, name, value, **labels):
+        """Add one histogram observation"""
+        buckets = HISTOGRAMS[name][1]
+        le = next((str(bound) for bound in buckets if value <= bound), '+Inf')
+        field = format_labels(labels)
+        with self._lock:
+            counts = self._counts.setdefault(name, Counter())
+            counts[f"{field}|{le}"] += 1
+            counts[f"{field}|sum"] += value
+    
+    def inc(self, name, amount=1, **labels):
+        """Increment a counter"""
+        with self._lock:
+            self._counts.setdefault(name, Counter())[format_labels(labels)] += amount
+    
+    def queue_writes(self, pipe):
+        """Queue the buffered increments on a pipeline and clear the buffer"""
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            self._last_flush = time.monotonic()
+        
+        for name, fields in counts.items():
+            for field, amount in fields.items():
+                if isinstance(amount, float):
+                    pipe.hincrbyfloat(metric_key(name), field, amount)
+                else:
+                    pipe.hincrby(metric_key(name), field, amount)
+        return bool(counts)
+    
+    def flush(self, redis_conn):
+        """Write buffered increments in one round trip"""
+        pipe = redis_conn.pipeline(transaction=False)
+        if self.queue_writes(pipe):
+            pipe.execute()
+    
+    async def flush_async(self, redis_conn):
+        """flush() for redis.asyncio connections"""
+        pipe = redis_conn.pipeline(transaction=False)
+        if self.queue_writes(pipe):
+            await pipe.execute()
+    
+    def is_due(self):
+        return time.monotonic() - self._last_flush >= self.flush_interval
+    
+    def flush_if_due(self, redis_conn):
+        if self.is_due():
+            self.flush(redis_conn)
+
+
+def render_metrics(redis_conn):
+    """All metrics in the Prometheus text exposition format"""
+    printers = sorted(name.decode() for name in redis_conn.smembers('printers:known'))
+    
+    pipe = redis_conn.pipeline(transaction=False)
+    for name in list(HISTOGRAMS) + list(COUNTERS):
+        pipe.hgetall(metric_key(name))
+    for printer_name in printers:
+        for tier in TIERS:
+            pipe.llen(pending_key(printer_name, tier))
+    pipe.hgetall('cups:pool:stats')
+    results = pipe.execute()
+    
+    lines = []
+    for name, fields in zip(HISTOGRAMS, results):
+        lines.extend(_render_histogram(name, fields))
+    for name, fields in zip(COUNTERS, results[len(HISTOGRAMS):]):
+        lines.append(f"# HELP {name} {COUNTERS[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for field, value in sorted(fields.items()):
+            lines.append(f"{name}{{{field.decode()}}} {value.decode()}")
+    
+    depths = results[len(HISTOGRAMS) + len(COUNTERS):-1]
+    lines.append('# HELP print_queue_depth Jobs waiting for a printer slot')
+    lines.append('# TYPE print_queue_depth gauge')
+    for idx, depth in enumerate(depths):
+        printer_name, tier = printers[idx // len(TIERS)], TIERS[idx % len(TIERS)]
+        lines.append(f"print_queue_depth{{{format_labels({'printer': printer_name, 'tier': tier})}}} {depth}")
+    
+    # CUPS connection pool totals (see cups_pool.py)
+    lines.append('# HELP cups_pool_stats_total CUPS connection pool counters (connect_ms in milliseconds)')
+    lines.append('# TYPE cups_pool_stats_total counter')
+    for stat, value in sorted(results[-1].items()):
+        lines.append(f"cups_pool_stats_total{{stat=\"{stat.decode()}\"}} {value.decode()}")
+    
+    return '\n'.join(lines) + '\n'
+
+
+def _render_histogram(name, fields):
+    series = {}
+    for field, value in fields.items():
+        labels, _, le = field.decode().rpartition('|')
+        series.setdefault(labels, {})[le] = float(value)
+    
+    lines = [f"# HELP {name} {HISTOGRAMS[name][0]}", f"# TYPE {name} histogram"]
+    for labels, counts in sorted(series.items()):
+        sep = ',' if labels else ''
+        cumulative = 0
+        for le in [str(bound) for bound in HISTOGRAMS[name][1]] + ['+Inf']:
+            cumulative += int(counts.get(le, 0))
+            lines.append(f"{name}_bucket{{{labels}{sep}le=\"{le}\"}} {cumulative}")
+        lines.append(f"{name}_sum{{{labels}}} {counts.get('sum', 0)}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+    return lines
+
+
+metrics = PrintMetrics()
\ No newline at end of file
@@ -1,73 +1,338 @@
 """Print Worker for Batch Processing
 
 RQ worker that processes print jobs from the queue, handles label printing
-via CUPS, tracks progress, and manages retries for failed labels.
+via CUPS or a direct raw TCP transport, tracks progress, and manages retries
+for failed labels.
+
+Labels are coalesced into chunks of ``chunk_size`` labels and each chunk is
+submitted as a single raw CUPS job. Chunks are fixed size, so label ``n``
+always lives in chunk ``(n - 1) // chunk_size``; progress and the
+``job:{id}:failed`` list stay per label.
+
+Each chunk is checkpointed (see job_checkpoint.py), so a resumed job starts
+at the label after the last chunk handed to the printer.
+
+At each chunk boundary the worker yields its printer slot if a job of a
+higher tier is waiting; the batch is suspended at its checkpoint and
+continues once the urgent job has been admitted.
+
+A printer that keeps failing opens its circuit breaker (see
+printer_breaker.py); the job is parked at its checkpoint instead of
+failing every remaining label.
+
+CUPS connections are reused across jobs (see cups_pool.py); run the RQ
+workers with ``--worker-class rq.SimpleWorker`` so the pool outlives a job.
+
+A run of a job is a PrintJobRun; the asyncio worker subclasses it, so
+both workers share the chunk and checkpoint handling.
+
+Queue wait, flow-control waits, per-label submit time, retries and job
+throughput are recorded in print_metrics.py. Each run's throughput also
+feeds the printer's rate for completion estimates (see job_eta.py).
 
 Source: F04-batch-print-queue.md - Example 15
 """
 
-import cups
 import time
+from itertools import islice
 from redis import Redis
 import logging
 
+from cups_pool import cups_pool
+from flow_control import get_flow_controller
+from graphic_cache import GraphicCache
+from job_checkpoint import JobCheckpoint, JobSuperseded
+from job_eta import record_rate
+from job_resume import park_job, suspend_job
+from label_stream import label_count, stream_labels
+from print_metrics import metrics
+from printer_breaker import PrinterBreaker, PrinterUnavailable
+from printer_leases import JobPreempted, PrinterLeases
+from printer_status import status_cache
+from printer_transport import PrintTransportError, get_transport
+from progress_reporter import ProgressReporter
+from queue_manager import PrintQueueManager
+from stored_formats import download_format, expand_labels
+
 redis_conn = Redis(host='localhost', port=6379)
+leases = PrinterLeases(redis_conn)
+graphics = GraphicCache(redis_conn)
+breaker = PrinterBreaker(redis_conn)
 _logger = logging.getLogger(__name__)
 
+DEFAULT_CHUNK_SIZE = 50
+
 
 def process_batch_print(job_id, job_data):
     """Process a batch print job with progress tracking"""
-    printer_name = job_data['printer']
-    labels = job_data['labels']
+    # Streamed uploads are read from Redis while printing
+    source = stream_labels(redis_conn, job_id) if job_data.get('stream') else None
+    PrintJobRun(redis_conn, job_id, job_data, source).run()
+
+
+class PrintJobRun:
+    """One execution of a batch job, from claiming it to freeing its slot
     
-    # Update status
-    redis_conn.hset(f"job:{job_id}", 'status', 'printing')
+    Chunk bookkeeping (metrics, failed ranges, resending the stored format
+    and graphics after a failure) lives in the underscore helpers, which the
+    asyncio worker's AsyncPrintJobRun shares; it only awaits the I/O.
+    """
     
-    # Initialize CUPS
-    conn = cups.Connection()
+    progress_class = ProgressReporter
+    checkpoint_class = JobCheckpoint
     
-    try:
-        for idx, label in enumerate(labels, 1):
-            # Update progress
-            redis_conn.hset(f"job:{job_id}", 'current_label', idx)
-            
-            # Print with retry
-            success = print_single_label(conn, printer_name, label['zpl_code'])
-            
-            if not success:
-                redis_conn.rpush(f"job:{job_id}:failed", idx)
-                _logger.error(f"Failed to print label {idx} for job {job_id}")
+    def __init__(self, redis_conn, job_id, job_data, source=None):
+        self.redis_conn = redis_conn
+        self.job_id = job_id
+        self.job_data = job_data
+        self.printer_name = job_data['printer']
+        self.template = job_data.get('template')
+        self.labels = expand_labels(job_data, source)
+        self.chunk_size = job_data.get('chunk_size', DEFAULT_CHUNK_SIZE)
+        self.progress = self.progress_class(
+            redis_conn, job_id, printer_name=self.printer_name, parent=job_data.get('parent')
+        )
+        self.checkpoint = self.checkpoint_class(redis_conn, job_id)
+        # CUPS connects vs. reuses for this job (cups_* fields)
+        self.cups_usage = cups_pool.track_job()
+        self.start = 1
+        self.tier = 'default'
+        self.format_stored = False
+        self.taken_over = False
+        self.sent = 0
+    
+    def run(self):
+        try:
+            self.claim()
+            for chunk in iter_label_chunks(self.labels, self.chunk_size, self.start):
+                self.send_chunk(chunk)
+            self.complete()
+        
+        except JobSuperseded as e:
+            # Cancelled, or resumed elsewhere; that run owns the lease now
+            self.taken_over = self.checkpoint.taken_over()
+            _logger.warning(f"Stopped job {self.job_id}: {e}")
+        
+        except PrinterUnavailable as e:
+            # Wait at the head of the queue; the sweep probes the printer
+            self.progress.flush()
+            park_job(self.job_id)
+            _logger.warning(f"Parked job {self.job_id}: {e}")
+        
+        except JobPreempted as e:
+            # Requeued at the head of its tier; close() admits the urgent job
+            self.progress.flush()
+            suspend_job(self.job_id)
+            _logger.info(f"Suspended job {self.job_id}: {e}")
+        
+        except Exception as e:
+            self.progress.set_status('failed', error=str(e))
+            raise
+        
+        finally:
+            self.close()
+    
+    def claim(self):
+        """Take the job and its printer slot, and connect to the printer"""
+        # The slot was leased at dispatch; keep it from expiring while we start
+        leases.renew(self.printer_name, self.job_id)
+        # Continue after the last chunk an earlier run handed to the printer
+        self.start = self.checkpoint.claim()
+        job = self.redis_conn.hmget(f"job:{self.job_id}", 'priority', 'queued_at')
+        self.progress.set_status('printing', chunk_size=self._status_chunk_size())
+        self._started(job)
+        
+        # CUPS queue or pooled raw socket, per printer configuration
+        self.transport = get_transport(self.printer_name)
+        self.flow = get_flow_controller(
+            self.printer_name, self.transport,
+            heartbeat=lambda: leases.renew(self.printer_name, self.job_id)
+        )
+    
+    def send_chunk(self, chunk):
+        """Send one chunk and move the checkpoint past it"""
+        # Give the slot to urgent work waiting for this printer
+        if chunk['first'] > self.start and leases.should_yield(self.printer_name, self.tier):
+            raise JobPreempted(f"Higher-priority job waiting for {self.printer_name}")
+        
+        # Park at the checkpoint while the printer is known to be down
+        state = breaker.state(self.printer_name)
+        self._check_breaker(state)
+        
+        # Back off only while the printer is backing up
+        waited = time.monotonic()
+        self.flow.wait()
+        self._flow_waited(waited)
+        
+        zpl = self._prepare(chunk)
+        
+        # Send whole chunk as one job, with retry; a chunk whose format or
+        # graphics could not be stored fails without being sent
+        self.checkpoint.mark(chunk['first'], chunk['last'], self.transport.ATOMIC_JOBS)
+        submitted = time.monotonic()
+        success = zpl is not None and print_single_label(
+            self.transport, zpl, self._title(chunk), breaker=breaker, printer_name=self.printer_name
+        )
+        failed = self._chunk_sent(chunk, success, submitted)
+        
+        if success and state == 'half_open':
+            # First chunk after recovery closed the breaker: let the parked jobs follow
+            PrintQueueManager().dispatch(self.printer_name)
+        if not success:
+            # The printer may have restarted and lost stored graphics
+            graphics.invalidate(self.printer_name)
+            status_cache.refresh_printer(self.printer_name)
+        
+        self.checkpoint.ack(chunk['last'], failed)
+        
+        # Update progress (buffered, flushed every 250 ms / 20 labels)
+        self.progress.update(chunk['last'], labels=self._size(chunk))
+        leases.renew(self.printer_name, self.job_id)
+        metrics.flush_if_due(self.redis_conn)
+    
+    def _prepare(self, chunk):
+        """Store what the chunk recalls on the printer; None if that failed
+        
+        The format and graphic downloads are retried and count towards the
+        breaker like the chunk itself.
+        """
+        try:
+            # Compact jobs: store the template on the printer (^DF) before
+            # the first chunk, and again after a failure in case it restarted
+            if self.template and not self.format_stored:
+                zpl = graphics.prepare(
+                    self.printer_name, self.transport, self.template['zpl'], send=self._download
+                )
+                download_format(self.transport, dict(self.template, zpl=zpl), send=self._download)
+                self.format_stored = True
             
-            time.sleep(0.1)  # Prevent printer overload
+            # Embedded graphics go to the printer once, labels recall them
+            return graphics.prepare(self.printer_name, self.transport, chunk['zpl'], send=self._download)
+        except PrintTransportError as e:
+            _logger.error(f"Could not prepare labels {chunk['first']}-{chunk['last']}: {e}")
+            return None
+    
+    def _download(self, zpl_code, title):
+        """Send a download with the chunk's retries and breaker"""
+        if not print_single_label(
+            self.transport, zpl_code, title, breaker=breaker, printer_name=self.printer_name
+        ):
+            raise PrintTransportError(f"{title} was not stored on {self.printer_name}")
+    
+    def complete(self):
+        self.progress.set_status('completed')
+        elapsed = self._finished()
+        if elapsed:
+            record_rate(self.redis_conn, self.printer_name, self.sent, elapsed)
+    
+    def close(self):
+        """Free the printer slot and start the next job waiting for it"""
+        if not self.taken_over:
+            leases.release(self.printer_name, self.job_id)
+        PrintQueueManager().dispatch(self.printer_name)
+        cups_pool.record_job(self.redis_conn, self.job_id, self.cups_usage)
+        metrics.flush(self.redis_conn)
+    
+    def _status_chunk_size(self):
+        return self.chunk_size or label_count(self.job_data)
+    
+    def _started(self, job):
+        """Note the job's tier and how long it waited in the queue"""
+        self.tier = job[0].decode()
+        if self.start == 1 and job[1]:
+            metrics.observe(
+                'print_queue_wait_seconds', time.time() - float(job[1]),
+                printer=self.printer_name, tier=self.tier
+            )
+        self.run_started = time.monotonic()
+    
+    def _check_breaker(self, state):
+        if state == 'open':
+            raise PrinterUnavailable(f"Printer {self.printer_name} is offline")
+    
+    def _flow_waited(self, waited):
+        metrics.observe('print_flow_wait_seconds', time.monotonic() - waited, printer=self.printer_name)
+    
+    def _title(self, chunk):
+        return f"Job {self.job_id} labels {chunk['first']}-{chunk['last']}"
+    
+    def _size(self, chunk):
+        return chunk['last'] - chunk['first'] + 1
+    
+    def _chunk_sent(self, chunk, success, submitted):
+        """Record a chunk's outcome; returns its failed labels"""
+        labels_in_chunk = self._size(chunk)
+        metrics.observe(
+            'print_label_submit_seconds', (time.monotonic() - submitted) / labels_in_chunk,
+            printer=self.printer_name
+        )
+        if success:
+            metrics.inc('print_labels_total', labels_in_chunk, printer=self.printer_name)
+            self.sent += labels_in_chunk
+            return ()
         
-        # Mark complete
-        redis_conn.hset(f"job:{job_id}", 'status', 'completed')
+        # The stored format is gone too if the printer restarted
+        self.format_stored = False
+        _logger.error(
+            f"Failed to print labels {chunk['first']}-{chunk['last']} "
+            f"for job {self.job_id}"
+        )
+        # Every label in the chunk shares the chunk's fate
+        return range(chunk['first'], chunk['last'] + 1)
+    
+    def _finished(self):
+        """Record the run's throughput; returns its duration if labels were sent"""
+        if not self.sent:
+            return None
+        elapsed = time.monotonic() - self.run_started
+        metrics.observe('print_job_labels_per_second', self.sent / elapsed, printer=self.printer_name)
+        return elapsed
+
+
+def iter_label_chunks(labels, chunk_size=DEFAULT_CHUNK_SIZE, start=1):
+    """Yield labels grouped into raw ZPL streams of chunk_size labels
+    
+    A chunk_size of 0 or None sends the whole batch as one stream. Label
+    indices in the yielded chunks are 1-based, matching current_label.
+    Labels before ``start`` are skipped; chunk boundaries stay aligned to
+    the full batch, so a resumed job's first chunk may be short.
+    """
+    chunk = []
+    first = start
+    
+    for idx, label in enumerate(islice(labels, start - 1, None), start):
+        chunk.append(label['zpl_code'])
         
-    except Exception as e:
-        redis_conn.hset(f"job:{job_id}", 'status', 'failed')
-        redis_conn.hset(f"job:{job_id}", 'error', str(e))
-        raise
+        if chunk_size and idx % chunk_size == 0:
+            yield {'first': first, 'last': idx, 'zpl': '\n'.join(chunk)}
+            chunk = []
+            first = idx + 1
+    
+    if chunk:
+        yield {'first': first, 'last': first + len(chunk) - 1, 'zpl': '\n'.join(chunk)}
 
 
-def print_single_label(conn, printer, zpl_code, max_retries=3):
-    """Print single label with retry logic"""
-    import tempfile
-    import os
+def print_single_label(transport, zpl_code, title="Label", max_retries=3,
+                       breaker=None, printer_name=None):
+    """Print single label (or chunk of labels) with retry logic
     
+    With a breaker, every failed attempt counts towards the printer's
+    circuit breaker, and PrinterUnavailable is raised as soon as it opens
+    instead of retrying a dead printer.
+    """
     for attempt in range(max_retries):
         try:
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.zpl', delete=False) as f:
-                f.write(zpl_code)
-                temp_path = f.name
+            transport.send(zpl_code, title)
+            if breaker:
+                # Any send that gets through resets the failure count
+                breaker.record_success(printer_name)
+            return True
             
-            try:
-                conn.printFile(printer, temp_path, "Label", {'raw': 'true'})
-                return True
-            finally:
-                os.unlink(temp_path)
-                
-        except cups.IPPError as e:
+        except PrintTransportError as e:
+            if breaker and breaker.record_failure(printer_name) == 'open':
+                raise PrinterUnavailable(f"Printer {printer_name} is offline: {e}") from e
             if attempt < max_retries - 1:
+                metrics.inc('print_retries_total', printer=printer_name or 'unknown')
                 time.sleep(2 ** attempt)  # Exponential backoff
                 continue
             else:
@@ -0,0 +1,150 @@
+"""Printer Circuit Breaker
+
+Per-printer circuit breaker shared through Redis, so workers stop spending
+retries and backoff on a printer that is down:
+
+- ``closed``: printing normally; failed sends are counted, a successful
+  send after a failure resets the count
+- ``open``: FAILURE_THRESHOLD failed sends in a row. Sends fail fast,
+  running jobs park at their checkpoint and the dispatcher admits nothing
+  for the printer
+- ``half_open``: a probe reached the printer. One job is admitted; its
+  first successful chunk closes the breaker, a failure opens it again
+
+The dispatcher sweep probes open printers once their retry time has passed
+(RETRY_AFTER, doubling after each failed probe up to MAX_RETRY_AFTER) and
+dispatches the parked jobs when a probe succeeds. A healthy printer has no
+breaker hash, so the per-chunk check is one HGET and every successful send
+only checks that the hash does not exist.
+
+Source: F04-batch-print-queue.md - Example 114
+"""
+
+import socket
+import time
+
+from printer_registry import get_printer_config, is_network_printer
+from printer_status import status_cache
+from printer_transport import RAW_PORT
+
+FAILURE_THRESHOLD = 5  # failed sends in a row
+RETRY_AFTER = 15  # seconds before the first probe
+MAX_RETRY_AFTER = 300  # seconds
+PROBE_TIMEOUT = 3  # seconds
+
+OPEN_KEY = 'breakers:open'
+
+# KEYS: breaker hash, open zset
+# ARGV: now, printer, threshold, retry after, max retry after, probe failed
+FAILURE_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+if state == 'open' and ARGV[6] ~= '1' then
+    return state
+end
+local failures = redis.call('HINCRBY', KEYS[1], 'failures', 1)
+if state == 'closed' and failures < tonumber(ARGV[3]) then
+    return state
+end
+local trips = redis.call('HINCRBY', KEYS[1], 'trips', 1)
+local delay = math.min(tonumber(ARGV[4]) * 2 ^ (trips - 1), tonumber(ARGV[5]))
+local retry_at = tonumber(ARGV[1]) + delay
+redis.call('HSET', KEYS[1], 'state', 'open', 'retry_at', retry_at)
+redis.call('ZADD', KEYS[2], retry_at, ARGV[2])
+return 'open'
+"""
+
+# KEYS: breaker hash, open zset; ARGV: printer
+SUCCESS_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state')
+if state == 'open' or redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+if state == 'half_open' then
+    return 1
+end
+return 0
+"""
+
+
+class PrinterUnavailable(Exception):
+    """Raised when the printer's circuit breaker is open"""
+
+
+def breaker_key(printer_name):
+    return f"printer:{printer_name}:breaker"
+
+
+class PrinterBreaker:
+    """Closed / open / half-open breaker per printer, shared through Redis"""
+    
+    def __init__(self, redis_conn, threshold=FAILURE_THRESHOLD):
+        self.redis_conn = redis_conn
+        self.threshold = threshold
+        self._failure = redis_conn.register_script(FAILURE_SCRIPT)
+        self._success = redis_conn.register_script(SUCCESS_SCRIPT)
+    
+    def state(self, printer_name):
+        state = self.redis_conn.hget(breaker_key(printer_name), 'state')
+        return state.decode() if state else 'closed'
+    
+    def record_failure(self, printer_name, probe=False):
+        """Count a failed send (or probe); returns the new state"""
+        state = self._failure(
+            keys=[breaker_key(printer_name), OPEN_KEY],
+            args=self._failure_args(printer_name, probe)
+        )
+        return state.decode()
+    
+    def record_success(self, printer_name):
+        """Close the breaker after a successful send; True if it was half-open"""
+        return bool(self._success(keys=[breaker_key(printer_name), OPEN_KEY], args=[printer_name]))
+    
+    def due_probes(self):
+        """Open printers whose retry time has passed"""
+        return [name.decode() for name in self.redis_conn.zrangebyscore(OPEN_KEY, '-inf', time.time())]
+    
+    def half_open(self, printer_name):
+        """Let one job test the printer after a successful probe"""
+        pipe = self.redis_conn.pipeline()
+        pipe.hset(breaker_key(printer_name), 'state', 'half_open')
+        pipe.zrem(OPEN_KEY, printer_name)
+        pipe.execute()
+    
+    def _failure_args(self, printer_name, probe):
+        return [time.time(), printer_name, self.threshold, RETRY_AFTER, MAX_RETRY_AFTER, int(probe)]
+
+
+class AsyncPrinterBreaker(PrinterBreaker):
+    """PrinterBreaker for redis.asyncio connections in the asyncio worker"""
+    
+    async def state(self, printer_name):
+        state = await self.redis_conn.hget(breaker_key(printer_name), 'state')
+        return state.decode() if state else 'closed'
+    
+    async def record_failure(self, printer_name, probe=False):
+        state = await self._failure(
+            keys=[breaker_key(printer_name), OPEN_KEY],
+            args=self._failure_args(printer_name, probe)
+        )
+        return state.decode()
+    
+    async def record_success(self, printer_name):
+        return bool(await self._success(keys=[breaker_key(printer_name), OPEN_KEY], args=[printer_name]))
+
+
+def probe_printer(printer_name):
+    """Cheap reachability check: TCP connect for network printers, CUPS state otherwise"""
+    config = get_printer_config(printer_name)
+    
+    if is_network_printer(config):
+        port = int(config.get('raw_port') or RAW_PORT)
+        try:
+            socket.create_connection((config['ip_address'], port), PROBE_TIMEOUT).close()
+            return True
+        except OSError:
+            return False
+    
+    status = status_cache.refresh_printer(printer_name)
+    return status['status'] in ('idle', 'printing') and status['accepting']
\ No newline at end of file
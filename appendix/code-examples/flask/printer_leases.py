@@ -0,0 +1,149 @@
+"""Printer Slot Leases
+
+Redis-backed leases that cap how many jobs print on one printer at a time.
+Each printer has a sorted set of job IDs scored by lease expiry; a worker
+renews its lease while printing, so slots held by a dead worker expire on
+their own. A job that was admitted but is still waiting in its RQ queue
+or ``dispatch:{tier}`` list keeps its lease, however long it waits. Once
+a worker has taken it, the worker renews the lease; if that worker dies
+before starting the job, the lease expires and the job is recovered like
+any other (see job_resume.recover_job). Admitting the next pending job and taking its lease happens in
+one Lua script, so two dispatchers can never overfill a printer.
+
+Running jobs check for waiting higher-tier work at every chunk boundary
+and yield their slot to it (see print_worker.py).
+
+Source: F04-batch-print-queue.md - Example 92
+"""
+
+import time
+
+LEASE_TTL = 60  # seconds; renewed after every chunk
+PREEMPT_LOCK_MS = 2000  # one job yields per urgent job within this window
+
+TIERS = ('high', 'default', 'low')
+
+# KEYS: leases zset, pending lists (high, default, low)
+# ARGV: now, ttl, concurrency limit
+# Expired leases still count until reclaim_expired recovers their jobs
+ADMIT_NEXT_SCRIPT = """
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return false
+end
+for i = 2, #KEYS do
+    local job_id = redis.call('LPOP', KEYS[i])
+    if job_id then
+        redis.call('ZADD', KEYS[1], tonumber(ARGV[1]) + tonumber(ARGV[2]), job_id)
+        return {job_id, i - 2}
+    end
+end
+return false
+"""
+
+# KEYS: leases zset; ARGV: now, ttl
+# The RQ queue and dispatch list of each job's tier are read by name
+RECLAIM_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local reclaimed = {}
+for _, job_id in ipairs(expired) do
+    local tier = redis.call('HGET', 'job:' .. job_id, 'priority') or 'default'
+    if redis.call('LPOS', 'rq:queue:' .. tier, job_id)
+            or redis.call('LPOS', 'dispatch:' .. tier, job_id) then
+        -- Admitted, but no worker has taken it yet to renew the lease
+        redis.call('ZADD', KEYS[1], tonumber(ARGV[1]) + tonumber(ARGV[2]), job_id)
+    else
+        redis.call('ZREM', KEYS[1], job_id)
+        table.insert(reclaimed, job_id)
+    end
+end
+return reclaimed
+"""
+
+# KEYS: preempt lock, pending lists of higher tiers; ARGV: lock ms
+PREEMPT_SCRIPT = """
+for i = 2, #KEYS do
+    if redis.call('LLEN', KEYS[i]) > 0 then
+        if redis.call('SET', KEYS[1], 1, 'NX', 'PX', ARGV[1]) then
+            return 1
+        end
+        return 0
+    end
+end
+return 0
+"""
+
+
+class JobPreempted(Exception):
+    """Raised to suspend a job so higher-priority work can use its slot"""
+
+
+def pending_key(printer_name, tier):
+    return f"printer:{printer_name}:pending:{tier}"
+
+
+def leases_key(printer_name):
+    return f"printer:{printer_name}:leases"
+
+
+def preempt_keys(printer_name, tier):
+    """Keys for PREEMPT_SCRIPT: the printer's lock, then every tier above ``tier``"""
+    higher = TIERS[:TIERS.index(tier)] if tier in TIERS else ()
+    return [f"printer:{printer_name}:preempt"] + [pending_key(printer_name, t) for t in higher]
+
+
+class PrinterLeases:
+    """Per-printer concurrency slots held as expiring Redis leases"""
+    
+    def __init__(self, redis_conn, ttl=LEASE_TTL):
+        self.redis_conn = redis_conn
+        self.ttl = ttl
+        self._admit_next = redis_conn.register_script(ADMIT_NEXT_SCRIPT)
+        self._preempt = redis_conn.register_script(PREEMPT_SCRIPT)
+        self._reclaim = redis_conn.register_script(RECLAIM_SCRIPT)
+    
+    def admit_next(self, printer_name, limit):
+        """Lease a slot to the highest-priority pending job, if one is free
+        
+        Returns (job_id, tier) or None when the printer is full or idle.
+        """
+        keys = [leases_key(printer_name)] + [pending_key(printer_name, t) for t in TIERS]
+        result = self._admit_next(keys=keys, args=[time.time(), self.ttl, limit])
+        if not result:
+            return None
+        job_id, tier_index = result
+        return job_id.decode(), TIERS[tier_index]
+    
+    def renew(self, printer_name, job_id):
+        """Extend a lease held by a running job"""
+        self.redis_conn.zadd(
+            leases_key(printer_name), {job_id: time.time() + self.ttl}, xx=True
+        )
+    
+    def release(self, printer_name, job_id):
+        """Free the job's slot on the printer"""
+        self.redis_conn.zrem(leases_key(printer_name), job_id)
+    
+    def reclaim_expired(self, printer_name):
+        """Drop leases whose worker stopped renewing them, returning their job IDs
+        
+        Leases of admitted jobs still waiting in RQ or a dispatch list are
+        extended instead, so a job that waits long for a worker keeps its slot.
+        """
+        expired = self._reclaim(keys=[leases_key(printer_name)], args=[time.time(), self.ttl])
+        return [job_id.decode() for job_id in expired]
+    
+    def should_yield(self, printer_name, tier):
+        """True if a higher-tier job is waiting for this printer
+        
+        Pending jobs only wait while every slot is leased, so the caller
+        gives up its slot. The short lock makes one running job yield per
+        check window rather than all of them.
+        """
+        keys = preempt_keys(printer_name, tier)
+        if len(keys) == 1:
+            return False
+        return bool(self._preempt(keys=keys, args=[PREEMPT_LOCK_MS]))
+    
+    def active(self, printer_name):
+        """Number of unexpired leases on the printer"""
+        return self.redis_conn.zcount(leases_key(printer_name), time.time(), '+inf')
\ No newline at end of file
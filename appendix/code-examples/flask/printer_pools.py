@@ -0,0 +1,226 @@
+"""Printer Pools
+
+Splits a large job across a pool of interchangeable printers (same model
+and labels, e.g. several Zebras in one packing area), so wall-clock time
+drops with the number of printers. Odoo sends the pool's printers with the
+job; the queue manager cuts the labels into contiguous box ranges, one per
+healthy printer, and queues each range as a shard job (``{job_id}.{n}``)
+on its printer. Shards print, checkpoint and resume like any other job.
+
+The original job ID stays the handle for the whole batch. Each shard
+progress flush runs ROLLUP_SCRIPT in the same pipeline, which sums the
+shards into the parent's ``status``, ``current_label`` and ``failed``
+fields and publishes a job event for the parent.
+
+The dispatcher sweep rebalances: a shard that is parked (breaker open) or
+has made no progress for STALL_AFTER seconds is cancelled at its
+checkpoint, and its remaining labels move to an idle healthy printer in
+the pool. A chunk the old printer may still be printing is flagged in
+``job:{id}:uncertain`` instead of moving with them.
+
+Source: F04-batch-print-queue.md - Example 116
+"""
+
+import json
+import math
+import time
+
+from job_events import EVENTS_KEY, EVENTS_MAXLEN
+from job_resume import cancel_job
+from printer_breaker import breaker_key
+from printer_leases import TIERS, pending_key
+from printer_registry import get_printer_config
+from printer_status import status_cache
+
+MIN_SHARD_LABELS = 100  # smaller jobs print on one printer
+STALL_AFTER = 60  # seconds without progress before a shard is moved
+
+SHARDED_KEY = 'pools:sharded'
+
+# KEYS: parent hash, events stream, sharded set
+# ARGV: parent ID, shard ID, now, events maxlen
+# Shard hashes are listed in the parent's ``shards`` field
+ROLLUP_SCRIPT = """
+redis.call('HSET', 'job:' .. ARGV[2], 'progress_at', ARGV[3])
+local parent = redis.call('HMGET', KEYS[1], 'shards', 'status', 'current_label', 'printer')
+if not parent[1] or parent[2] == 'cancelled' then
+    return 0
+end
+local total, printed, failed, done, dead, active = 0, 0, 0, 0, 0, 0
+for shard in string.gmatch(parent[1], '[^,]+') do
+    total = total + 1
+    local key = 'job:' .. shard
+    local s = redis.call('HMGET', key, 'status', 'current_label', 'moved_to')
+    printed = printed + tonumber(s[2] or '0')
+    failed = failed + redis.call('LLEN', key .. ':failed')
+    if s[3] or s[1] == 'completed' then
+        done = done + 1
+    elseif s[1] == 'failed' or s[1] == 'cancelled' then
+        dead = dead + 1
+    elseif s[1] ~= 'queued' and s[1] ~= 'parked' then
+        active = active + 1
+    end
+end
+local status = 'queued'
+if done == total then
+    status = 'completed'
+elseif done + dead == total then
+    status = 'failed'
+elseif active > 0 or done > 0 then
+    status = 'printing'
+end
+redis.call('HSET', KEYS[1], 'status', status, 'current_label', printed, 'failed', failed)
+if status == 'completed' or status == 'failed' then
+    redis.call('SREM', KEYS[3], ARGV[1])
+end
+if status ~= parent[2] or tostring(printed) ~= parent[3] then
+    redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[4], '*', 'job_id', ARGV[1],
+        'printer', parent[4] or '', 'status', status, 'current_label', printed)
+end
+return 1
+"""
+
+
+def pool_key(pool_name):
+    return f"pool:{pool_name}:printers"
+
+
+def queue_rollup(pipe, parent_id, shard_id):
+    """Queue the parent's progress rollup after a shard's progress writes"""
+    pipe.eval(
+        ROLLUP_SCRIPT, 3, f"job:{parent_id}", EVENTS_KEY, SHARDED_KEY,
+        parent_id, shard_id, time.time(), EVENTS_MAXLEN
+    )
+
+
+def healthy_printers(redis_conn, printers):
+    """Pool printers that are neither stopped in CUPS nor behind an open breaker"""
+    healthy = []
+    for printer_name in sorted(printers):
+        if redis_conn.hget(breaker_key(printer_name), 'state') == b'open':
+            continue
+        # Raw network printers may have no CUPS queue at all
+        status = status_cache.get(printer_name)
+        if status and status['status'] in ('stopped', 'error'):
+            continue
+        healthy.append(printer_name)
+    return healthy
+
+
+def plan_shards(label_count, printers, chunk_size=None):
+    """Contiguous (printer, first, last) label ranges, one per printer
+    
+    Returns an empty list when the job is too small to split. Ranges are
+    rounded up to whole chunks so only the last shard ends on a short one.
+    """
+    count = min(len(printers), label_count // MIN_SHARD_LABELS)
+    if count < 2:
+        return []
+    
+    per_shard = math.ceil(label_count / count)
+    if chunk_size:
+        per_shard = math.ceil(per_shard / chunk_size) * chunk_size
+    
+    ranges = []
+    for printer_name, first in zip(printers, range(1, label_count + 1, per_shard)):
+        ranges.append((printer_name, first, min(first + per_shard - 1, label_count)))
+    return ranges
+
+
+def shard_job(job_id, job_data, ranges):
+    """Job data for each shard of a pooled job, as (shard_id, shard_data)"""
+    pool = job_data['pool']
+    base = {key: value for key, value in job_data.items() if key != 'pool'}
+    
+    return [
+        (f"{job_id}.{n}", dict(
+            base,
+            labels=job_data['labels'][first - 1:last],
+            printer=printer_name,
+            printer_config=pool['printers'].get(printer_name) or {},
+            parent=job_id,
+            first_label=first
+        ))
+        for n, (printer_name, first, last) in enumerate(ranges, 1)
+    ]
+
+
+def is_idle(redis_conn, leases, printer_name):
+    """No job printing on, or waiting for, the printer"""
+    if leases.active(printer_name):
+        return False
+    return not any(redis_conn.llen(pending_key(printer_name, tier)) for tier in TIERS)
+
+
+def rebalance(manager, parent_id):
+    """Move stalled shards of a pooled job to idle printers; returns new shard IDs"""
+    redis_conn = manager.redis_conn
+    parent = redis_conn.hmget(f"job:{parent_id}", 'status', 'shards', 'pool')
+    if parent[1] is None or parent[0] in (b'completed', b'failed', b'cancelled'):
+        redis_conn.srem(SHARDED_KEY, parent_id)
+        return []
+    
+    shard_ids = parent[1].decode().split(',')
+    now = time.time()
+    stalled, busy = [], set()
+    
+    for shard_id in shard_ids:
+        shard = redis_conn.hmget(f"job:{shard_id}", 'status', 'printer', 'progress_at', 'moved_to')
+        if shard[3] or shard[0] in (b'completed', b'failed', b'cancelled'):
+            continue
+        busy.add(shard[1].decode())
+        if shard[0] == b'parked' or now - float(shard[2] or now) > STALL_AFTER:
+            stalled.append(shard_id)
+    
+    if not stalled:
+        return []
+    
+    members = {name.decode() for name in redis_conn.smembers(pool_key(parent[2].decode()))}
+    idle = [
+        printer_name for printer_name in healthy_printers(redis_conn, members - busy)
+        if is_idle(redis_conn, manager.leases, printer_name)
+    ]
+    
+    moved = []
+    for shard_id, target in zip(stalled, idle):
+        new_id = f"{parent_id}.{len(shard_ids) + len(moved) + 1}"
+        if move_shard(manager, parent_id, shard_id, new_id, target):
+            moved.append(new_id)
+    return moved
+
+
+def move_shard(manager, parent_id, shard_id, new_id, target):
+    """Cancel a shard at its checkpoint and queue its remaining labels on target"""
+    redis_conn = manager.redis_conn
+    cancel_job(shard_id)
+    
+    shard = redis_conn.hmget(f"job:{shard_id}", 'checkpoint', 'inflight', 'priority')
+    printed = int(shard[0] or 0)
+    if shard[1]:
+        # The old printer may have printed the chunk, or may still finish it
+        # after the cancel; flag it rather than send it to a second printer
+        redis_conn.rpush(f"job:{shard_id}:uncertain", shard[1])
+        printed = int(shard[1].split(b'-')[1])
+    
+    shard_data = json.loads(redis_conn.get(f"job:{shard_id}:data"))
+    remaining = shard_data['labels'][printed:]
+    if not remaining:
+        return False
+    
+    new_data = dict(
+        shard_data,
+        labels=remaining,
+        printer=target,
+        printer_config=get_printer_config(target),
+        first_label=shard_data['first_label'] + printed
+    )
+    shards = redis_conn.hget(f"job:{parent_id}", 'shards').decode()
+    
+    pipe = redis_conn.pipeline()
+    pipe.hset(f"job:{shard_id}", 'moved_to', new_id)
+    pipe.hset(f"job:{parent_id}", 'shards', f"{shards},{new_id}")
+    manager._queue_job_writes(pipe, new_id, new_data, shard[2].decode())
+    pipe.execute()
+    
+    manager.dispatch(target)
+    return True
\ No newline at end of file
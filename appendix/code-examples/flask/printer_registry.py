@@ -0,0 +1,32 @@
+"""Printer Registry
+
+Caches the Odoo printer_configuration record for each printer in Redis so
+the API and workers can look up how to reach a printer by its CUPS name.
+Network printers with an IP address are printed to over raw TCP and need
+not exist in CUPS.
+
+Source: components/flask-api.md - Example 85
+"""
+
+from redis import Redis
+
+redis_conn = Redis(host='localhost', port=6379)
+
+
+def get_printer_config(printer_name):
+    """Return the stored configuration for a printer (empty if unknown)"""
+    config = redis_conn.hgetall(f"printer:{printer_name}:config")
+    return {key.decode(): value.decode() for key, value in config.items()}
+
+
+def save_printer_config(printer_name, config, pipe=None):
+    """Store the configuration sent by Odoo with a print job"""
+    # Odoo sends False for empty fields
+    values = {key: value for key, value in config.items() if value not in (None, False)}
+    if values:
+        (pipe or redis_conn).hset(f"printer:{printer_name}:config", mapping=values)
+
+
+def is_network_printer(config):
+    """True if the printer is reached over raw TCP instead of through CUPS"""
+    return (config.get('connection_type') or '').lower() == 'network' and bool(config.get('ip_address'))
\ No newline at end of file
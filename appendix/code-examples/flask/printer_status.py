@@ -0,0 +1,154 @@
+"""Printer Status Cache
+
+Keeps the state of every CUPS printer in the Redis hash ``printers:status``
+so the API and workers read it instead of querying CUPS on each request or
+print. The dispatcher sweep refreshes all printers together (one
+getPrinters and one getJobs call) every few seconds, and each process keeps
+the result in memory for LOCAL_TTL seconds, so a status check is usually a
+dict lookup. If no sweep has run for STATUS_TTL seconds, one reader
+refreshes from CUPS for everyone. A failed print forces a refresh of that
+printer.
+
+Source: components/cups-printer.md - Example 110
+"""
+
+import json
+import time
+import threading
+import logging
+from collections import Counter
+
+import cups
+from redis import Redis
+
+from cups_pool import cups_pool
+
+redis_conn = Redis(host='localhost', port=6379)
+_logger = logging.getLogger(__name__)
+
+STATUS_KEY = 'printers:status'
+STATUS_TTL = 15  # seconds before readers stop trusting the sweep
+LOCAL_TTL = 1  # seconds a process reuses its in-memory copy
+REFRESH_LOCK_TTL = 5  # seconds
+
+# CUPS printer-state codes
+PRINTER_STATES = {3: 'idle', 4: 'printing', 5: 'stopped'}
+
+
+def printer_entry(printer_name, info, jobs_in_queue, checked_at):
+    """Status record for one printer from its CUPS attributes"""
+    device_uri = info.get('device-uri', '')
+    return {
+        'name': printer_name,
+        'status': PRINTER_STATES.get(info.get('printer-state'), 'unknown'),
+        'accepting': bool(info.get('printer-is-accepting-jobs', False)),
+        'message': info.get('printer-state-message', ''),
+        'model': info.get('printer-make-and-model', ''),
+        'location': info.get('printer-location', ''),
+        'connection': 'USB' if device_uri.startswith('usb:') else 'Network',
+        'jobs_in_queue': jobs_in_queue,
+        'checked_at': checked_at
+    }
+
+
+def queued_jobs(conn):
+    """Count not-completed CUPS jobs per printer name"""
+    jobs = conn.getJobs(which_jobs='not-completed', requested_attributes=['job-printer-uri'])
+    return Counter(
+        job.get('job-printer-uri', '').rsplit('/', 1)[-1] for job in jobs.values()
+    )
+
+
+class PrinterStatusCache:
+    """Printer statuses shared through Redis, read from process memory"""
+    
+    def __init__(self, redis_conn, pool=cups_pool):
+        self.redis_conn = redis_conn
+        self.pool = pool
+        self.statuses = {}
+        self.updated_at = 0.0
+        self._loaded_at = float('-inf')
+        self._lock = threading.Lock()
+    
+    def refresh(self):
+        """Query CUPS for every printer and publish the result"""
+        with self.pool.connection() as conn:
+            printers = conn.getPrinters()
+            queued = queued_jobs(conn)
+        now = time.time()
+        
+        statuses = {
+            name: printer_entry(name, info, queued[name], now)
+            for name, info in printers.items()
+        }
+        
+        pipe = self.redis_conn.pipeline()
+        pipe.delete(STATUS_KEY)
+        if statuses:
+            pipe.hset(STATUS_KEY, mapping={
+                name: json.dumps(status) for name, status in statuses.items()
+            })
+        pipe.set(f"{STATUS_KEY}:updated", now)
+        pipe.execute()
+        
+        self._store(statuses, now)
+        return statuses
+    
+    def refresh_printer(self, printer_name):
+        """Re-check one printer now, e.g. after a print to it failed"""
+        now = time.time()
+        try:
+            with self.pool.connection() as conn:
+                info = conn.getPrinterAttributes(printer_name)
+                queued = queued_jobs(conn)[printer_name]
+            status = printer_entry(printer_name, info, queued, now)
+        except (cups.IPPError, RuntimeError) as e:
+            _logger.warning(f"Status check for {printer_name} failed: {e}")
+            status = dict(printer_entry(printer_name, {}, 0, now), status='error', message=str(e))
+        
+        self.redis_conn.hset(STATUS_KEY, printer_name, json.dumps(status))
+        with self._lock:
+            self.statuses = dict(self.statuses, **{printer_name: status})
+        return status
+    
+    def get(self, printer_name):
+        """Cached status of one printer, None if CUPS does not know it"""
+        return self.all().get(printer_name)
+    
+    def all(self):
+        """Cached status of every printer, keyed by name"""
+        if time.monotonic() - self._loaded_at < LOCAL_TTL:
+            return self.statuses
+        
+        with self._lock:
+            if time.monotonic() - self._loaded_at < LOCAL_TTL:
+                return self.statuses
+            
+            pipe = self.redis_conn.pipeline(transaction=False)
+            pipe.hgetall(STATUS_KEY)
+            pipe.get(f"{STATUS_KEY}:updated")
+            stored, updated = pipe.execute()
+            updated = float(updated or 0)
+            
+            # No sweep running: one reader refreshes, the rest use what is stored
+            if time.time() - updated > STATUS_TTL and self.redis_conn.set(
+                f"{STATUS_KEY}:lock", 1, nx=True, ex=REFRESH_LOCK_TTL
+            ):
+                try:
+                    return self.refresh()
+                except (cups.IPPError, RuntimeError) as e:
+                    _logger.error(f"Printer status refresh failed: {e}")
+            
+            self._store(
+                {name.decode(): json.loads(value) for name, value in stored.items()},
+                updated
+            )
+            return self.statuses
+    
+    def _store(self, statuses, updated_at):
+        self.statuses = statuses
+        self.updated_at = updated_at
+        self._loaded_at = time.monotonic()
+
+
+status_cache = PrinterStatusCache(redis_conn)
\ No newline at end of file
@@ -0,0 +1,318 @@
+"""Printer Transports
+
+Pluggable transports for delivering raw ZPL to a printer. Network printers
+are written to directly over raw TCP (port 9100) through a pool that keeps
+one long-lived socket per printer; everything else goes through CUPS on
+connections borrowed from the process-wide pool (cups_pool.py).
+Async variants of both are used by the asyncio worker.
+
+Source: components/cups-printer.md - Example 84
+"""
+
+import asyncio
+import cups
+import fcntl
+import os
+import select
+import socket
+import struct
+import termios
+import threading
+import logging
+
+from cups_pool import cups_pool
+from cups_printer_manager import submit_raw_zpl
+from printer_registry import get_printer_config, is_network_printer
+from printer_status import status_cache
+
+_logger = logging.getLogger(__name__)
+
+RAW_PORT = 9100
+
+# Stream ZPL into the IPP request; set to false to fall back to temp files
+CUPS_STREAMING = os.getenv('CUPS_STREAMING', 'true').lower() == 'true'
+
+
+class PrintTransportError(Exception):
+    """Raised when a transport cannot deliver ZPL to the printer"""
+
+
+class CUPSTransport:
+    """Submit ZPL through a CUPS raw queue"""
+    
+    # Flow control watermarks, in pending CUPS jobs
+    HIGH_WATERMARK = 3
+    LOW_WATERMARK = 1
+    
+    # CUPS drops a job whose document was never finished
+    ATOMIC_JOBS = True
+    
+    def __init__(self, printer_name, pool=cups_pool):
+        self.printer_name = printer_name
+        self.pool = pool
+    
+    def send(self, zpl_code, title="Label"):
+        """Send ZPL as one raw CUPS job, returning the CUPS job ID"""
+        try:
+            with self.pool.connection() as conn:
+                return submit_raw_zpl(
+                    conn, self.printer_name, zpl_code, title, CUPS_STREAMING
+                )
+        except cups.IPPError as e:
+            raise PrintTransportError(f"CUPS submit failed: {e}") from e
+
+    def backlog(self):
+        """Jobs not yet completed on this queue; a stopped printer is full"""
+        # Printer state comes from the shared cache, not an IPP call per chunk
+        status = status_cache.get(self.printer_name)
+        if status and status['status'] == 'stopped':
+            return float('inf')
+            
+        try:
+            with self.pool.connection() as conn:
+                jobs = conn.getJobs(
+                    which_jobs='not-completed',
+                    requested_attributes=['job-printer-uri']
+                )
+        except cups.IPPError as e:
+            raise PrintTransportError(f"CUPS status check failed: {e}") from e
+        
+        suffix = f"/printers/{self.printer_name}"
+        return sum(
+            1 for job in jobs.values()
+            if job.get('job-printer-uri', '').endswith(suffix)
+        )
+
+
+class RawSocketTransport:
+    """Write ZPL straight to a network printer's raw TCP port"""
+    
+    # Flow control watermarks, in unsent bytes
+    HIGH_WATERMARK = 64 * 1024
+    LOW_WATERMARK = 8 * 1024
+    
+    # A broken send may leave part of a chunk printed
+    ATOMIC_JOBS = False
+    
+    def __init__(self, host, port=RAW_PORT, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+        self.connects = 0
+        self.lock = threading.Lock()
+    
+    def connect(self):
+        """Open the socket to the printer"""
+        self.sock = socket.create_connection((self.host, self.port), self.timeout)
+        self.connects += 1
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    
+    def close(self):
+        """Close the socket, ignoring errors from an already dead peer"""
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+    
+    def send(self, zpl_code, title="Label"):
+        """Send ZPL over the pooled socket, reconnecting once on failure"""
+        data = zpl_code.encode('utf-8')
+        
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.sock is None or self._is_stale():
+                        self.close()
+                        self.connect()
+                    self.sock.sendall(data)
+                    return None
+                except OSError as e:
+                    self.close()
+                    if attempt == 0:
+                        _logger.warning(
+                            f"Socket to {self.host}:{self.port} failed ({e}), reconnecting"
+                        )
+                        continue
+                    raise PrintTransportError(
+                        f"Raw send to {self.host}:{self.port} failed: {e}"
+                    ) from e
+    
+    def backlog(self):
+        """Bytes written but not yet acknowledged by the printer"""
+        if self.sock is None:
+            return 0
+        return unsent_bytes(self.sock)
+    
+    def _is_stale(self):
+        """Detect a socket the printer has closed while it sat idle"""
+        readable, _, _ = select.select([self.sock], [], [], 0)
+        if not readable:
+            return False
+        try:
+            # Readable with no data means the peer sent FIN
+            return self.sock.recv(1, socket.MSG_PEEK) == b''
+        except OSError:
+            return True
+
+
+class RawSocketPool:
+    """Process-wide pool holding one RawSocketTransport per printer"""
+    
+    def __init__(self):
+        self._transports = {}
+        self._lock = threading.Lock()
+    
+    def get(self, printer_name, host, port=RAW_PORT):
+        """Return the pooled transport for a printer, replacing it if moved"""
+        with self._lock:
+            transport = self._transports.get(printer_name)
+            if transport is None or (transport.host, transport.port) != (host, port):
+                if transport is not None:
+                    transport.close()
+                transport = RawSocketTransport(host, port)
+                self._transports[printer_name] = transport
+            return transport
+    
+    def close_all(self):
+        """Close every pooled socket"""
+        with self._lock:
+            for transport in self._transports.values():
+                transport.close()
+            self._transports.clear()
+
+
+socket_pool = RawSocketPool()
+
+
+def unsent_bytes(sock):
+    """Size of the socket's kernel send queue (Linux SIOCOUTQ)"""
+    try:
+        raw = fcntl.ioctl(sock.fileno(), termios.TIOCOUTQ, struct.pack('I', 0))
+        return struct.unpack('I', raw)[0]
+    except OSError:
+        return 0
+
+
+def get_transport(printer_name):
+    """Select a transport from the printer's connection_type/ip_address"""
+    config = get_printer_config(printer_name)
+    
+    if is_network_printer(config):
+        port = int(config.get('raw_port') or RAW_PORT)
+        return socket_pool.get(printer_name, config['ip_address'], port)
+    
+    return CUPSTransport(printer_name)
+
+
+class AsyncRawSocketTransport:
+    """Non-blocking raw TCP transport for the asyncio worker"""
+    
+    HIGH_WATERMARK = RawSocketTransport.HIGH_WATERMARK
+    LOW_WATERMARK = RawSocketTransport.LOW_WATERMARK
+    ATOMIC_JOBS = RawSocketTransport.ATOMIC_JOBS
+    
+    def __init__(self, host, port=RAW_PORT, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.connects = 0
+        self.lock = asyncio.Lock()
+    
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        self.connects += 1
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+    
+    def backlog(self):
+        """Bytes buffered in asyncio plus the kernel send queue"""
+        if self.writer is None:
+            return 0
+        sock = self.writer.get_extra_info('socket')
+        return self.writer.transport.get_write_buffer_size() + unsent_bytes(sock)
+    
+    async def send(self, zpl_code, title="Label"):
+        """Write ZPL and wait for the socket buffer to drain"""
+        data = zpl_code.encode('utf-8')
+        
+        async with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.writer is None or self._is_stale():
+                        self.close()
+                        await self.connect()
+                    self.writer.write(data)
+                    await asyncio.wait_for(self.writer.drain(), self.timeout)
+                    return None
+                except (OSError, asyncio.TimeoutError) as e:
+                    self.close()
+                    if attempt == 0:
+                        continue
+                    raise PrintTransportError(
+                        f"Raw send to {self.host}:{self.port} failed: {e}"
+                    ) from e
+    
+    def _is_stale(self):
+        """Detect a connection the printer has closed while it sat idle"""
+        # asyncio keeps a half-closed socket writable, so is_closing() stays
+        # False after the printer's FIN; the reader sees it as end of stream
+        return (
+            self.writer.is_closing() or self.reader.at_eof()
+            or self.reader.exception() is not None
+        )
+
+
+class AsyncCUPSTransport:
+    """Runs the blocking CUPS submit in a thread so the event loop stays free"""
+    
+    HIGH_WATERMARK = CUPSTransport.HIGH_WATERMARK
+    LOW_WATERMARK = CUPSTransport.LOW_WATERMARK
+    ATOMIC_JOBS = CUPSTransport.ATOMIC_JOBS
+    
+    def __init__(self, printer_name):
+        # Each call borrows its own pooled connection, so status checks
+        # run alongside sends
+        self.transport = CUPSTransport(printer_name)
+        # Chunks must reach the queue in order
+        self.lock = asyncio.Lock()
+    
+    async def send(self, zpl_code, title="Label"):
+        async with self.lock:
+            return await asyncio.to_thread(self.transport.send, zpl_code, title)
+    
+    def backlog(self):
+        return self.transport.backlog()
+    
+    def close(self):
+        pass
+
+
+def get_async_transport(printer_name, current=None):
+    """Async counterpart of get_transport; callers keep one per printer
+    
+    Returns ``current`` while it still matches the printer's configuration,
+    so a moved or re-typed printer gets a new transport.
+    """
+    config = get_printer_config(printer_name)
+    
+    if is_network_printer(config):
+        port = int(config.get('raw_port') or RAW_PORT)
+        if isinstance(current, AsyncRawSocketTransport) and \
+                (current.host, current.port) == (config['ip_address'], port):
+            return current
+        return AsyncRawSocketTransport(config['ip_address'], port)
+    
+    if isinstance(current, AsyncCUPSTransport):
+        return current
+    return AsyncCUPSTransport(printer_name)
\ No newline at end of file
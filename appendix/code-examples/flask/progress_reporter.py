@@ -0,0 +1,95 @@
+"""Buffered Progress Reporter
+
+Collects per-label progress in memory and writes it to the job's Redis
+hash in a single pipeline, at most every 250 ms or every 20 labels. Status
+changes always flush immediately, so completion and failure are never
+delayed. Failed labels are not written here: the worker records them in
+``job:{id}:failed`` with each chunk's checkpoint (see job_checkpoint.py).
+Keys and fields are unchanged, so ``/api/status`` reads the same data. Each
+flush also appends a job event for ``/api/events`` in the same pipeline.
+A shard of a pooled job also rolls its progress up into the parent job
+(see printer_pools.py).
+
+Source: F04-batch-print-queue.md - Example 90
+"""
+
+import time
+
+from job_events import queue_event
+from printer_pools import queue_rollup
+
+
+class ProgressReporter:
+    """Throttled, pipelined writer for a job's progress in Redis"""
+    
+    def __init__(self, redis_conn, job_id, flush_interval=0.25, flush_every=20,
+                 printer_name=None, parent=None):
+        self.redis_conn = redis_conn
+        self.job_id = job_id
+        self.printer_name = printer_name
+        self.parent = parent
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        
+        self._fields = {}
+        self._labels = 0
+        self._last_flush = time.monotonic()
+    
+    def update(self, current_label, labels=1):
+        """Record that labels up to current_label have been sent"""
+        self._fields['current_label'] = current_label
+        self._labels += labels
+        self._flush_if_due()
+    
+    def set_status(self, status, **fields):
+        """Change job status, flushing everything buffered with it"""
+        self._fields.update(fields, status=status)
+        self.flush()
+    
+    def flush(self):
+        """Write buffered progress in one round trip"""
+        if self._fields:
+            pipe = self.redis_conn.pipeline()
+            self._queue_writes(pipe)
+            pipe.execute()
+        self._reset()
+    
+    def _queue_writes(self, pipe):
+        pipe.hset(f"job:{self.job_id}", mapping=self._fields)
+        queue_event(pipe, self.job_id, self.printer_name, **self._fields)
+        if self.parent:
+            queue_rollup(pipe, self.parent, self.job_id)
+        
+    def _reset(self):
+        self._fields = {}
+        self._labels = 0
+        self._last_flush = time.monotonic()
+    
+    def _is_due(self):
+        return (self._labels >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval)
+    
+    def _flush_if_due(self):
+        if self._is_due():
+            self.flush()
+
+
+class AsyncProgressReporter(ProgressReporter):
+    """ProgressReporter for redis.asyncio connections in the asyncio worker"""
+    
+    async def update(self, current_label, labels=1):
+        self._fields['current_label'] = current_label
+        self._labels += labels
+        if self._is_due():
+            await self.flush()
+    
+    async def set_status(self, status, **fields):
+        self._fields.update(fields, status=status)
+        await self.flush()
+    
+    async def flush(self):
+        if self._fields:
+            pipe = self.redis_conn.pipeline()
+            self._queue_writes(pipe)
+            await pipe.execute()
+        self._reset()
\ No newline at end of file
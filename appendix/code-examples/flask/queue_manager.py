@@ -3,13 +3,59 @@
 Manages print job queuing using Redis and RQ (Redis Queue) with priority tiers
 for handling high-volume batch printing operations.
 
+Jobs wait in per-printer pending lists (one per priority tier) and are only
+handed to RQ when the printer has a free slot, so each printer runs at most
+``max_concurrent_jobs`` jobs (default 2) and priority order holds within each
+printer. Slots are Redis leases (see printer_leases.py); workers release them
+when a job ends and dispatch the next one. A lease that lapses means its
+worker died, and the job is resumed from its checkpoint (see job_resume.py).
+Nothing is dispatched to a printer whose circuit breaker is open (see
+printer_breaker.py); the sweep probes it and releases its parked jobs.
+Large jobs sent with a printer pool are split into shard jobs across the
+pool's healthy printers, and the sweep moves stalled shards (see
+printer_pools.py). Smaller pooled jobs sent without a printer go to the
+pool printer with the least queued work (see job_eta.py).
+
+Submissions with an idempotency key claim ``idem:{key}`` with SET NX before
+anything is enqueued; a retry with the same key gets the original job back.
+The claim expires after IDEMPOTENCY_CLAIM_TTL and only gets the full
+IDEMPOTENCY_TTL in the transaction that writes the job, so a crash in
+between does not bind the key to a job that never existed.
+
 Source: F04-batch-print-queue.md - Example 14
 """
 
+import json
+import time
+import cups
 import redis
 from rq import Queue
 import uuid
 import os
+import logging
+
+from job_eta import least_loaded
+from job_events import queue_event
+from job_resume import recover_job
+from label_stream import label_count
+from printer_breaker import PrinterBreaker, probe_printer
+from print_metrics import metrics
+from printer_leases import PrinterLeases, TIERS, pending_key
+from printer_pools import (
+    SHARDED_KEY, healthy_printers, plan_shards, pool_key, rebalance, shard_job
+)
+from printer_registry import get_printer_config, save_printer_config
+from printer_status import status_cache
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+
+# 'rq' hands admitted jobs to RQ workers, 'async' to async_print_worker.py
+WORKER_MODE = os.getenv('WORKER_MODE', 'rq')
+SWEEP_INTERVAL = 5  # seconds
+IDEMPOTENCY_TTL = 24 * 3600  # seconds
+IDEMPOTENCY_CLAIM_TTL = 60  # seconds a claim lasts until its job is written
 
 
 class PrintQueueManager:
@@ -18,19 +64,225 @@ class PrintQueueManager:
         self.high_queue = Queue('high', connection=self.redis_conn)
         self.default_queue = Queue('default', connection=self.redis_conn)
         self.low_queue = Queue('low', connection=self.redis_conn)
+        self.leases = PrinterLeases(self.redis_conn)
+        self.breaker = PrinterBreaker(self.redis_conn)
+    
+    def enqueue_print_job(self, job_data, priority='normal', idempotency_key=None):
+        return self.enqueue_print_jobs([(job_data, priority, idempotency_key)])[0]
+    
+    def enqueue_print_jobs(self, jobs):
+        """Enqueue (job_data, priority, idempotency_key) tuples in one transaction
+        
+        Every new job is written in a single MULTI pipeline, so a bulk
+        submission is queued completely or not at all. Returns one result
+        per job, in order; duplicates return their original job.
+        """
+        job_ids = [str(uuid.uuid4()) for _ in jobs]
+        claims = {
+            idx: (idempotency_key, job_ids[idx])
+            for idx, (_, _, idempotency_key) in enumerate(jobs) if idempotency_key
+        }
+        results = self._claim_idempotency_keys(claims)
+        
+        pipe = self.redis_conn.pipeline()
+        printers = set()
+        for idx, (job_data, priority, _) in enumerate(jobs):
+            if idx not in results:
+                printers |= self._queue_job_writes(pipe, job_ids[idx], job_data, priority)
+                metrics.inc('print_jobs_enqueued_total', tier=self._get_tier_by_priority(priority))
+                results[idx] = {'job_id': job_ids[idx], 'status': 'queued'}
+        for idx, (key, _) in claims.items():
+            if not results[idx].get('duplicate'):
+                pipe.expire(f"idem:{key}", IDEMPOTENCY_TTL)
+        metrics.queue_writes(pipe)
+        try:
+            pipe.execute()
+        except redis.RedisError:
+            # Let a retry with the same keys enqueue the jobs
+            claimed = [f"idem:{key}" for idx, (key, _) in claims.items()
+                       if not results[idx].get('duplicate')]
+            if claimed:
+                self.redis_conn.delete(*claimed)
+            raise
+        
+        for printer_name in printers:
+            self.dispatch(printer_name)
+        
+        return [results[idx] for idx in range(len(jobs))]
     
-    def enqueue_print_job(self, job_data, priority='normal'):
-        job_id = str(uuid.uuid4())
-        queue = self._get_queue_by_priority(priority)
+    def _queue_job_writes(self, pipe, job_id, job_data, priority):
+        """Queue the Redis writes that store a job and make it pending
         
-        job = queue.enqueue(
-            'print_worker.process_batch_print',
-            job_id,
-            job_data,
-            job_timeout='30m'
-        )
+        Returns the printers to dispatch.
+        """
+        if job_data.get('pool') and 'labels' in job_data:
+            healthy = healthy_printers(self.redis_conn, job_data['pool']['printers'])
+            ranges = plan_shards(len(job_data['labels']), healthy, job_data.get('chunk_size'))
+            if ranges:
+                return self._queue_sharded_job(pipe, job_id, job_data, priority, ranges)
+            if not job_data.get('printer'):
+                printer_name = least_loaded(self.redis_conn, healthy or job_data['pool']['printers'])
+                job_data = dict(
+                    job_data,
+                    printer=printer_name,
+                    printer_config=job_data['pool']['printers'].get(printer_name) or {}
+                )
         
-        return {'job_id': job_id, 'status': 'queued'}
+        tier = self._get_tier_by_priority(priority)
+        printer_name = job_data['printer']
+        
+        # Workers pick the transport from the printer's configuration
+        if job_data.get('printer_config'):
+            save_printer_config(printer_name, job_data['printer_config'], pipe)
+        
+        pipe.set(f"job:{job_id}:data", json.dumps(job_data))
+        pipe.hset(f"job:{job_id}", mapping={
+            'status': 'queued',
+            'printer': printer_name,
+            'priority': tier,
+            'quantity': label_count(job_data),
+            'queued_at': time.time()
+        })
+        if job_data.get('parent'):
+            pipe.hset(f"job:{job_id}", mapping={
+                'parent': job_data['parent'],
+                'first_label': job_data['first_label'],
+                'progress_at': time.time()
+            })
+        pipe.rpush(pending_key(printer_name, tier), job_id)
+        pipe.sadd('printers:known', printer_name)
+        queue_event(pipe, job_id, printer_name, status='queued', quantity=label_count(job_data))
+        return {printer_name}
+    
+    def _queue_sharded_job(self, pipe, job_id, job_data, priority, ranges):
+        """Queue one shard job per label range; the job itself only tracks them"""
+        pool = job_data['pool']
+        shards = shard_job(job_id, job_data, ranges)
+        
+        for printer_name, config in pool['printers'].items():
+            if config:
+                save_printer_config(printer_name, config, pipe)
+        pipe.sadd(pool_key(pool['name']), *pool['printers'])
+        pipe.sadd('printers:known', *pool['printers'])
+        
+        pipe.set(f"job:{job_id}:data", json.dumps(job_data))
+        pipe.hset(f"job:{job_id}", mapping={
+            'status': 'queued',
+            'printer': pool['name'],
+            'priority': self._get_tier_by_priority(priority),
+            'quantity': label_count(job_data),
+            'pool': pool['name'],
+            'shards': ','.join(shard_id for shard_id, _ in shards)
+        })
+        pipe.sadd(SHARDED_KEY, job_id)
+        queue_event(pipe, job_id, pool['name'], status='queued', quantity=label_count(job_data))
+        
+        printers = set()
+        for shard_id, shard_data in shards:
+            printers |= self._queue_job_writes(pipe, shard_id, shard_data, priority)
+        return printers
+    
+    def dispatch(self, printer_name):
+        """Hand pending jobs to RQ while the printer has free slots"""
+        limit = self._get_concurrency_limit(printer_name)
+        
+        # Jobs stay parked while the printer's breaker is open; when
+        # half-open, one job tests the printer before the rest follow
+        state = self.breaker.state(printer_name)
+        if state == 'open':
+            return
+        if state == 'half_open':
+            limit = 1
+        
+        # Jobs of dead workers go back to the head of their tier
+        for job_id in self.leases.reclaim_expired(printer_name):
+            if recover_job(job_id):
+                _logger.warning(f"Resuming job {job_id} after its worker stopped")
+        
+        while True:
+            admitted = self.leases.admit_next(printer_name, limit)
+            if admitted is None:
+                return
+            
+            job_id, tier = admitted
+            
+            try:
+                if WORKER_MODE == 'async':
+                    self.redis_conn.rpush(f"dispatch:{tier}", job_id)
+                else:
+                    job_data = json.loads(self.redis_conn.get(f"job:{job_id}:data"))
+                    self._get_queue_by_priority(tier).enqueue(
+                        'print_worker.process_batch_print',
+                        job_id,
+                        job_data,
+                        job_id=job_id,
+                        job_timeout='30m'
+                    )
+            except redis.RedisError:
+                # Put the job back at the head of its tier and free the slot
+                self.redis_conn.lpush(pending_key(printer_name, tier), job_id)
+                self.leases.release(printer_name, job_id)
+                raise
+        
+    def dispatch_all(self):
+        """Re-dispatch every printer, resuming jobs of dead workers"""
+        for printer_name in self.redis_conn.smembers('printers:known'):
+            self.dispatch(printer_name.decode())
+    
+    def probe_printers(self):
+        """Probe printers with an open breaker, releasing their jobs on recovery"""
+        for printer_name in self.breaker.due_probes():
+            if probe_printer(printer_name):
+                _logger.info(f"Printer {printer_name} is reachable again")
+                self.breaker.half_open(printer_name)
+                self.dispatch(printer_name)
+            else:
+                self.breaker.record_failure(printer_name, probe=True)
+    
+    def rebalance_pools(self):
+        """Move stalled shards of pooled jobs to idle printers in their pool"""
+        for job_id in self.redis_conn.smembers(SHARDED_KEY):
+            for shard_id in rebalance(self, job_id.decode()):
+                _logger.info(f"Moved stalled labels of job {job_id.decode()} to shard {shard_id}")
+    
+    def _claim_idempotency_keys(self, claims):
+        """Bind each key to its new job ID, in one round trip
+        
+        ``claims`` maps a position to (key, job_id). Returns the duplicate
+        results for keys already bound to an earlier job, by position.
+        """
+        duplicates = {}
+        while claims:
+            pipe = self.redis_conn.pipeline(transaction=False)
+            for key, job_id in claims.values():
+                pipe.set(f"idem:{key}", job_id, nx=True, ex=IDEMPOTENCY_CLAIM_TTL)
+            claimed = dict(zip(claims, pipe.execute()))
+            
+            expired = {}
+            for idx, (key, job_id) in claims.items():
+                if claimed[idx]:
+                    continue
+                existing_id = self.redis_conn.get(f"idem:{key}")
+                if existing_id is None:
+                    # The other claim lapsed before its job was written; claim again
+                    expired[idx] = (key, job_id)
+                    continue
+                status = self.redis_conn.hget(f"job:{existing_id.decode()}", 'status')
+                duplicates[idx] = {
+                    'job_id': existing_id.decode(),
+                    'status': status.decode() if status else 'queued',
+                    'duplicate': True
+                }
+            claims = expired
+        return duplicates
+    
+    def _get_concurrency_limit(self, printer_name):
+        config = get_printer_config(printer_name)
+        return int(config.get('max_concurrent_jobs') or DEFAULT_MAX_CONCURRENT_JOBS)
+    
+    def _get_tier_by_priority(self, priority):
+        """Map API priority names onto queue tiers"""
+        return priority if priority in TIERS else 'default'
     
     def _get_queue_by_priority(self, priority):
         """Select queue based on priority level"""
@@ -39,4 +291,20 @@ class PrintQueueManager:
         elif priority == 'low':
             return self.low_queue
         else:
-            return self.default_queue
\ No newline at end of file
+            return self.default_queue
+
+
+if __name__ == '__main__':
+    # Dispatcher sweep: frees slots whose worker died without releasing them,
+    # probes printers with an open breaker, rebalances pooled jobs and
+    # refreshes the printer status cache
+    manager = PrintQueueManager()
+    while True:
+        manager.dispatch_all()
+        manager.probe_printers()
+        manager.rebalance_pools()
+        try:
+            status_cache.refresh()
+        except (cups.IPPError, RuntimeError) as e:
+            _logger.error(f"Printer status refresh failed: {e}")
+        time.sleep(SWEEP_INTERVAL)
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""ZPL Stored Formats
+
+Expands the compact template-plus-variables job format. Odoo sends the
+template once as a stored format (``^DF``) together with a field table, and
+each label carries only its variables. The worker downloads the format to
+the printer before the first label (and again after a failed chunk, in
+case the printer restarted) and then sends a short ``^XF`` recall block
+per label with the field data, instead of the full label ZPL.
+
+Compact job::
+
+    {
+        "template": {
+            "id": 12, "version": 3,
+            "format": "R:5C1F08A2.ZPL",
+            "zpl": "^XA^DFR:5C1F08A2.ZPL^FS...^FN1^FS...^XZ",
+            "fields": {"1": "{PRODUCT_NAME}", "2": "SKU: {SKU}"},
+            "variables": {"PRODUCT_NAME": "Wild Caught Salmon", "SKU": "SALM-001"}
+        },
+        "labels": [{"variables": {"LOT_NUMBER": "LOT-2025-000001"}, "box_number": 1}]
+    }
+
+Source: F06-template-management.md - Example 97
+"""
+
+import re
+
+PLACEHOLDER = re.compile(r'\{([A-Z0-9_]+)\}')
+
+
+def expand_labels(job_data, labels=None):
+    """Yield labels with zpl_code, rendering ^XF recalls for compact jobs
+    
+    ``labels`` replaces job_data['labels'], e.g. for a streamed upload.
+    """
+    template = job_data.get('template')
+    
+    for label in job_data['labels'] if labels is None else labels:
+        if template is None or 'zpl_code' in label:
+            yield label
+        else:
+            yield dict(label, zpl_code=render_recall(template, label.get('variables', {})))
+
+
+def render_recall(template, variables):
+    """Build the ^XF block that prints one label from the stored format"""
+    values = dict(template.get('variables', {}), **variables)
+    parts = [f"^XA^XF{template['format']}^FS"]
+    
+    for number, field in template['fields'].items():
+        data = PLACEHOLDER.sub(lambda m: str(values.get(m.group(1)) or ''), field)
+        parts.append(f"^FN{number}{_field_data(data)}^FS")
+    
+    parts.append('^XZ')
+    return ''.join(parts)
+
+
+def download_format(transport, template, send=None):
+    """Store the template on the printer ahead of the recall blocks
+    
+    ``send`` replaces transport.send, e.g. to retry; an async sender's
+    result must be awaited.
+    """
+    return (send or transport.send)(template['zpl'], f"Format {template['format']}")
+
+
+def _field_data(data):
+    """^FD with ^FH hex escapes when the data contains ZPL prefix characters"""
+    if '^' in data or '~' in data:
+        escaped = data.replace('_', '_5F').replace('^', '_5E').replace('~', '_7E')
+        return f"^FH^FD{escaped}"
+    return f"^FD{data}"
\ No newline at end of file
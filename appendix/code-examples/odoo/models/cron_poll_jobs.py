@@ -1,11 +1,17 @@
 """Cron Job for Polling Active Jobs
 
-Scheduled method that finds all active print jobs and polls their status.
+Scheduled method that finds all active print jobs and polls their status
+in batched requests.
+When the job event stream is enabled, updates are pushed and only jobs
+without an update for STALE_AFTER minutes are polled, as a fallback.
 
 Source: F07-job-monitoring.md - Example 29
 """
 
-from odoo import models, api
+from datetime import timedelta
+from odoo import models, fields, api
+
+STALE_AFTER = 5  # minutes
 
 
 class LabelPrintJob(models.Model):
@@ -14,10 +20,13 @@ class LabelPrintJob(models.Model):
     @api.model
     def _cron_poll_active_jobs(self):
         """Poll status for all active print jobs"""
-        active_jobs = self.search([
-            ('status', 'in', ['sent', 'queued', 'printing'])
-        ])
+        domain = [('status', 'in', ['sent', 'queued', 'printing'])]
+        
+        config = self.env['ir.config_parameter'].sudo()
+        if config.get_param('label_print.use_event_stream', 'True') == 'True':
+            stale = fields.Datetime.now() - timedelta(minutes=STALE_AFTER)
+            domain.append(('write_date', '<', stale))
+        
+        active_jobs = self.search(domain)
         
-        poller = self.env['print.job.status.poller']
-        for job in active_jobs:
-            poller.poll_job_status(job.id)
\ No newline at end of file
+        self.env['print.job.status.poller'].poll_jobs_status(active_jobs)
\ No newline at end of file
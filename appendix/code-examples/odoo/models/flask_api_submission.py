@@ -3,12 +3,29 @@
 Handles submission of print jobs to the Flask print server with error handling
 and status polling initiation.
 
+Each submission carries an Idempotency-Key built from the MO reference and
+a hash of its labels, so retrying a submission that timed out, or a split
+that created its print job twice, returns the job already queued instead
+of printing the batch twice. Manual reprints and test prints repeat the
+same labels on purpose; their key also names the job record.
+
+Jobs created together (several MOs split at once) are sent through
+/api/print/bulk, one request per BULK_SUBMIT_SIZE jobs.
+
 Source: F01-auto-print-on-mo-split.md - Example 5
 """
 
+import hashlib
 import json
 import requests
 from odoo import models, fields
+from odoo.tools import split_every
+
+# Jobs per /api/print/bulk request
+BULK_SUBMIT_SIZE = 20
+
+# Sent as high priority; the print server suspends running batches for them
+URGENT_JOB_TYPES = ('manual_reprint', 'test_print')
 
 
 class LabelPrintJob(models.Model):
@@ -19,32 +36,27 @@ class LabelPrintJob(models.Model):
         config = self.env['ir.config_parameter'].sudo()
         api_url = config.get_param('label_print.api_url')
         api_key = config.get_param('label_print.api_key')
-        printer_name = config.get_param('label_print.default_printer')
         
-        payload = {
-            'printer': printer_name,
-            'quantity': self.quantity,
-            'labels': json.loads(self.labels_data),
-            'job_metadata': {
-                'mo_reference': self.mo_id.name,
-                'priority': 'normal'
-            }
-        }
+        payload = self._prepare_print_payload(*self._get_target_printer())
         
         try:
             response = requests.post(
                 f"{api_url}/api/print",
                 json=payload,
-                headers={'Authorization': f'Bearer {api_key}'},
+                headers={
+                    'Authorization': f'Bearer {api_key}',
+                    'Idempotency-Key': self._get_idempotency_key()
+                },
                 timeout=30
             )
             response.raise_for_status()
             
             result = response.json()
-            self.write({
-                'flask_job_id': result['job_id'],
-                'status': 'sent'
-            })
+            self.write(dict(
+                self._estimated_completion_vals(result.get('estimated_completion')),
+                flask_job_id=result['job_id'],
+                status='sent'
+            ))
             
             # Start polling for status
             self._start_status_polling()
@@ -54,4 +66,94 @@ class LabelPrintJob(models.Model):
                 'status': 'failed',
                 'error_message': str(e)
             })
-            self._handle_print_failure()
\ No newline at end of file
+            self._handle_print_failure()
+    
+    def _submit_batch_to_print_server(self):
+        """Send several print jobs to Flask server in one request per batch"""
+        if len(self) == 1:
+            return self._submit_to_print_server()
+        
+        config = self.env['ir.config_parameter'].sudo()
+        api_url = config.get_param('label_print.api_url')
+        api_key = config.get_param('label_print.api_key')
+        printer_name, printer = self._get_target_printer()
+        
+        for batch in split_every(BULK_SUBMIT_SIZE, self.ids, self.browse):
+            jobs = [
+                dict(job._prepare_print_payload(printer_name, printer),
+                     idempotency_key=job._get_idempotency_key())
+                for job in batch
+            ]
+            
+            try:
+                response = requests.post(
+                    f"{api_url}/api/print/bulk",
+                    json={'jobs': jobs},
+                    headers={'Authorization': f'Bearer {api_key}'},
+                    timeout=30
+                )
+                response.raise_for_status()
+                
+                # Results come back in submission order
+                for job, result in zip(batch, response.json()['jobs']):
+                    job.write(dict(
+                        job._estimated_completion_vals(result.get('estimated_completion')),
+                        flask_job_id=result['job_id'],
+                        status='sent'
+                    ))
+                
+                batch._start_status_polling()
+            
+            except requests.exceptions.RequestException as e:
+                batch.write({
+                    'status': 'failed',
+                    'error_message': str(e)
+                })
+                for job in batch:
+                    job._handle_print_failure()
+    
+    def _get_target_printer(self):
+        """CUPS name and printer.configuration record jobs are sent to"""
+        printer_name = self.env['ir.config_parameter'].sudo().get_param(
+            'label_print.default_printer'
+        )
+        printer = self.env['printer.configuration'].search([
+            ('cups_name', '=', printer_name)
+        ], limit=1)
+        return printer_name, printer
+    
+    def _prepare_print_payload(self, printer_name, printer):
+        """Build the /api/print request body for this job"""
+        payload = {
+            'printer': printer_name,
+            'quantity': self.quantity,
+            'labels': json.loads(self.labels_data),
+            'job_metadata': {
+                'mo_reference': self.mo_id.name,
+                'priority': 'high' if self.job_type in URGENT_JOB_TYPES else 'normal'
+            }
+        }
+        
+        # Compact job: labels carry variables for the ^DF stored format
+        if self.template_data:
+            payload['template'] = json.loads(self.template_data)
+        
+        # Lets the print server bypass CUPS for network printers
+        if printer:
+            payload['printer_config'] = printer._get_print_server_config()
+            # Large jobs are split across the printer's pool
+            pool = printer._get_pool_config()
+            if pool:
+                payload['pool'] = pool
+        
+        return payload
+    
+    def _get_idempotency_key(self):
+        """Same key for every job printing these labels for the MO"""
+        digest = hashlib.sha256(
+            (self.labels_data or '').encode() + (self.template_data or '').encode()
+        ).hexdigest()
+        if self.job_type in URGENT_JOB_TYPES:
+            # Printing the same labels again is the point of these jobs
+            return f"{self.mo_id.name}/{self.job_type}/{self.id}/{digest[:16]}"
+        return f"{self.mo_id.name}/{digest[:16]}"
\ No newline at end of file
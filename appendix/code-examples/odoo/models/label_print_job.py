@@ -20,9 +20,11 @@ class LabelPrintJob(models.Model):
         ('sent', 'Sent to Printer'),
         ('printing', 'Printing'),
         ('completed', 'Completed'),
-        ('failed', 'Failed')
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled')
     ], default='pending')
-    labels_data = fields.Text('Label Data (JSON)')  # Store ZPL codes
+    labels_data = fields.Text('Label Data (JSON)')  # Store ZPL codes or variables
+    template_data = fields.Text('Stored Format (JSON)')  # Compact jobs only
     error_message = fields.Text('Error Message')
     submitted_date = fields.Datetime('Submitted At', default=fields.Datetime.now)
     completed_date = fields.Datetime('Completed At')
\ No newline at end of file
@@ -3,6 +3,17 @@
 Complete model for generating and tracking unique lot numbers with collision
 prevention and integration with stock tracking.
 
+An MO split reserves all of its lot numbers at once, taking the whole
+range in one statement: nextval() over generate_series for standard
+sequences, or one UPDATE of number_next for no_gap ones. A no_gap row is
+locked the way ir.sequence locks it (FOR UPDATE NOWAIT), so a concurrent
+next_by_code fails fast and is retried by Odoo instead of taking a number
+twice. Standard sequences lock the ir_sequence row only against other
+bulk reservations; next_by_code calls nextval() without it, so a range may
+have gaps but never repeats a number. Collisions are checked for the
+whole range in one query and the lot records are inserted with one
+multi-row create.
+
 Source: F02-lot-number-generation.md - Example 9
 """
 
@@ -12,6 +23,9 @@ import logging
 
 _logger = logging.getLogger(__name__)
 
+SEQUENCE_CODE = 'lot.number.sequence'
+MAX_ATTEMPTS = 10
+
 
 class LotNumberGenerator(models.Model):
     _name = 'lot.number.generator'
@@ -33,39 +47,46 @@ class LotNumberGenerator(models.Model):
     
     @api.model
     def generate_for_mo_split(self, mo, quantity):
-        """Generate lot numbers for all units in MO split"""
-        lot_records = []
+        """Generate lot numbers for all units in MO split
         
-        for i in range(quantity):
-            lot_number = self._generate_unique_lot_number()
-            
-            lot_record = self.create({
+        The lot numbers are reserved as one sequence range, checked for
+        collisions in one query and inserted with one multi-row create, so
+        the number of queries does not grow with the quantity.
+        """
+        lot_numbers = self._allocate_lot_numbers(quantity)
+        catch_weights = self._get_catch_weights(mo, quantity)
+        
+        return self.create([
+            {
                 'mo_id': mo.id,
                 'product_id': mo.product_id.id,
                 'lot_number': lot_number,
                 'box_number': i + 1,
-                'catch_weight': self._get_catch_weight(mo, i),
-            })
-            lot_records.append(lot_record)
-        
-        return lot_records
+                'catch_weight': catch_weights[i],
+            }
+            for i, lot_number in enumerate(lot_numbers)
+        ])
     
-    def _generate_unique_lot_number(self):
-        """Generate unique lot number with collision prevention"""
-        max_attempts = 10
+    @api.model
+    def _allocate_lot_numbers(self, quantity):
+        """Reserve quantity unused lot numbers, in sequence order"""
+        lot_numbers = []
         
-        for attempt in range(max_attempts):
-            lot_number = self.env['ir.sequence'].next_by_code(
-                'lot.number.sequence'
-            )
+        for attempt in range(MAX_ATTEMPTS):
+            candidates = self._reserve_sequence_range(quantity - len(lot_numbers))
             
-            # Check for collision (should be rare with proper sequence config)
-            if not self.search([('lot_number', '=', lot_number)]):
-                return lot_number
+            # Check for collisions (should be rare with proper sequence config)
+            taken = {
+                lot['lot_number'] for lot in
+                self.search_read([('lot_number', 'in', candidates)], ['lot_number'])
+            }
+            lot_numbers += [lot_number for lot_number in candidates if lot_number not in taken]
+            if not taken:
+                return lot_numbers
             
             _logger.warning(
-                f"Lot number collision detected: {lot_number}. "
-                f"Retry attempt {attempt + 1}/{max_attempts}"
+                f"Lot number collision detected: {', '.join(sorted(taken))}. "
+                f"Retry attempt {attempt + 1}/{MAX_ATTEMPTS}"
             )
         
         raise ValidationError(
@@ -73,9 +94,55 @@ class LotNumberGenerator(models.Model):
             "Please contact system administrator."
         )
     
-    def _get_catch_weight(self, mo, index):
-        """Retrieve catch weight for specific product unit"""
+    @api.model
+    def _reserve_sequence_range(self, count):
+        """Take count lot sequence values in one statement"""
+        sequence = self.env['ir.sequence'].sudo().search([('code', '=', SEQUENCE_CODE)], limit=1)
+        if not sequence:
+            raise ValidationError(f"Sequence {SEQUENCE_CODE} is not configured.")
+        
+        # With use_date_range, numbers come from the current year's range
+        current = sequence._get_current_sequence()
+        date_range = current if current._name == 'ir.sequence.date_range' else None
+        step = sequence.number_increment
+        cr = self.env.cr
+        
+        if sequence.implementation == 'no_gap':
+            # Same lock as ir.sequence's no_gap update; it is held until the
+            # split transaction ends
+            cr.execute(
+                f"SELECT number_next FROM {current._table} WHERE id = %s FOR UPDATE NOWAIT",
+                (current.id,)
+            )
+            cr.execute(
+                f"UPDATE {current._table} SET number_next = number_next + %s "
+                f"WHERE id = %s RETURNING number_next",
+                (count * step, current.id)
+            )
+            number_next = cr.fetchone()[0]
+            numbers = range(number_next - count * step, number_next, step)
+            current.invalidate_recordset(['number_next'])
+        else:
+            # Bulk reservations wait for each other here; next_by_code callers
+            # don't take this lock and may draw values in between
+            cr.execute("SELECT id FROM ir_sequence WHERE id = %s FOR UPDATE", (sequence.id,))
+            seq_name = f"ir_sequence_{sequence.id:03d}"
+            if date_range:
+                seq_name += f"_{date_range.id:03d}"
+            cr.execute("SELECT nextval(%s) FROM generate_series(1, %s)", (seq_name, count))
+            numbers = sorted(row[0] for row in cr.fetchall())
+        
+        if date_range:
+            sequence = sequence.with_context(ir_sequence_date_range=date_range.date_from)
+        return [sequence.get_next_char(number) for number in numbers]
+    
+    def _get_catch_weights(self, mo, quantity):
+        """Retrieve catch weights for the first quantity product units"""
         # Integration with existing catch weight module
         # This is read-only - we don't modify the catch weight module
-        catch_weight_data = mo.move_raw_ids[index].catch_weight_info
-        return catch_weight_data.weight if catch_weight_data else 0.0
\ No newline at end of file
+        moves = mo.move_raw_ids
+        weights = []
+        for index in range(quantity):
+            catch_weight_data = moves[index].catch_weight_info
+            weights.append(catch_weight_data.weight if catch_weight_data else 0.0)
+        return weights
\ No newline at end of file
@@ -24,5 +24,10 @@ class MrpProduction(models.Model):
     
     def _trigger_label_printing(self):
         """Initiate automatic label print workflow"""
-        LabelPrintJob = self.env['label.print.job']
-        LabelPrintJob.create_from_mo_split(self)
\ No newline at end of file
+        LabelPrintJob = self.env['label.print.job'].with_context(defer_print_submission=True)
+        
+        # MOs split together are submitted in bulk requests
+        jobs = LabelPrintJob.browse()
+        for production in self:
+            jobs |= LabelPrintJob.create_from_mo_split(production)
+        jobs._submit_batch_to_print_server()
\ No newline at end of file
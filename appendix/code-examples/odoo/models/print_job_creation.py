@@ -3,11 +3,21 @@
 Creates complete print jobs from MO split events, including lot number generation,
 ZPL template population, and job record creation.
 
+Jobs are sent in the compact template-plus-variables form: the template is
+compiled once into a ^DF stored format and each label carries only its
+variables. Values that are the same on every label move into the template
+block so they are sent once per job.
+
 Source: F01-auto-print-on-mo-split.md - Example 4
 """
 
 import json
-from odoo import models, api
+import re
+from datetime import timedelta
+from odoo import models, fields, api
+
+# AIs after which GS1-128 needs an FNC1 separator (variable length)
+VARIABLE_LENGTH_AIS = ('10', '21')
 
 
 class LabelPrintJob(models.Model):
@@ -18,30 +28,104 @@ class LabelPrintJob(models.Model):
         """Create batch print job for MO split"""
         quantity = len(mo.move_raw_ids)  # Number of product units
         lot_numbers = self._generate_lot_numbers(mo.id, quantity)
+        catch_weights = self.env['lot.number.generator']._get_catch_weights(mo, quantity)
+        
+        engine = self.env['label.template.engine']
+        template = engine.get_template_for_product(mo.product_id)
+        stored_format = engine.compile_stored_format(template)
         
         labels_data = []
         for idx, lot_number in enumerate(lot_numbers):
-            label_zpl = self._generate_label_zpl(
+            variables = self._generate_label_variables(
                 mo=mo,
                 lot_number=lot_number,
                 box_number=idx + 1,
-                total_boxes=quantity
+                total_boxes=quantity,
+                catch_weight=catch_weights[idx]
             )
             labels_data.append({
-                'zpl_code': label_zpl,
+                'variables': variables,
                 'lot_number': lot_number,
                 'box_number': idx + 1
             })
         
+        stored_format['variables'] = self._hoist_shared_variables(labels_data)
+        
         # Create print job record
         job = self.create({
             'mo_id': mo.id,
             'quantity': quantity,
             'status': 'pending',
-            'labels_data': json.dumps(labels_data)
+            'labels_data': json.dumps(labels_data),
+            'template_data': json.dumps(stored_format)
         })
         
-        # Submit to Flask API
-        job._submit_to_print_server()
+        # Submit to Flask API, unless the caller submits several jobs in bulk
+        if not self.env.context.get('defer_print_submission'):
+            job._submit_to_print_server()
+        
+        return job
+    
+    @api.model
+    def _generate_label_variables(self, mo, lot_number, box_number, total_boxes, catch_weight=0.0):
+        """Template variables of one box label (F06 variable placeholders)"""
+        product = mo.product_id
+        company = mo.company_id
+        production_date = fields.Date.context_today(self)
+        expiration_date = None
+        if getattr(product, 'expiration_time', 0):
+            expiration_date = production_date + timedelta(days=product.expiration_time)
+        
+        gs1_data = self.env['gs1.barcode.generator'].generate_gs1_data_string(
+            product, lot_number, catch_weight,
+            production_date=production_date, expiration_date=expiration_date
+        )
+        
+        return {
+            'PRODUCT_NAME': product.name,
+            'SKU': product.default_code or '',
+            'LOT_NUMBER': lot_number,
+            'WEIGHT': f"{catch_weight:.3f}",
+            'WEIGHT_UNIT': product.uom_id.name,
+            'GS1_BARCODE': self._gs1_barcode_data(gs1_data),
+            'GS1_HUMAN_READABLE': gs1_data,
+            'PRODUCTION_DATE': fields.Date.to_string(production_date),
+            'EXPIRATION_DATE': fields.Date.to_string(expiration_date) if expiration_date else '',
+            'MO_REFERENCE': mo.name,
+            'BOX_NUMBER': f"Box {box_number} of {total_boxes}",
+            'COMPANY_NAME': company.name,
+            'COMPANY_ADDRESS': company.street or '',
+        }
+    
+    @api.model
+    def _gs1_barcode_data(self, data_string):
+        """^BC field data for a "(01)...(10)..." string: FNC1 (>8) instead of brackets"""
+        elements = re.findall(r'\((\d+)\)([^(]*)', data_string)
+        barcode = '>8'
+        for index, (ai, value) in enumerate(elements):
+            barcode += f"{ai}{value}"
+            # A variable-length element ends with FNC1 unless it is the last one
+            if ai in VARIABLE_LENGTH_AIS and index < len(elements) - 1:
+                barcode += '>8'
+        return barcode
+    
+    @api.model
+    def _hoist_shared_variables(self, labels_data):
+        """Move variables with the same value on every label into one dict"""
+        if not labels_data:
+            return {}
+        
+        shared = dict(labels_data[0]['variables'])
+        for label in labels_data[1:]:
+            shared = {
+                key: value for key, value in shared.items()
+                if label['variables'].get(key) == value
+            }
+        
+        for label in labels_data:
+            label['variables'] = {
+                key: value for key, value in label['variables'].items()
+                if key not in shared
+            }
         
-        return job
\ No newline at end of file
+        return shared
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""Printer Configuration Model
+
+Stores printer connection details and tells the print server how to reach each
+printer: network printers are written to directly on their raw TCP port,
+USB printers go through their CUPS queue.
+
+Printers with the same pool name are interchangeable: a large job sent to
+one of them is split across every active printer in the pool.
+
+Source: components/odoo-module.md - Example 86
+"""
+
+from odoo import models, fields
+
+
+class PrinterConfiguration(models.Model):
+    _name = 'printer.configuration'
+    _description = 'Printer Configuration'
+    
+    name = fields.Char('Printer Name', required=True)
+    cups_name = fields.Char('CUPS Name', required=True, index=True)
+    ip_address = fields.Char('IP Address')
+    raw_port = fields.Integer('Raw TCP Port', default=9100)
+    model = fields.Char('Model', default='Zebra Z230')
+    dpi = fields.Integer('DPI', default=300)
+    connection_type = fields.Selection([
+        ('usb', 'USB'),
+        ('network', 'Network')
+    ], default='usb', required=True)
+    max_concurrent_jobs = fields.Integer('Max Concurrent Jobs', default=2)
+    flow_high_watermark = fields.Integer(
+        'Flow High Watermark',
+        help='Backlog at which the worker pauses: pending jobs (USB) or unsent bytes (network). 0 = default.'
+    )
+    flow_low_watermark = fields.Integer(
+        'Flow Low Watermark',
+        help='Backlog the printer must drain to before sending resumes. 0 = default.'
+    )
+    pool_name = fields.Char(
+        'Printer Pool', index=True,
+        help='Printers sharing a pool name split large jobs between them. Leave empty to print alone.'
+    )
+    location = fields.Char('Location')
+    is_default = fields.Boolean('Default Printer', default=False)
+    active = fields.Boolean('Active', default=True)
+    last_status_check = fields.Datetime('Last Status Check')
+    status = fields.Char('Status')
+    
+    _sql_constraints = [
+        ('cups_name_unique', 'UNIQUE(cups_name)', 'CUPS printer name must be unique!')
+    ]
+    
+    def _get_print_server_config(self):
+        """Connection details sent to the print server with each job"""
+        self.ensure_one()
+        return {
+            'connection_type': self.connection_type,
+            'ip_address': self.ip_address,
+            'raw_port': self.raw_port,
+            'max_concurrent_jobs': self.max_concurrent_jobs,
+            'flow_high_watermark': self.flow_high_watermark,
+            'flow_low_watermark': self.flow_low_watermark
+        }
+    
+    def _get_pool_config(self):
+        """Pool name and per-printer connection details, or None if not pooled"""
+        self.ensure_one()
+        if not self.pool_name:
+            return None
+        
+        members = self.search([('pool_name', '=', self.pool_name)])
+        return {
+            'name': self.pool_name,
+            'printers': {member.cups_name: member._get_print_server_config() for member in members}
+        }
\ No newline at end of file
@@ -1,12 +1,17 @@
 """Progress Display Computed Field
 
 Computed field that formats progress information for display in the UI.
+The print server's completion estimate is kept in estimated_completion;
+moves smaller than ETA_TOLERANCE are not written back.
 
 Source: F07-job-monitoring.md - Example 30
 """
 
+from datetime import datetime, timedelta
 from odoo import models, fields, api
 
+ETA_TOLERANCE = timedelta(minutes=1)
+
 
 class LabelPrintJob(models.Model):
     _inherit = 'label.print.job'
@@ -14,6 +19,7 @@ class LabelPrintJob(models.Model):
     # Add fields for progress tracking
     current_label = fields.Integer('Current Label', default=0)
     progress_percent = fields.Float('Progress %', default=0.0)
+    estimated_completion = fields.Datetime('Estimated Completion')
     
     # Computed fields for dashboard
     progress_display = fields.Char(
@@ -29,4 +35,12 @@ class LabelPrintJob(models.Model):
             elif job.status == 'completed':
                 job.progress_display = f"{job.quantity} of {job.quantity}"
             else:
-                job.progress_display = "-"
\ No newline at end of file
+                job.progress_display = "-"
+    
+    def _estimated_completion_vals(self, value):
+        """Values updating estimated_completion from a print server ETA, if it moved"""
+        eta = datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ') if value else False
+        current = self.estimated_completion
+        if eta == current or (eta and current and abs(eta - current) < ETA_TOLERANCE):
+            return {}
+        return {'estimated_completion': eta}
\ No newline at end of file
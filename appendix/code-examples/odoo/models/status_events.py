@@ -0,0 +1,92 @@
+"""Print Job Event Listener
+
+Consumes the print server's job event stream (GET /api/events) and applies
+status and progress changes to print jobs as they arrive, instead of
+polling each active job.
+
+The cron starts every minute and keeps the stream open for EVENT_WINDOW
+seconds. Events are grouped per job and written at most every APPLY_INTERVAL
+seconds, with a commit after each write so the dashboard updates while the
+cron runs. The last applied event ID is stored in label_print.last_event_id,
+so the next run continues without gaps.
+
+Source: F07-job-monitoring.md - Example 107
+"""
+
+import json
+import time
+import logging
+import requests
+from odoo import models, api
+
+_logger = logging.getLogger(__name__)
+
+EVENT_WINDOW = 55  # seconds the stream stays open per cron run
+APPLY_INTERVAL = 0.5  # seconds between grouped writes
+
+
+class PrintJobEventListener(models.AbstractModel):
+    _name = 'print.job.event.listener'
+    _description = 'Print Job Event Listener'
+    
+    @api.model
+    def _cron_consume_events(self):
+        """Apply job events from the print server for up to EVENT_WINDOW seconds"""
+        config = self.env['ir.config_parameter'].sudo()
+        api_url = config.get_param('label_print.api_url')
+        api_key = config.get_param('label_print.api_key')
+        last_id = config.get_param('label_print.last_event_id', '$')
+        
+        deadline = time.monotonic() + EVENT_WINDOW
+        next_apply = time.monotonic() + APPLY_INTERVAL
+        pending = {}
+        
+        try:
+            # Read timeout must exceed the server's 15 s keepalive
+            with requests.get(
+                f"{api_url}/api/events",
+                headers={'Authorization': f'Bearer {api_key}', 'Last-Event-ID': last_id},
+                stream=True,
+                timeout=(5, 30)
+            ) as response:
+                response.raise_for_status()
+                
+                for event_id, event in self._iter_sse(response):
+                    if event is not None:
+                        pending.setdefault(event['job_id'], {}).update(event)
+                        last_id = event_id
+                    
+                    if pending and time.monotonic() >= next_apply:
+                        self._apply_events(pending, last_id)
+                        pending = {}
+                        next_apply = time.monotonic() + APPLY_INTERVAL
+                    
+                    if time.monotonic() >= deadline:
+                        break
+        
+        except requests.exceptions.RequestException as e:
+            _logger.error(f"Job event stream failed: {e}")
+        
+        if pending:
+            self._apply_events(pending, last_id)
+    
+    def _iter_sse(self, response):
+        """Yield (event_id, event) per server-sent event, (None, None) on keepalive"""
+        event_id, data = None, []
+        
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith(':'):
+                yield None, None
+            elif line.startswith('id:'):
+                event_id = line[3:].strip()
+            elif line.startswith('data:'):
+                data.append(line[5:].strip())
+            elif not line and data:
+                yield event_id, json.loads('\n'.join(data))
+                event_id, data = None, []
+    
+    def _apply_events(self, pending, last_id):
+        """Write the latest state of each job and remember the last event ID"""
+        self.env['print.job.status.poller']._apply_status_updates(pending)
+        self.env['ir.config_parameter'].sudo().set_param('label_print.last_event_id', last_id)
+        self.env.cr.commit()
\ No newline at end of file
@@ -1,7 +1,9 @@
 """Print Job Status Polling Service
 
 Periodically polls the Flask server for job status updates and sends browser
-notifications for completion or errors.
+notifications for completion or errors. Active jobs are fetched through
+GET /api/status?ids=, one request per STATUS_BATCH_SIZE jobs, and jobs
+receiving the same update are written together.
 
 Source: F07-job-monitoring.md - Example 27
 """
@@ -9,9 +11,25 @@ Source: F07-job-monitoring.md - Example 27
 import requests
 import logging
 from odoo import models, api
+from odoo.tools import split_every
 
 _logger = logging.getLogger(__name__)
 
+# Job IDs per GET /api/status?ids= request (the server accepts up to 100)
+STATUS_BATCH_SIZE = 80
+
+# Print server statuses that label.print.job tracks
+STATUS_MAP = {
+    'queued': 'sent',
+    'printing': 'printing',
+    'interrupted': 'printing',
+    'parked': 'sent',
+    'suspended': 'printing',
+    'completed': 'completed',
+    'failed': 'failed',
+    'cancelled': 'cancelled',
+}
+
 
 class PrintJobStatusPoller(models.AbstractModel):
     _name = 'print.job.status.poller'
@@ -20,9 +38,15 @@ class PrintJobStatusPoller(models.AbstractModel):
     @api.model
     def poll_job_status(self, job_id):
         """Poll Flask server for job status"""
-        job = self.env['label.print.job'].browse(job_id)
+        self.poll_jobs_status(self.env['label.print.job'].browse(job_id))
         
-        if not job.flask_job_id or job.status in ['completed', 'failed', 'cancelled']:
+    @api.model
+    def poll_jobs_status(self, jobs):
+        """Poll Flask server for many jobs, STATUS_BATCH_SIZE per request"""
+        jobs = jobs.filtered(
+            lambda j: j.flask_job_id and j.status not in ['completed', 'failed', 'cancelled']
+        )
+        if not jobs:
             return
         
         # Call Flask API
@@ -30,34 +54,66 @@ class PrintJobStatusPoller(models.AbstractModel):
         api_url = config.get_param('label_print.api_url')
         api_key = config.get_param('label_print.api_key')
         
-        try:
-            response = requests.get(
-                f"{api_url}/api/status/{job.flask_job_id}",
-                headers={'Authorization': f'Bearer {api_key}'},
-                timeout=5
-            )
-            response.raise_for_status()
-            
-            status_data = response.json()
+        for batch in split_every(STATUS_BATCH_SIZE, jobs.ids, jobs.browse):
+            try:
+                response = requests.get(
+                    f"{api_url}/api/status",
+                    params={'ids': ','.join(batch.mapped('flask_job_id'))},
+                    headers={'Authorization': f'Bearer {api_key}'},
+                    timeout=5
+                )
+                response.raise_for_status()
             
-            # Update job record
-            job.write({
-                'status': status_data.get('status'),
-                'current_label': status_data.get('current_label', 0),
-                'progress_percent': status_data.get('progress_percent', 0)
-            })
+                self._apply_status_updates(response.json()['jobs'], batch)
+                
+            except requests.exceptions.RequestException as e:
+                _logger.error(f"Failed to poll job status: {e}")
+    
+    def _apply_status_updates(self, updates, jobs=None):
+        """Write the latest state of each job, grouping identical updates
+        
+        ``updates`` maps Flask job IDs to status fields (status,
+        current_label, error, estimated_completion), as returned by
+        /api/status or sent as events.
+        """
+        if jobs is None:
+            jobs = self.env['label.print.job'].search([
+                ('flask_job_id', 'in', list(updates))
+            ])
+        
+        groups = {}
+        for job in jobs:
+            update = updates.get(job.flask_job_id)
+            if not update:
+                continue
+            vals = {}
             
-            # If completed, send notification
-            if status_data.get('status') == 'completed':
-                self._send_completion_notification(job)
+            status = STATUS_MAP.get(update.get('status'))
+            if status and status != job.status:
+                vals['status'] = status
+            if update.get('error'):
+                vals['error_message'] = update['error']
+            if 'current_label' in update:
+                current = int(update['current_label'])
+                if current != job.current_label:
+                    vals['current_label'] = current
+                    vals['progress_percent'] = 100.0 * current / job.quantity if job.quantity else 0.0
+            if 'estimated_completion' in update:
+                vals.update(job._estimated_completion_vals(update['estimated_completion']))
             
-            # If failed, log error
-            elif status_data.get('status') == 'failed':
-                job.write({'error_message': status_data.get('error_message')})
-                self._send_error_notification(job)
-                
-        except requests.exceptions.RequestException as e:
-            _logger.error(f"Failed to poll job status: {e}")
+            if vals:
+                key = tuple(sorted(vals.items()))
+                groups[key] = groups.get(key, job.browse()) | job
+        
+        for key, group in groups.items():
+            group.write(dict(key))
+            status = dict(key).get('status')
+            for job in group:
+                # If completed, send notification
+                if status == 'completed':
+                    self._send_completion_notification(job)
+                elif status == 'failed':
+                    self._send_error_notification(job)
     
     def _send_completion_notification(self, job):
         """Send browser notification on job completion"""
@@ -13,8 +13,16 @@ class LabelPrintJob(models.Model):
     
     def _start_status_polling(self):
         """Begin polling Flask server for job status"""
+        # With the event stream on, job updates are pushed. Its listener
+        # restarts every minute and holds its cron row locked while it runs,
+        # so writing to that cron would wait on the lock for nothing
+        config = self.env['ir.config_parameter'].sudo()
+        if config.get_param('label_print.use_event_stream', 'True') == 'True':
+            return
+        
         # Schedule cron job or use @api.model scheduled action
-        self.env.ref('label_print.poll_print_status_cron').sudo().write({
+        cron = self.env.ref('label_print.cron_poll_print_job_status')
+        cron.sudo().write({
             'active': True,
             'nextcall': fields.Datetime.now()
         })
\ No newline at end of file
@@ -6,6 +6,7 @@ based on product assignment rules.
 Source: F06-template-management.md - Example 21
 """
 
+import hashlib
 import re
 import logging
 from odoo import models, api
@@ -13,6 +14,9 @@ from odoo.exceptions import ValidationError
 
 _logger = logging.getLogger(__name__)
 
+# ^FD...^FS field data containing at least one {VARIABLE}
+VARIABLE_FIELD = re.compile(r'\^FD([^\^]*\{[A-Z0-9_]+\}[^\^]*)\^FS')
+
 
 class LabelTemplateEngine(models.AbstractModel):
     _name = 'label.template.engine'
@@ -35,6 +39,36 @@ class LabelTemplateEngine(models.AbstractModel):
         
         return zpl
     
+    @api.model
+    def compile_stored_format(self, template):
+        """Compile a template into a ^DF stored format plus its variable fields
+        
+        Every ^FD containing a placeholder becomes a numbered ^FN field. The
+        print server downloads the format once per job and recalls it with
+        ^XF for each label, sending only the field data. ZPL object names
+        are at most 8 characters, so the format is named after a hash of its
+        body; a new template version gets a new name.
+        """
+        fields = {}
+        
+        def to_field_number(match):
+            number = str(len(fields) + 1)
+            fields[number] = match.group(1)
+            return f"^FN{number}^FS"
+        
+        body = VARIABLE_FIELD.sub(to_field_number, template.zpl_code.strip())
+        body = re.sub(r'^\^XA', '', body)
+        body = re.sub(r'\^XZ$', '', body)
+        format_name = f"R:{hashlib.sha1(body.encode()).hexdigest()[:8].upper()}.ZPL"
+        
+        return {
+            'id': template.id,
+            'version': template.version,
+            'format': format_name,
+            'zpl': f"^XA^DF{format_name}^FS{body}^XZ",
+            'fields': fields,
+        }
+    
     @api.model
     def get_template_for_product(self, product):
         """Find appropriate template for product"""
@@ -0,0 +1,261 @@
+"""End-to-End Print Benchmark
+
+Drives the real print path - PrintQueueManager, the dispatcher, the RQ
+worker function process_batch_print and the CUPS or raw TCP transport -
+against a fake CUPS server (fake_cups.py) or stand-in network printers, with
+fakeredis or a local redis-server. Sweeps batch size, worker threads and
+printers, and reports p50/p99 per-label latency (enqueue to label printed)
+and labels/sec for each combination.
+
+    python benchmark_e2e.py --output results-1.4.json
+    python benchmark_e2e.py --labels 500 5000 --workers 1 4 --printers 2 --transport raw
+    python benchmark_e2e.py --baseline results-1.4.json --output results-1.5.json
+
+With --baseline, runs whose labels/sec dropped by more than --tolerance are
+flagged and the exit status is 1. ``--redis local`` flushes the database on
+localhost:6379 between runs; point it at a dedicated instance.
+
+Source: operations/testing.md - Example 120
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from fake_cups import FakeCUPSServer
+from stand_in_printer import StandInPrinter
+
+LABEL = '^XA^FO50,50^A0N,50,50^FDBox {n}^FS^XZ'
+TERMINAL_STATUSES = {b'completed', b'failed', b'cancelled'}
+
+_logger = logging.getLogger(__name__)
+
+
+def load_stack(redis_mode):
+    """Import the print server modules against the chosen Redis"""
+    # The dispatcher hands admitted jobs to dispatch:{tier}; worker threads take them
+    os.environ['WORKER_MODE'] = 'async'
+    
+    if redis_mode == 'fake':
+        import fakeredis
+        import redis
+        server = fakeredis.FakeServer()
+        
+        class SharedFakeRedis(fakeredis.FakeRedis):
+            """Every module-level Redis() connection shares one fake server"""
+            def __init__(self, *args, host=None, port=None, **kwargs):
+                super().__init__(*args, server=server, **kwargs)
+        
+        redis.Redis = redis.StrictRedis = SharedFakeRedis
+    
+    return {
+        name: importlib.import_module(name)
+        for name in ('cups_pool', 'print_worker', 'queue_manager')
+    }
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def worker_loop(stack, stop):
+    """Run dispatched jobs with the RQ worker function until stopped"""
+    redis_conn = stack['print_worker'].redis_conn
+    dispatch_keys = [f"dispatch:{tier}" for tier in stack['queue_manager'].TIERS]
+    
+    while not stop.is_set():
+        item = redis_conn.blpop(dispatch_keys, timeout=1)
+        if item is None:
+            continue
+        job_id = item[1].decode()
+        job_data = json.loads(redis_conn.get(f"job:{job_id}:data"))
+        try:
+            stack['print_worker'].process_batch_print(job_id, job_data)
+        except Exception as e:
+            _logger.error(f"Job {job_id} failed: {e}")
+
+
+def start_printers(args, names):
+    """Fake CUPS queues or stand-in network printers
+    
+    Returns (printer configs, label arrival times, stop, CUPS connect function).
+    """
+    if args.transport == 'cups':
+        server = FakeCUPSServer(names, args.cups_latency / 1000, args.printer_speed)
+        return (
+            {name: {'connection_type': 'usb'} for name in names},
+            lambda: [t for name in names for t in server.arrivals[name]],
+            lambda: None,
+            server.connect
+        )
+    
+    printers = {name: StandInPrinter().start() for name in names}
+    
+    def stop():
+        for printer in printers.values():
+            printer.stop()
+    
+    return (
+        {
+            name: {'connection_type': 'network', 'ip_address': printer.host, 'raw_port': printer.port}
+            for name, printer in printers.items()
+        },
+        lambda: [t for printer in printers.values() for t in printer.arrivals],
+        stop,
+        None
+    )
+
+
+def run(stack, args, labels, workers, printers):
+    """One benchmark run; returns its result entry"""
+    manager = stack['queue_manager'].PrintQueueManager()
+    manager.redis_conn.flushdb()
+    
+    names = [f"bench{n}" for n in range(1, printers + 1)]
+    configs, arrivals, stop_printers, connect = start_printers(args, names)
+    if connect:
+        stack['cups_pool'].cups_pool.clear()
+        stack['cups_pool'].cups_pool.connect = connect
+    
+    batch = [{'zpl_code': LABEL.format(n=n)} for n in range(1, labels + 1)]
+    jobs = [
+        ({'printer': name, 'labels': batch, 'chunk_size': args.chunk_size,
+          'printer_config': configs[name]}, 'normal', None)
+        for name in names for _ in range(args.jobs_per_printer)
+    ]
+    
+    stop = threading.Event()
+    threads = [threading.Thread(target=worker_loop, args=(stack, stop), daemon=True)
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    
+    started = time.time()
+    job_ids = [result['job_id'] for result in manager.enqueue_print_jobs(jobs)]
+    
+    deadline = started + args.timeout
+    statuses = []
+    while time.time() < deadline:
+        pipe = manager.redis_conn.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hget(f"job:{job_id}", 'status')
+        statuses = pipe.execute()
+        if all(status in TERMINAL_STATUSES for status in statuses):
+            break
+        time.sleep(0.02)
+    
+    stop.set()
+    for thread in threads:
+        thread.join()
+    stop_printers()
+    
+    latencies = [t - started for t in arrivals()]
+    expected = labels * len(jobs)
+    elapsed = max(latencies) if latencies else time.time() - started
+    return {
+        'labels': labels,
+        'workers': workers,
+        'printers': printers,
+        'jobs': len(jobs),
+        'labels_printed': len(latencies),
+        'labels_expected': expected,
+        'failed_jobs': sum(status != b'completed' for status in statuses),
+        'elapsed_s': round(elapsed, 3),
+        'labels_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'latency_p50_ms': round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        'latency_p99_ms': round(percentile(latencies, 99) * 1000, 1) if latencies else None
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print the change against a saved run; False if throughput regressed"""
+    previous = {(r['labels'], r['workers'], r['printers']): r for r in baseline['runs']}
+    ok = True
+    
+    print(f"\nAgainst baseline {baseline['meta'].get('tag') or baseline['meta']['created_at']}:")
+    for result in results['runs']:
+        base = previous.get((result['labels'], result['workers'], result['printers']))
+        if not base or not base['labels_per_sec']:
+            continue
+        change = result['labels_per_sec'] / base['labels_per_sec'] - 1
+        regressed = change < -tolerance
+        ok = ok and not regressed
+        print(
+            f"{result['labels']:>6} labels {result['workers']:>2} workers {result['printers']:>2} printers  "
+            f"labels/sec {change:+7.1%}  p99 {base['latency_p99_ms']} -> {result['latency_p99_ms']} ms"
+            f"{'  REGRESSED' if regressed else ''}"
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--labels', type=int, nargs='+', default=[1, 50, 200, 500, 5000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--printers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--jobs-per-printer', type=int, default=1)
+    parser.add_argument('--transport', choices=['cups', 'raw'], default='cups')
+    parser.add_argument('--chunk-size', type=int, default=50)
+    parser.add_argument('--cups-latency', type=float, default=2, help='ms per IPP request')
+    parser.add_argument('--printer-speed', type=float, default=0,
+                        help='fake CUPS labels/sec per printer (0 = instant)')
+    parser.add_argument('--redis', choices=['fake', 'local'], default='fake')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds per run')
+    parser.add_argument('--tag', default='', help='release or commit the results belong to')
+    parser.add_argument('--output', default='benchmark_e2e.json')
+    parser.add_argument('--baseline', help='earlier --output file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='allowed labels/sec drop against the baseline')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    
+    stack = load_stack(args.redis)
+    results = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'tag': args.tag,
+            'transport': args.transport,
+            'chunk_size': args.chunk_size,
+            'cups_latency_ms': args.cups_latency,
+            'printer_speed': args.printer_speed,
+            'redis': args.redis,
+            'python': platform.python_version()
+        },
+        'runs': []
+    }
+    
+    print(f"{'labels':>6} {'workers':>7} {'printers':>8} {'labels/sec':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for labels in args.labels:
+        for workers in args.workers:
+            for printers in args.printers:
+                result = run(stack, args, labels, workers, printers)
+                results['runs'].append(result)
+                print(
+                    f"{labels:>6} {workers:>7} {printers:>8} {result['labels_per_sec']:>10} "
+                    f"{result['latency_p50_ms']:>8} {result['latency_p99_ms']:>8}"
+                    f"{'' if result['labels_printed'] == result['labels_expected'] else '  INCOMPLETE'}"
+                )
+    
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved {len(results['runs'])} runs to {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""Transport Throughput Benchmark
+
+Compares labels/sec for the pooled raw TCP transport against the CUPS path.
+The raw transport runs against a local stand-in printer unless --host is
+given; the CUPS path only runs when --cups-printer names a raw queue.
+
+    python benchmark_transport.py --labels 500 --cups-printer zebra_z230_line1
+
+Source: operations/testing.md - Example 89
+"""
+
+import argparse
+import time
+
+from printer_transport import CUPSTransport, RawSocketTransport
+from stand_in_printer import StandInPrinter
+
+LABEL = '^XA^FO50,50^A0N,50,50^FDBenchmark {n}^FS^XZ'
+
+
+def run(transport, labels):
+    """Send labels one per call and return labels/sec"""
+    start = time.perf_counter()
+    for n in range(labels):
+        transport.send(LABEL.format(n=n), f"Benchmark {n}")
+    return labels / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--labels', type=int, default=500)
+    parser.add_argument('--host', help='Network printer address (default: stand-in)')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--cups-printer', help='CUPS raw queue to compare against')
+    args = parser.parse_args()
+    
+    stand_in = None
+    if args.host:
+        host, port = args.host, args.port
+    else:
+        stand_in = StandInPrinter().start()
+        host, port = stand_in.host, stand_in.port
+    
+    raw = RawSocketTransport(host, port)
+    print(f"raw tcp  {run(raw, args.labels):10.1f} labels/sec")
+    raw.close()
+    
+    if args.cups_printer:
+        transport = CUPSTransport(args.cups_printer)
+        print(f"cups     {run(transport, args.labels):10.1f} labels/sec")
+    
+    if stand_in:
+        stand_in.stop()
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
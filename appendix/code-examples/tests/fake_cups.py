@@ -0,0 +1,139 @@
+"""Fake CUPS Server
+
+In-process stand-in for the CUPS scheduler, for benchmarks and tests that
+exercise the CUPS transport, the connection pool and flow control without
+a cupsd. ``FakeCUPSServer.connect`` returns objects with the pycups
+``Connection`` methods the print server calls. Every IPP request costs
+``latency`` seconds; submitted jobs print at ``speed`` labels per second
+(0 prints instantly) and stay in the not-completed job list until then.
+
+    server = FakeCUPSServer(['bench1'], latency=0.002, speed=5)
+    cups_pool.connect = server.connect
+
+Source: operations/testing.md - Example 121
+"""
+
+import itertools
+import threading
+import time
+
+import cups
+
+
+class FakeCUPSServer:
+    """Raw queues that record when each label finishes printing"""
+    
+    def __init__(self, printers, latency=0.002, speed=0):
+        self.printers = list(printers)
+        self.latency = latency
+        self.speed = speed
+        self.arrivals = {name: [] for name in self.printers}  # label print times
+        self.requests = 0
+        self._jobs = {}  # CUPS job ID -> (printer, done at)
+        self._free_at = dict.fromkeys(self.printers, 0.0)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+    
+    def connect(self):
+        return FakeCUPSConnection(self)
+    
+    def request(self):
+        """Account for one IPP round trip"""
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+    
+    def next_job_id(self):
+        with self._lock:
+            return next(self._ids)
+    
+    def submit(self, printer_name, job_id, data):
+        """Queue a raw document; its labels print one after another"""
+        if printer_name not in self.printers:
+            raise cups.IPPError(cups.IPP_NOT_FOUND, f"{printer_name} not found")
+        
+        per_label = 1 / self.speed if self.speed else 0
+        with self._lock:
+            started = max(time.time(), self._free_at[printer_name])
+            times = [started + per_label * n for n in range(1, data.count(b'^XZ') + 1)]
+            self._free_at[printer_name] = times[-1] if times else started
+            self.arrivals[printer_name].extend(times)
+            self._jobs[job_id] = (printer_name, self._free_at[printer_name])
+    
+    def pending(self, printer_name=None):
+        """Not-completed jobs, as {job_id: printer}"""
+        now = time.time()
+        with self._lock:
+            return {
+                job_id: printer for job_id, (printer, done_at) in self._jobs.items()
+                if done_at > now and printer_name in (None, printer)
+            }
+    
+    def printer_attributes(self, printer_name):
+        if printer_name not in self.printers:
+            raise cups.IPPError(cups.IPP_NOT_FOUND, f"{printer_name} not found")
+        return {
+            'printer-state': 4 if self.pending(printer_name) else 3,
+            'printer-state-message': '',
+            'printer-is-accepting-jobs': True
+        }
+
+
+class FakeCUPSConnection:
+    """The subset of ``cups.Connection`` used by the print server"""
+    
+    def __init__(self, server):
+        self.server = server
+        self._document = None
+    
+    def getPrinters(self):
+        self.server.request()
+        return {name: self.server.printer_attributes(name) for name in self.server.printers}
+    
+    def getPrinterAttributes(self, printer_name, requested_attributes=None):
+        self.server.request()
+        return self.server.printer_attributes(printer_name)
+    
+    def getDefault(self):
+        self.server.request()
+        return self.server.printers[0] if self.server.printers else None
+    
+    def getJobs(self, which_jobs='not-completed', my_jobs=False, requested_attributes=None):
+        self.server.request()
+        return {
+            job_id: {'job-printer-uri': f"ipp://localhost/printers/{printer}", 'job-state': 5}
+            for job_id, printer in self.server.pending().items()
+        }
+    
+    def getJobAttributes(self, job_id, requested_attributes=None):
+        self.server.request()
+        return {'job-state': 5 if job_id in self.server.pending() else 9}
+    
+    def createJob(self, printer_name, title, options):
+        self.server.request()
+        self._document = (printer_name, self.server.next_job_id(), [])
+        return self._document[1]
+    
+    def startDocument(self, printer_name, job_id, name, fmt, last_document):
+        return cups.HTTP_CONTINUE
+    
+    def writeRequestData(self, data, length):
+        self._document[2].append(data[:length])
+        return cups.HTTP_CONTINUE
+    
+    def finishDocument(self, printer_name):
+        self.server.request()
+        printer_name, job_id, blocks = self._document
+        self._document = None
+        self.server.submit(printer_name, job_id, b''.join(blocks))
+        return cups.IPP_OK
+    
+    def printFile(self, printer_name, path, title, options):
+        self.server.request()
+        job_id = self.server.next_job_id()
+        with open(path, 'rb') as f:
+            self.server.submit(printer_name, job_id, f.read())
+        return job_id
+    
+    def cancelJob(self, job_id, purge_job=False):
+        self.server.request()
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""Stand-in Network Printer
+
+Local TCP server that accepts raw ZPL the way a Zebra does on port 9100.
+Used by the transport tests and benchmarks in place of a real printer.
+
+Source: operations/testing.md - Example 87
+"""
+
+import socket
+import socketserver
+import threading
+import time
+
+
+class StandInPrinter:
+    """Collects everything written to it and counts ^XZ label terminators"""
+    
+    def __init__(self, host='127.0.0.1', port=0):
+        self.received = bytearray()
+        self.arrivals = []  # time each ^XZ terminator arrived
+        self.connections = 0
+        self._clients = []
+        self._lock = threading.Lock()
+        
+        printer = self
+        
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with printer._lock:
+                    printer.connections += 1
+                    printer._clients.append(self.request)
+                while True:
+                    try:
+                        data = self.request.recv(65536)
+                    except OSError:
+                        break
+                    if not data:
+                        break
+                    with printer._lock:
+                        # A terminator may straddle two reads
+                        scan_from = max(len(printer.received) - 2, 0)
+                        printer.received.extend(data)
+                        now = time.time()
+                        printer.arrivals.extend(
+                            [now] * printer.received.count(b'^XZ', scan_from)
+                        )
+        
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address
+    
+    @property
+    def labels(self):
+        """Number of complete labels received"""
+        with self._lock:
+            return self.received.count(b'^XZ')
+    
+    def wait_for_labels(self, count, timeout=2):
+        """Wait until ``count`` labels arrived; returns the number received"""
+        deadline = time.time() + timeout
+        while self.labels < count and time.time() < deadline:
+            time.sleep(0.01)
+        return self.labels
+    
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+    
+    def drop_connections(self):
+        """Close open client sockets, like a printer timing out an idle link"""
+        with self._lock:
+            for client in self._clients:
+                try:
+                    client.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                client.close()
+            self._clients = []
+    
+    def stop(self):
+        self.drop_connections()
+        self.server.shutdown()
+        self.server.server_close()
\ No newline at end of file
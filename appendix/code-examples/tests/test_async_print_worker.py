@@ -0,0 +1,127 @@
+"""Asyncio Print Worker Tests
+
+Tests that the asyncio worker prints dispatched jobs to a stand-in network
+printer, that a job taken by a worker that died before starting it is
+recovered once its lease expires, that a job without readable data
+fails without stopping the worker, and that a printer moved to a new
+address gets a new transport.
+
+Source: operations/testing.md - Example 127
+"""
+
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+import async_print_worker
+import job_resume
+import printer_registry
+import queue_manager
+from printer_leases import leases_key
+from stand_in_printer import StandInPrinter
+
+LABELS = [{'zpl_code': f'^XA^FO50,50^FDBox {n}^FS^XZ'} for n in range(1, 121)]
+
+
+@pytest.fixture
+def redis_conn(monkeypatch):
+    server = fakeredis.FakeServer()
+    conn = fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(async_print_worker.aioredis, 'Redis',
+                        lambda **kwargs: fakeredis.FakeAsyncRedis(server=server))
+    monkeypatch.setattr(queue_manager.redis, 'Redis', lambda **kwargs: fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(queue_manager, 'WORKER_MODE', 'async')
+    monkeypatch.setattr(printer_registry, 'redis_conn', conn)
+    monkeypatch.setattr(job_resume, 'redis_conn', conn)
+    for script in ('resume', 'interrupt', 'park'):
+        monkeypatch.setattr(job_resume, f'{script}_script',
+                            conn.register_script(getattr(job_resume, f'{script.upper()}_SCRIPT')))
+    return conn
+
+
+@pytest.fixture
+def printer():
+    printer = StandInPrinter().start()
+    printer_registry.save_printer_config('line1', {
+        'connection_type': 'network', 'ip_address': printer.host, 'raw_port': printer.port
+    })
+    yield printer
+    printer.stop()
+
+
+def run_worker(redis_conn, job_id):
+    """Run a worker until the job finishes; returns its status"""
+    async def main():
+        worker = async_print_worker.AsyncPrintWorker()
+        task = asyncio.create_task(worker.run())
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            status = redis_conn.hget(f"job:{job_id}", 'status')
+            if status in (b'completed', b'failed') and not worker.tasks:
+                break
+            await asyncio.sleep(0.02)
+        task.cancel()
+        return status
+    
+    return asyncio.run(main())
+
+
+def test_prints_dispatched_job(redis_conn, printer):
+    manager = queue_manager.PrintQueueManager()
+    job_id = manager.enqueue_print_job({'printer': 'line1', 'labels': LABELS, 'chunk_size': 50})['job_id']
+    
+    assert run_worker(redis_conn, job_id) == b'completed'
+    assert printer.labels == 120
+    assert redis_conn.hget(f"job:{job_id}", 'checkpoint') == b'120'
+    assert redis_conn.zcard(leases_key('line1')) == 0
+
+
+def test_job_taken_by_dead_worker_is_recovered(redis_conn, printer):
+    manager = queue_manager.PrintQueueManager()
+    job_id = manager.enqueue_print_job({'printer': 'line1', 'labels': LABELS, 'chunk_size': 50})['job_id']
+    # The worker took the job and died before starting it
+    assert redis_conn.lpop('dispatch:default') == job_id.encode()
+    
+    redis_conn.zadd(leases_key('line1'), {job_id: 0})
+    manager.dispatch('line1')
+    
+    assert redis_conn.lrange('dispatch:default', 0, -1) == [job_id.encode()]
+    assert run_worker(redis_conn, job_id) == b'completed'
+    assert printer.labels == 120
+
+
+def test_unreadable_job_fails_without_stopping_worker(redis_conn, printer):
+    manager = queue_manager.PrintQueueManager()
+    job_id = manager.enqueue_print_job({'printer': 'line1', 'labels': LABELS[:10]})['job_id']
+    redis_conn.delete(f"job:{job_id}:data")
+    other_id = manager.enqueue_print_job({'printer': 'line1', 'labels': LABELS[:10]})['job_id']
+    
+    assert run_worker(redis_conn, other_id) == b'completed'
+    assert redis_conn.hget(f"job:{job_id}", 'status') == b'failed'
+    assert redis_conn.zcard(leases_key('line1')) == 0
+
+
+def test_moved_printer_gets_new_transport(redis_conn, printer):
+    moved = StandInPrinter().start()
+    
+    async def main():
+        worker = async_print_worker.AsyncPrintWorker()
+        first = await worker._get_transport('line1')
+        await first.send(LABELS[0]['zpl_code'])
+        assert await worker._get_transport('line1') is first
+        
+        printer_registry.save_printer_config('line1', {
+            'connection_type': 'network', 'ip_address': moved.host, 'raw_port': moved.port
+        })
+        second = await worker._get_transport('line1')
+        await second.send(LABELS[1]['zpl_code'])
+        return first, second
+    
+    try:
+        first, second = asyncio.run(main())
+        assert second is not first and first.writer is None
+        assert (printer.wait_for_labels(1), moved.wait_for_labels(1)) == (1, 1)
+    finally:
+        moved.stop()
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""CUPS Connection Pool Tests
+
+Tests that connections are reused between calls, checked after sitting
+idle, replaced after an error, and that per-job usage is recorded, also
+for jobs running side by side in one process.
+
+Source: operations/testing.md - Example 113
+"""
+
+import asyncio
+
+import fakeredis
+import pytest
+
+import cups
+from cups_pool import STATS_KEY, CUPSConnectionPool
+
+
+class FakeConnection:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+    
+    def getDefault(self):
+        if not self.healthy:
+            raise RuntimeError('connection reset')
+
+
+@pytest.fixture
+def pool():
+    return CUPSConnectionPool(connect=FakeConnection)
+
+
+def test_connection_reused(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    
+    assert second is first
+    assert pool.stats['connects'] == 1
+    assert pool.stats['reuses'] == 1
+
+
+def test_error_discards_connection(pool):
+    with pytest.raises(cups.IPPError):
+        with pool.connection() as broken:
+            raise cups.IPPError(1, 'server-error-service-unavailable')
+    
+    with pool.connection() as conn:
+        pass
+    
+    assert conn is not broken
+    assert pool.stats['connects'] == 2
+
+
+def test_stale_idle_connection_replaced():
+    pool = CUPSConnectionPool(connect=FakeConnection, health_interval=0)
+    with pool.connection() as stale:
+        stale.healthy = False
+    
+    with pool.connection() as conn:
+        pass
+    
+    assert conn is not stale
+    assert pool.stats['health_checks'] == 1
+    assert pool.stats['reconnects'] == 1
+
+
+def test_job_usage_recorded(pool):
+    redis_conn = fakeredis.FakeRedis()
+    with pool.connection():
+        pass
+    usage = pool.track_job()
+    
+    for _ in range(3):
+        with pool.connection():
+            pass
+    pool.record_job(redis_conn, 'job-1', usage)
+    
+    assert redis_conn.hget('job:job-1', 'cups_reuses') == b'3'
+    assert redis_conn.hget('job:job-1', 'cups_connects') is None
+    assert float(redis_conn.hget(STATS_KEY, 'reuses')) == 3
+
+
+def test_concurrent_jobs_count_their_own_usage(pool):
+    def borrow():
+        with pool.connection():
+            pass
+    
+    async def job(connections):
+        usage = pool.track_job()
+        for _ in range(connections):
+            await asyncio.to_thread(borrow)
+        return usage
+    
+    async def run_jobs():
+        return await asyncio.gather(job(2), job(3))
+    
+    first, second = asyncio.run(run_jobs())
+    
+    assert first['connects'] + first['reuses'] == 2
+    assert second['connects'] + second['reuses'] == 3
\ No newline at end of file
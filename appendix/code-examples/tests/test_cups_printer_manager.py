@@ -0,0 +1,124 @@
+"""CUPS Raw Submission Tests
+
+Tests that raw ZPL is streamed into the IPP request in blocks, that a
+stream breaking before its document is finished is cancelled and spooled
+instead, that a failed finishDocument cancels the job and raises, and
+that safe_print retries only submissions CUPS refused.
+
+Source: operations/testing.md - Example 128
+"""
+
+import cups
+import pytest
+
+import cups_printer_manager
+import safe_print_retry
+from cups_printer_manager import PrintError, submit_raw_zpl
+from safe_print_retry import safe_print
+
+ZPL = '^XA^FO50,50^FDBox 1^FS^XZ'
+
+
+class StreamingConnection:
+    """pycups Connection stand-in; ``fail`` names the call that errors"""
+    
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.blocks = []
+        self.printed = []
+        self.cancelled = []
+        self.finished = False
+    
+    def createJob(self, printer_name, title, options):
+        return 7
+    
+    def startDocument(self, printer_name, job_id, name, fmt, last_document):
+        return cups.HTTP_CONTINUE
+    
+    def writeRequestData(self, data, length):
+        if self.fail == 'write' and self.blocks:
+            raise cups.IPPError(cups.IPP_BAD_REQUEST, 'connection reset')
+        self.blocks.append(data[:length])
+        return cups.HTTP_CONTINUE
+    
+    def finishDocument(self, printer_name):
+        if self.fail == 'finish':
+            return cups.IPP_BAD_REQUEST
+        self.finished = True
+        return cups.IPP_OK
+    
+    def printFile(self, printer_name, path, title, options):
+        with open(path) as f:
+            self.printed.append(f.read())
+        return 8
+    
+    def cancelJob(self, job_id, purge_job=False):
+        self.cancelled.append(job_id)
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(cups_printer_manager, 'WRITE_BLOCK_SIZE', 8)
+
+
+def test_streams_zpl_in_blocks():
+    conn = StreamingConnection()
+    
+    assert submit_raw_zpl(conn, 'line1', ZPL) == 7
+    assert b''.join(conn.blocks) == ZPL.encode()
+    assert len(conn.blocks) == 4
+    assert conn.finished and not conn.printed and not conn.cancelled
+
+
+def test_broken_stream_falls_back_to_spooling():
+    conn = StreamingConnection(fail='write')
+    
+    assert submit_raw_zpl(conn, 'line1', ZPL) == 8
+    assert conn.cancelled == [7]
+    assert conn.printed == [ZPL]
+    assert not conn.finished
+
+
+def test_failed_finish_cancels_and_raises():
+    conn = StreamingConnection(fail='finish')
+    
+    with pytest.raises(cups.IPPError):
+        submit_raw_zpl(conn, 'line1', ZPL)
+    
+    assert conn.cancelled == [7]
+    assert not conn.printed
+
+class FakeStatusCache:
+    def get(self, printer_name):
+        return {'status': 'idle'}
+    
+    def refresh_printer(self, printer_name):
+        pass
+
+
+class FlakyManager:
+    """Raises each error in turn, then returns a job ID"""
+    
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+    
+    def print_raw_zpl(self, printer_name, zpl_code):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 9
+
+
+def test_safe_print_retries_only_refused_submissions(monkeypatch):
+    monkeypatch.setattr(safe_print_retry, 'status_cache', FakeStatusCache())
+    monkeypatch.setattr(safe_print_retry.time, 'sleep', lambda seconds: None)
+    
+    manager = FlakyManager(PrintError('Print failed: busy'))
+    assert safe_print('line1', ZPL, manager=manager) == 9
+    assert manager.calls == 2
+    
+    manager = FlakyManager(TypeError('bad argument'))
+    with pytest.raises(TypeError):
+        safe_print('line1', ZPL, manager=manager)
+    assert manager.calls == 1
\ No newline at end of file
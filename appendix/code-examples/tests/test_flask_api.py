@@ -6,7 +6,21 @@ Source: operations/testing.md - Examples 40, 41 & 42
 """
 
 import pytest
-from app import app
+from app import app, manager
+from queue_manager import IDEMPOTENCY_CLAIM_TTL, IDEMPOTENCY_TTL
+
+LABEL = {'zpl_code': '^XA^FO50,50^A0N,50,50^FDTest^FS^XZ'}
+
+
+class FakeStatusCache:
+    def __init__(self, statuses):
+        self.statuses = statuses
+    
+    def get(self, printer_name):
+        return self.statuses.get(printer_name)
+    
+    def all(self):
+        return self.statuses
 
 
 @pytest.fixture
@@ -36,4 +50,118 @@ def test_invalid_printer(client):
         'labels': [{'zpl_code': '^XA^XZ'}]
     }, headers={'Authorization': 'Bearer test-key'})
     
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_duplicate_submission_returns_same_job(client):
+    """A retried submission with the same Idempotency-Key is not enqueued again"""
+    payload = {
+        'printer': 'zebra_z230_line1',
+        'quantity': 1,
+        'labels': [{'zpl_code': '^XA^FO50,50^A0N,50,50^FDTest^FS^XZ'}]
+    }
+    headers = {'Authorization': 'Bearer test-key', 'Idempotency-Key': 'MO/2025/001/7/abc'}
+    
+    first = client.post('/api/print', json=payload, headers=headers)
+    retry = client.post('/api/print', json=payload, headers=headers)
+    
+    assert first.status_code == 201
+    assert retry.status_code == 200
+    assert retry.json['job_id'] == first.json['job_id']
+
+
+def test_bulk_submission(client):
+    """POST /api/print/bulk queues every job and returns IDs in order"""
+    label = {'zpl_code': '^XA^FO50,50^A0N,50,50^FDTest^FS^XZ'}
+    response = client.post('/api/print/bulk', json={'jobs': [
+        {'printer': 'zebra_z230_line1', 'quantity': 1, 'labels': [label],
+         'job_metadata': {'mo_reference': f'MO/2025/00{n}'}}
+        for n in range(1, 4)
+    ]}, headers={'Authorization': 'Bearer test-key'})
+    
+    assert response.status_code == 201
+    assert len({job['job_id'] for job in response.json['jobs']}) == 3
+
+def test_batch_status(client):
+    """GET /api/status?ids= returns every known job and lists unknown IDs"""
+    headers = {'Authorization': 'Bearer test-key'}
+    job_ids = [
+        client.post('/api/print', json={
+            'printer': 'zebra_z230_line1',
+            'quantity': 1,
+            'labels': [{'zpl_code': '^XA^FO50,50^A0N,50,50^FDTest^FS^XZ'}]
+        }, headers=headers).json['job_id']
+        for _ in range(2)
+    ]
+    
+    response = client.get(f"/api/status?ids={','.join(job_ids)},missing", headers=headers)
+    
+    assert response.status_code == 200
+    assert set(response.json['jobs']) == set(job_ids)
+    assert response.json['not_found'] == ['missing']
+
+
+def test_network_printer_missing_from_cups(client, monkeypatch):
+    """Printers reached over raw TCP need not exist in CUPS"""
+    monkeypatch.setattr('app.status_cache', FakeStatusCache({}))
+    headers = {'Authorization': 'Bearer test-key'}
+    config = {'connection_type': 'network', 'ip_address': '10.0.0.9', 'cups_uri': False}
+    
+    response = client.post('/api/print', json={
+        'printer': 'zebra_raw_line9', 'printer_config': config, 'labels': [LABEL]
+    }, headers=headers)
+    assert response.status_code == 201
+    
+    # The printer is now in the registry, so later jobs may leave out its config
+    response = client.post('/api/print/bulk', json={'jobs': [
+        {'printer': 'zebra_raw_line9', 'labels': [LABEL]}
+    ]}, headers=headers)
+    assert response.status_code == 201
+
+
+def test_failed_status_check_does_not_make_printer_known(client, monkeypatch):
+    """A cache entry left by a failed CUPS check is not a known printer"""
+    monkeypatch.setattr('app.status_cache', FakeStatusCache({
+        'invalid_printer': {'name': 'invalid_printer', 'status': 'error', 'accepting': False}
+    }))
+    headers = {'Authorization': 'Bearer test-key'}
+    
+    single = client.post('/api/print', json={'printer': 'invalid_printer', 'labels': [LABEL]}, headers=headers)
+    bulk = client.post('/api/print/bulk', json={'jobs': [
+        {'printer': 'invalid_printer', 'labels': [LABEL]}
+    ]}, headers=headers)
+    
+    assert single.status_code == 404
+    assert bulk.status_code == 404
+
+
+def test_idempotency_key_kept_once_job_is_written(client):
+    """A claim whose job was never written lapses instead of lasting a day"""
+    headers = {'Authorization': 'Bearer test-key', 'Idempotency-Key': 'MO/2025/002/4f2a'}
+    config = {'connection_type': 'network', 'ip_address': '10.0.0.9'}
+    
+    # The server died between claiming the key and writing the job
+    manager._claim_idempotency_keys({0: ('MO/2025/001/9c1e', 'lost-job')})
+    assert 0 < manager.redis_conn.ttl('idem:MO/2025/001/9c1e') <= IDEMPOTENCY_CLAIM_TTL
+    
+    response = client.post('/api/print', json={
+        'printer': 'zebra_raw_line9', 'printer_config': config, 'labels': [LABEL]
+    }, headers=headers)
+    assert response.status_code == 201
+    assert manager.redis_conn.ttl('idem:MO/2025/002/4f2a') > IDEMPOTENCY_TTL - 60
+
+
+def test_claim_lapsing_before_lookup_is_claimed_again(monkeypatch):
+    """A duplicate whose claim expires before it is read claims the key"""
+    key = 'MO/2025/003/77aa'
+    manager.redis_conn.set(f"idem:{key}", 'lost-job', ex=IDEMPOTENCY_CLAIM_TTL)
+    get = manager.redis_conn.get
+    
+    def get_after_expiry(name):
+        manager.redis_conn.delete(name)
+        monkeypatch.setattr(manager.redis_conn, 'get', get)
+        return get(name)
+    
+    monkeypatch.setattr(manager.redis_conn, 'get', get_after_expiry)
+    
+    assert manager._claim_idempotency_keys({0: (key, 'new-job')}) == {}
+    assert manager.redis_conn.get(f"idem:{key}") == b'new-job'
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""Flow Control Tests
+
+Tests that the worker sends at full speed below the high watermark and
+backs off until the printer backlog drains to the low watermark.
+
+Source: operations/testing.md - Example 96
+"""
+
+import pytest
+
+from flow_control import FlowController
+from printer_transport import PrintTransportError
+
+
+class ScriptedTransport:
+    """Transport whose backlog() returns a scripted sequence"""
+    
+    def __init__(self, backlogs):
+        self.backlogs = list(backlogs)
+        self.checks = 0
+    
+    def backlog(self):
+        self.checks += 1
+        return self.backlogs.pop(0) if len(self.backlogs) > 1 else self.backlogs[0]
+
+
+def test_no_wait_below_high_watermark():
+    transport = ScriptedTransport([2])
+    flow = FlowController(transport, high_watermark=3, low_watermark=1, poll_interval=0)
+    
+    assert flow.wait() == 0
+    assert transport.checks == 1
+
+
+def test_backs_off_until_low_watermark():
+    """Reaching the high watermark waits for the backlog to drain, not just dip"""
+    transport = ScriptedTransport([3, 3, 2, 1])
+    flow = FlowController(transport, high_watermark=3, low_watermark=1, poll_interval=0.001)
+    
+    assert flow.wait() > 0
+    assert transport.checks == 4
+
+
+def test_stopped_printer_times_out():
+    """A stopped printer reports an infinite backlog and eventually fails"""
+    transport = ScriptedTransport([float('inf')])
+    flow = FlowController(
+        transport, high_watermark=3, low_watermark=1,
+        poll_interval=0.001, max_interval=0.001, timeout=0.01
+    )
+    
+    with pytest.raises(PrintTransportError):
+        flow.wait()
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""Graphic Cache Tests
+
+Tests that embedded ^GF graphics are downloaded once per printer, recalled
+with ^XG, and downloaded again after the printer may have lost them.
+
+Source: operations/testing.md - Example 100
+"""
+
+import fakeredis
+import pytest
+
+from graphic_cache import GraphicCache, extract_graphics
+from printer_transport import PrintTransportError
+
+LOGO = '^FO50,20^GFA,16,16,2,FFFF0000FFFF0000FFFF0000FFFF0000^FS'
+LABEL = f"^XA{LOGO}^FO50,100^FDLot: L1^FS^XZ"
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.sent = []
+        self.connects = 1
+    
+    def send(self, zpl_code, title="Label"):
+        self.sent.append(zpl_code)
+
+
+@pytest.fixture
+def cache():
+    return GraphicCache(fakeredis.FakeRedis())
+
+
+def test_graphic_replaced_with_recall():
+    zpl, downloads = extract_graphics(LABEL)
+    name = next(iter(downloads))
+    
+    assert '^GF' not in zpl
+    assert f"^FO50,20^XG{name},1,1^FS" in zpl
+    assert downloads[name] == f"~DG{name},16,2,FFFF0000FFFF0000FFFF0000FFFF0000"
+
+
+def test_z64_graphic_uses_dy():
+    _, downloads = extract_graphics('^XA^FO0,0^GFA,8,8,1,:Z64:eJxjYGBgAAAABAAB:1a2b^FS^XZ')
+    
+    assert next(iter(downloads.values())).startswith('~DYR:')
+
+
+def test_downloaded_once_per_printer(cache):
+    transport = RecordingTransport()
+    
+    cache.prepare('zebra-1', transport, LABEL)
+    cache.prepare('zebra-1', transport, LABEL)
+    cache.prepare('zebra-2', transport, LABEL)
+    
+    downloads = [zpl for zpl in transport.sent if zpl.startswith('~DG')]
+    assert len(downloads) == 2
+
+
+def test_reconnect_triggers_download(cache):
+    transport = RecordingTransport()
+    cache.prepare('zebra-1', transport, LABEL)
+    
+    transport.connects += 1
+    cache.prepare('zebra-1', transport, LABEL)
+    
+    assert len(transport.sent) == 2
+
+
+def test_invalidate_triggers_download(cache):
+    transport = RecordingTransport()
+    cache.prepare('zebra-1', transport, LABEL)
+    
+    cache.invalidate('zebra-1')
+    cache.prepare('zebra-1', transport, LABEL)
+    
+    assert len(transport.sent) == 2
+
+
+def test_label_without_graphics_untouched(cache):
+    transport = RecordingTransport()
+    zpl = '^XA^FO50,100^FDLot: L1^FS^XZ'
+    
+    assert cache.prepare('zebra-1', transport, zpl) == zpl
+    assert transport.sent == []
+
+
+def test_failed_download_stays_missing(cache):
+    """A graphic is only resident once its download went through"""
+    transport = RecordingTransport()
+    
+    def failing_send(zpl_code, title):
+        raise PrintTransportError('connection reset')
+    
+    with pytest.raises(PrintTransportError):
+        cache.prepare('zebra-1', transport, LABEL, send=failing_send)
+    cache.prepare('zebra-1', transport, LABEL)
+    
+    assert len(transport.sent) == 1
\ No newline at end of file
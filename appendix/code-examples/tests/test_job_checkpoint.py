@@ -0,0 +1,159 @@
+"""Job Checkpoint Tests
+
+Tests that a resumed job continues at the exact label after its last
+checkpoint, that a superseded worker stops, and that resume and the
+failed-label retry are idempotent.
+
+Source: operations/testing.md - Example 102
+"""
+
+import json
+
+import fakeredis
+import pytest
+
+import job_resume
+from job_checkpoint import JobCheckpoint, JobSuperseded
+from print_worker import iter_label_chunks
+from printer_leases import pending_key
+
+
+@pytest.fixture
+def redis_conn(monkeypatch):
+    conn = fakeredis.FakeRedis()
+    conn.hset('job:job-1', mapping={'status': 'queued', 'printer': 'line1', 'priority': 'default'})
+    monkeypatch.setattr(job_resume, 'redis_conn', conn)
+    monkeypatch.setattr(job_resume, 'resume_script', conn.register_script(job_resume.RESUME_SCRIPT))
+    monkeypatch.setattr(job_resume, 'interrupt_script', conn.register_script(job_resume.INTERRUPT_SCRIPT))
+    return conn
+
+
+def test_resume_starts_after_checkpoint(redis_conn):
+    first_run = JobCheckpoint(redis_conn, 'job-1')
+    assert first_run.claim() == 1
+    
+    first_run.mark(1, 50, atomic=True)
+    first_run.ack(50)
+    first_run.mark(51, 100, atomic=True)  # worker dies mid-chunk
+    
+    second_run = JobCheckpoint(redis_conn, 'job-1')
+    assert second_run.claim() == 51
+    # The CUPS job may have been finished before the worker died
+    assert redis_conn.lrange('job:job-1:uncertain', 0, -1) == [b'51-100']
+
+
+@pytest.mark.parametrize('atomic, uncertain', [(True, []), (False, [b'1-50'])])
+def test_parked_job_resends_failed_chunk(redis_conn, monkeypatch, atomic, uncertain):
+    monkeypatch.setattr(job_resume, 'park_script', redis_conn.register_script(job_resume.PARK_SCRIPT))
+    first_run = JobCheckpoint(redis_conn, 'job-1')
+    first_run.claim()
+    redis_conn.hset('job:job-1', 'status', 'printing')
+    first_run.mark(1, 50, atomic=atomic)  # the send fails and the breaker opens
+    job_resume.park_job('job-1')
+    
+    assert JobCheckpoint(redis_conn, 'job-1').claim() == 1
+    assert redis_conn.lrange('job:job-1:uncertain', 0, -1) == uncertain
+
+
+def test_failed_labels_recorded_with_checkpoint(redis_conn):
+    run = JobCheckpoint(redis_conn, 'job-1')
+    run.claim()
+    run.mark(1, 3, atomic=True)
+    run.ack(3, failed=range(1, 4))
+    
+    assert redis_conn.hget('job:job-1', 'checkpoint') == b'3'
+    assert redis_conn.lrange('job:job-1:failed', 0, -1) == [b'1', b'2', b'3']
+
+
+def test_superseded_worker_stops(redis_conn):
+    stale_run = JobCheckpoint(redis_conn, 'job-1')
+    stale_run.claim()
+    JobCheckpoint(redis_conn, 'job-1').claim()
+    
+    with pytest.raises(JobSuperseded):
+        stale_run.mark(1, 50, atomic=True)
+    assert stale_run.taken_over()
+
+
+def test_cancelled_job_stops_at_next_chunk(redis_conn):
+    run = JobCheckpoint(redis_conn, 'job-1')
+    run.claim()
+    job_resume.cancel_job('job-1')
+    
+    with pytest.raises(JobSuperseded):
+        run.mark(1, 50, atomic=True)
+    assert not run.taken_over()
+
+
+def test_resume_is_idempotent(redis_conn):
+    redis_conn.hset('job:job-1', 'status', 'interrupted')
+    
+    assert job_resume.resume_job('job-1') is True
+    assert job_resume.resume_job('job-1') is False
+    assert redis_conn.lrange(pending_key('line1', 'default'), 0, -1) == [b'job-1']
+
+
+def test_recover_only_jobs_without_a_worker(redis_conn):
+    redis_conn.hset('job:job-1', 'status', 'completed')
+    assert job_resume.recover_job('job-1') is False
+    
+    redis_conn.hset('job:job-1', 'status', 'printing')
+    assert job_resume.recover_job('job-1') is True
+    assert redis_conn.hget('job:job-1', 'status') == b'queued'
+    # Requeued once; it is waiting to be admitted again
+    assert job_resume.recover_job('job-1') is False
+    
+    # Taken from RQ by a worker that died before starting it
+    redis_conn.delete(pending_key('line1', 'default'))
+    assert job_resume.recover_job('job-1') is True
+
+
+def test_chunks_stay_aligned_on_resume():
+    labels = [{'zpl_code': str(i)} for i in range(1, 121)]
+    chunks = list(iter_label_chunks(labels, chunk_size=50, start=61))
+    
+    assert [(c['first'], c['last']) for c in chunks] == [(61, 100), (101, 120)]
+
+
+@pytest.mark.parametrize('start, chunk_size, ranges', [
+    (1, 50, [(1, 50), (51, 100)]),
+    (50, 50, [(50, 50), (51, 100)]),
+    (51, 50, [(51, 100)]),
+    (100, 50, [(100, 100)]),
+    (101, 50, []),
+    (30, 0, [(30, 100)]),
+])
+def test_chunk_boundaries(start, chunk_size, ranges):
+    """A checkpoint on a chunk boundary neither resends nor skips a label"""
+    labels = [{'zpl_code': str(i)} for i in range(1, 101)]
+    chunks = list(iter_label_chunks(labels, chunk_size=chunk_size, start=start))
+    
+    assert [(c['first'], c['last']) for c in chunks] == ranges
+    assert [c['zpl'].split('\n') for c in chunks] == [
+        [str(i) for i in range(first, last + 1)] for first, last in ranges
+    ]
+
+
+def test_failed_label_retry_created_once(redis_conn):
+    config = {'connection_type': 'network', 'ip_address': '10.0.0.5', 'raw_port': 9100}
+    redis_conn.set('job:job-1:data', json.dumps({
+        'labels': [{'zpl_code': str(i)} for i in range(1, 6)], 'printer': 'line1',
+        'printer_config': config, 'chunk_size': 2
+    }))
+    redis_conn.rpush('job:job-1:failed', 2, 4)
+    concurrent = []
+    
+    def enqueue(job_data, priority):
+        # A second call while the retry is being created gets no job ID
+        concurrent.append(job_resume.resume_failed_job('job-1', enqueue))
+        return {'job_id': 'job-2', 'status': 'queued', 'data': job_data}
+    
+    result = job_resume.resume_failed_job('job-1', enqueue)
+    
+    assert result['data'] == {
+        'labels': [{'zpl_code': '2'}, {'zpl_code': '4'}], 'printer': 'line1',
+        'printer_config': config, 'chunk_size': 2
+    }
+    assert concurrent == [None]
+    assert job_resume.resume_failed_job('job-1', enqueue) == {'job_id': 'job-2', 'status': 'queued'}
+    assert redis_conn.ttl('job:job-1:retry') == -1
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""Completion Estimate Tests
+
+Tests the printer rate average, the labels counted ahead of running and
+pending jobs, ETAs of pooled jobs and the least-loaded pool printer.
+
+Source: operations/testing.md - Example 126
+"""
+
+import fakeredis
+import pytest
+
+import job_eta
+from job_eta import PrinterBacklog, estimate_completion, least_loaded, record_rate
+from printer_leases import leases_key, pending_key
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def redis_conn(monkeypatch):
+    monkeypatch.setattr(job_eta.time, 'time', lambda: NOW)
+    return fakeredis.FakeRedis()
+
+
+def add_job(conn, job_id, printer, quantity, current=0, tier='default', running=False):
+    conn.hset(f"job:{job_id}", mapping={
+        'status': 'printing' if running else 'queued', 'printer': printer,
+        'priority': tier, 'quantity': quantity, 'current_label': current
+    })
+    if running:
+        conn.zadd(leases_key(printer), {job_id: NOW + 60})
+    else:
+        conn.rpush(pending_key(printer, tier), job_id)
+
+
+def test_overlapping_runs_count_printer_time_once(redis_conn, monkeypatch):
+    # Two 100-label jobs shared the printer; the second finished 5 s later
+    record_rate(redis_conn, 'zebra1', 100, 15)
+    monkeypatch.setattr(job_eta.time, 'time', lambda: NOW + 5)
+    record_rate(redis_conn, 'zebra1', 100, 20)
+    
+    assert PrinterBacklog(redis_conn, 'zebra1').rate == pytest.approx(200 / 20, rel=0.01)
+
+
+def test_unmeasured_printer_uses_default_rate(redis_conn):
+    assert PrinterBacklog(redis_conn, 'zebra1').rate == job_eta.DEFAULT_RATE
+
+
+def test_pending_job_waits_for_running_and_higher_tiers(redis_conn):
+    add_job(redis_conn, 'running', 'zebra1', 200, current=150, running=True)
+    add_job(redis_conn, 'urgent', 'zebra1', 20, tier='high')
+    add_job(redis_conn, 'first', 'zebra1', 100)
+    add_job(redis_conn, 'job', 'zebra1', 40)
+    add_job(redis_conn, 'after', 'zebra1', 100)
+    add_job(redis_conn, 'bulk', 'zebra1', 500, tier='low')
+    
+    backlog = PrinterBacklog(redis_conn, 'zebra1')
+    
+    assert backlog.labels_ahead('job', 'default', 40) == 50 + 20 + 100 + 40
+    assert estimate_completion(redis_conn, {'job': redis_conn.hgetall('job:job')}) == {
+        'job': NOW + 210 / job_eta.DEFAULT_RATE
+    }
+
+
+def test_running_jobs_share_the_printer(redis_conn):
+    add_job(redis_conn, 'short', 'zebra1', 30, running=True)
+    add_job(redis_conn, 'long', 'zebra1', 300, current=100, running=True)
+    
+    backlog = PrinterBacklog(redis_conn, 'zebra1')
+    
+    assert backlog.labels_ahead('short', 'default', 30) == 60
+    assert backlog.labels_ahead('long', 'default', 200) == 230
+
+
+def test_pooled_job_finishes_with_its_last_shard(redis_conn):
+    redis_conn.hset('job:job-1', mapping={'status': 'printing', 'shards': 'job-1.1,job-1.2,job-1.3'})
+    add_job(redis_conn, 'job-1.1', 'zebra1', 100, current=100, running=True)
+    redis_conn.hset('job:job-1.1', 'status', 'completed')
+    add_job(redis_conn, 'job-1.2', 'zebra2', 100, current=20, running=True)
+    add_job(redis_conn, 'job-1.3', 'zebra3', 100, current=60, running=True)
+    
+    estimates = estimate_completion(redis_conn, {'job-1': redis_conn.hgetall('job:job-1')})
+    
+    assert estimates == {'job-1': NOW + 80 / job_eta.DEFAULT_RATE}
+
+
+def test_finished_jobs_have_no_estimate(redis_conn):
+    redis_conn.hset('job:done', mapping={'status': 'completed', 'printer': 'zebra1'})
+    
+    assert estimate_completion(redis_conn, {'done': redis_conn.hgetall('job:done')}) == {}
+
+
+def test_least_loaded_printer_drains_first(redis_conn):
+    add_job(redis_conn, 'a', 'zebra1', 100, running=True)
+    add_job(redis_conn, 'b', 'zebra2', 300, running=True)
+    # zebra2 prints five times as fast
+    redis_conn.hset(job_eta.rate_key('zebra2'), mapping={'labels': 500, 'seconds': 25})
+    
+    assert least_loaded(redis_conn, ['zebra1', 'zebra2']) == 'zebra2'
+    assert least_loaded(redis_conn, ['zebra1', 'zebra2', 'zebra3']) == 'zebra3'
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""Job Event Stream Tests
+
+Tests that progress flushes publish job events, and that the event
+iterator filters by job and printer and resumes after a given event ID.
+
+Source: operations/testing.md - Example 109
+"""
+
+import fakeredis
+import pytest
+
+from job_events import format_sse, iter_events, queue_event
+from progress_reporter import ProgressReporter
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis()
+
+
+def take(events, count):
+    return [next(events) for _ in range(count)]
+
+
+def test_progress_flush_publishes_event(redis_conn):
+    progress = ProgressReporter(redis_conn, 'job-1', printer_name='line1')
+    progress.set_status('printing', chunk_size=50)
+    
+    (event_id, event), = take(iter_events(redis_conn, last_id='0', block=0.1), 1)
+    assert event == {'job_id': 'job-1', 'printer': 'line1', 'status': 'printing', 'chunk_size': '50'}
+
+
+def test_filter_by_job_and_printer(redis_conn):
+    queue_event(redis_conn, 'job-1', 'line1', status='queued')
+    queue_event(redis_conn, 'job-2', 'line2', status='queued')
+    queue_event(redis_conn, 'job-3', 'line1', status='queued')
+    
+    by_job = take(iter_events(redis_conn, '0', job_ids={'job-2'}, block=0.1), 1)
+    by_printer = take(iter_events(redis_conn, '0', printers={'line1'}, block=0.1), 2)
+    
+    assert [event['job_id'] for _, event in by_job] == ['job-2']
+    assert [event['job_id'] for _, event in by_printer] == ['job-1', 'job-3']
+
+
+def test_resume_after_last_event_id(redis_conn):
+    queue_event(redis_conn, 'job-1', 'line1', status='printing')
+    first_id, _ = next(iter_events(redis_conn, '0', block=0.1))
+    queue_event(redis_conn, 'job-1', 'line1', status='completed')
+    
+    _, event = next(iter_events(redis_conn, first_id, block=0.1))
+    assert event['status'] == 'completed'
+
+
+def test_idle_stream_sends_keepalive(redis_conn):
+    event = next(iter_events(redis_conn, '$', block=0.1))
+    
+    assert format_sse(*event) == ": keepalive\n\n"
\ No newline at end of file
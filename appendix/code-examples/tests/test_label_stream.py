@@ -0,0 +1,62 @@
+"""Label Stream Tests
+
+Tests that streamed uploads are read back in order as they arrive, and
+that a stalled or aborted upload fails the job instead of hanging it.
+
+Source: operations/testing.md - Example 105
+"""
+
+import fakeredis
+import pytest
+
+from label_stream import LabelStreamWriter, LabelUploadError, read_labels, stream_labels
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis()
+
+
+def test_labels_read_back_in_order(redis_conn):
+    writer = LabelStreamWriter(redis_conn, 'job-1', batch_size=3)
+    for idx in range(1, 8):
+        writer.append({'zpl_code': f'^XA^FD{idx}^FS^XZ', 'box_number': idx})
+    writer.close()
+    
+    labels = list(stream_labels(redis_conn, 'job-1', timeout=0.1))
+    assert [label['box_number'] for label in labels] == list(range(1, 8))
+    assert redis_conn.hget('job:job-1', 'quantity') == b'7'
+
+
+def test_worker_reads_before_upload_finishes(redis_conn):
+    writer = LabelStreamWriter(redis_conn, 'job-1', batch_size=2)
+    writer.append({'box_number': 1})
+    writer.append({'box_number': 2})
+    
+    labels = stream_labels(redis_conn, 'job-1', timeout=0.1)
+    assert next(labels)['box_number'] == 1
+    assert next(labels)['box_number'] == 2
+    
+    writer.append({'box_number': 3})
+    writer.close()
+    assert [label['box_number'] for label in labels] == [3]
+
+
+def test_stalled_upload_raises(redis_conn):
+    writer = LabelStreamWriter(redis_conn, 'job-1', batch_size=1)
+    writer.append({'box_number': 1})
+    
+    labels = stream_labels(redis_conn, 'job-1', timeout=0.1)
+    next(labels)
+    with pytest.raises(LabelUploadError):
+        next(labels)
+
+
+def test_aborted_upload_raises(redis_conn):
+    writer = LabelStreamWriter(redis_conn, 'job-1')
+    writer.append({'box_number': 1})
+    writer.close(error='Invalid label line 2')
+    
+    with pytest.raises(LabelUploadError):
+        list(stream_labels(redis_conn, 'job-1', timeout=0.1))
+    assert read_labels(redis_conn, 'job-1') == [{'box_number': 1}]
\ No newline at end of file
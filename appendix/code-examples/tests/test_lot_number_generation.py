@@ -1,6 +1,7 @@
 """Unit Tests for Lot Number Generation
 
-Tests for lot number uniqueness and sequential numbering.
+Tests for lot number uniqueness, sequential numbering and a constant
+number of queries per MO split.
 
 Source: operations/testing.md - Examples 36 & 37
 """
@@ -33,4 +34,22 @@ class TestLotNumberGeneration(TransactionCase):
         
         # Check sequential
         for i in range(1, len(sequences)):
-            self.assertEqual(sequences[i], sequences[i-1] + 1)
\ No newline at end of file
+            self.assertEqual(sequences[i], sequences[i-1] + 1)
+    
+    def test_query_count_independent_of_quantity(self):
+        """Verify a large split takes no more queries than a small one"""
+        mo = self.env.ref('mrp.test_mo')
+        generator = self.env['lot.number.generator']
+        
+        # The first split may create the year's sequence range
+        generator.generate_for_mo_split(mo, quantity=1)
+        
+        counts = []
+        for quantity in (2, 10):
+            generator.flush()
+            start = self.cr.sql_log_count
+            generator.generate_for_mo_split(mo, quantity=quantity)
+            generator.flush()
+            counts.append(self.cr.sql_log_count - start)
+        
+        self.assertEqual(counts[0], counts[1])
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""Print Metrics Tests
+
+Tests that observations from several processes add up in Redis and render
+as cumulative Prometheus histograms, counters and queue depth gauges.
+
+Source: operations/testing.md - Example 119
+"""
+
+import fakeredis
+import pytest
+
+from print_metrics import PrintMetrics, render_metrics
+from printer_leases import pending_key
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis()
+
+
+def test_processes_aggregate_in_redis(redis_conn):
+    worker_a, worker_b = PrintMetrics(), PrintMetrics()
+    
+    worker_a.inc('print_retries_total', printer='line1')
+    worker_b.inc('print_retries_total', 2, printer='line1')
+    worker_a.flush(redis_conn)
+    worker_b.flush(redis_conn)
+    
+    assert 'print_retries_total{printer="line1"} 3' in render_metrics(redis_conn)
+
+
+def test_histogram_buckets_are_cumulative(redis_conn):
+    metrics = PrintMetrics()
+    for seconds in (0.5, 3, 45, 7200):
+        metrics.observe('print_queue_wait_seconds', seconds, printer='line1', tier='high')
+    metrics.flush(redis_conn)
+    
+    output = render_metrics(redis_conn)
+    labels = 'printer="line1",tier="high"'
+    assert f'print_queue_wait_seconds_bucket{{{labels},le="1"}} 1' in output
+    assert f'print_queue_wait_seconds_bucket{{{labels},le="5"}} 2' in output
+    assert f'print_queue_wait_seconds_bucket{{{labels},le="3600"}} 3' in output
+    assert f'print_queue_wait_seconds_bucket{{{labels},le="+Inf"}} 4' in output
+    assert f'print_queue_wait_seconds_count{{{labels}}} 4' in output
+    assert f'print_queue_wait_seconds_sum{{{labels}}} 7248.5' in output
+
+
+def test_nothing_written_until_flush(redis_conn):
+    metrics = PrintMetrics(flush_interval=60)
+    metrics.inc('print_labels_total', 50, printer='line1')
+    
+    metrics.flush_if_due(redis_conn)
+    assert redis_conn.keys('metrics:*') == []
+    
+    metrics.flush(redis_conn)
+    assert redis_conn.hget('metrics:print_labels_total', 'printer="line1"') == b'50'
+
+
+def test_queue_depth_per_tier(redis_conn):
+    redis_conn.sadd('printers:known', 'line1')
+    redis_conn.rpush(pending_key('line1', 'low'), 'job-1', 'job-2')
+    
+    output = render_metrics(redis_conn)
+    
+    assert 'print_queue_depth{printer="line1",tier="low"} 2' in output
+    assert 'print_queue_depth{printer="line1",tier="high"} 0' in output
\ No newline at end of file
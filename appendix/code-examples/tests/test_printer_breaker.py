@@ -0,0 +1,119 @@
+"""Printer Circuit Breaker Tests
+
+Tests that repeated send failures open a printer's breaker and fail fast,
+that a running job parks at the head of its queue, and that a successful
+probe and first chunk close the breaker again.
+
+Source: operations/testing.md - Example 115
+"""
+
+import fakeredis
+import pytest
+
+import job_resume
+import print_worker
+from print_worker import print_single_label
+from printer_breaker import OPEN_KEY, PrinterBreaker, PrinterUnavailable
+from printer_leases import pending_key
+from printer_transport import PrintTransportError
+
+
+class DeadTransport:
+    def __init__(self):
+        self.attempts = 0
+    
+    def send(self, zpl_code, title="Label"):
+        self.attempts += 1
+        raise PrintTransportError('connection refused')
+
+
+class FlakyTransport:
+    """Fails the sends whose number (from 1) is listed"""
+    
+    def __init__(self, failing):
+        self.failing = set(failing)
+        self.attempts = 0
+    
+    def send(self, zpl_code, title="Label"):
+        self.attempts += 1
+        if self.attempts in self.failing:
+            raise PrintTransportError('connection reset')
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis()
+
+
+def test_breaker_opens_after_threshold(redis_conn):
+    breaker = PrinterBreaker(redis_conn, threshold=3)
+    
+    assert breaker.record_failure('line1') == 'closed'
+    assert breaker.record_failure('line1') == 'closed'
+    assert breaker.record_failure('line1') == 'open'
+    assert breaker.state('line1') == 'open'
+    assert redis_conn.zscore(OPEN_KEY, 'line1') is not None
+
+
+def test_success_resets_failure_count(redis_conn):
+    breaker = PrinterBreaker(redis_conn, threshold=2)
+    
+    breaker.record_failure('line1')
+    breaker.record_success('line1')
+    
+    assert breaker.record_failure('line1') == 'closed'
+
+
+def test_open_breaker_fails_fast(redis_conn):
+    breaker = PrinterBreaker(redis_conn, threshold=1)
+    transport = DeadTransport()
+    
+    with pytest.raises(PrinterUnavailable):
+        print_single_label(transport, '^XA^XZ', breaker=breaker, printer_name='line1')
+    
+    assert transport.attempts == 1
+
+
+def test_half_open_closes_on_success_and_reopens_on_failure(redis_conn):
+    breaker = PrinterBreaker(redis_conn, threshold=1)
+    breaker.record_failure('line1')
+    first_retry = redis_conn.zscore(OPEN_KEY, 'line1')
+    
+    breaker.half_open('line1')
+    assert breaker.state('line1') == 'half_open'
+    assert breaker.record_failure('line1') == 'open'
+    assert redis_conn.zscore(OPEN_KEY, 'line1') > first_retry
+    
+    breaker.half_open('line1')
+    assert breaker.record_success('line1')
+    assert breaker.state('line1') == 'closed'
+    assert redis_conn.zcard(OPEN_KEY) == 0
+
+
+def test_parked_job_waits_at_head_of_queue(redis_conn, monkeypatch):
+    monkeypatch.setattr(job_resume, 'redis_conn', redis_conn)
+    monkeypatch.setattr(job_resume, 'park_script', redis_conn.register_script(job_resume.PARK_SCRIPT))
+    redis_conn.hset('job:job-1', mapping={'status': 'printing', 'printer': 'line1', 'priority': 'default'})
+    redis_conn.rpush(pending_key('line1', 'default'), 'job-2')
+    
+    assert job_resume.park_job('job-1')
+    assert not job_resume.park_job('job-1')
+    
+    assert redis_conn.hget('job:job-1', 'status') == b'parked'
+    assert redis_conn.lrange(pending_key('line1', 'default'), 0, -1) == [b'job-1', b'job-2']
+
+
+def test_first_try_sends_reset_failure_count(redis_conn, monkeypatch):
+    """Failures separated by clean sends never add up to an open breaker"""
+    monkeypatch.setattr(print_worker.time, 'sleep', lambda seconds: None)
+    breaker = PrinterBreaker(redis_conn, threshold=4)
+    # One chunk fails all 3 attempts, 20 chunks go through, then a one-off blip
+    transport = FlakyTransport(failing=[1, 2, 3, 24])
+    
+    assert not print_single_label(transport, '^XA^XZ', breaker=breaker, printer_name='line1')
+    for _ in range(20):
+        assert print_single_label(transport, '^XA^XZ', breaker=breaker, printer_name='line1')
+    assert print_single_label(transport, '^XA^XZ', breaker=breaker, printer_name='line1')
+    
+    assert transport.attempts == 25
+    assert breaker.state('line1') == 'closed'
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""Printer Lease Tests
+
+Tests per-printer concurrency limits, priority order within a printer,
+reclaiming slots from workers that died without releasing them while
+keeping those of jobs still waiting for a worker, and yielding a slot to a
+waiting higher-priority job.
+
+Source: operations/testing.md - Example 93
+"""
+
+import time
+
+import fakeredis
+import pytest
+
+import printer_leases
+from printer_leases import LEASE_TTL, PrinterLeases, pending_key
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis()
+
+
+def test_concurrency_limit_enforced(redis_conn):
+    """A printer never holds more leases than its limit"""
+    leases = PrinterLeases(redis_conn)
+    redis_conn.rpush(pending_key('line1', 'default'), 'a', 'b', 'c')
+    
+    assert leases.admit_next('line1', 2) == ('a', 'default')
+    assert leases.admit_next('line1', 2) == ('b', 'default')
+    assert leases.admit_next('line1', 2) is None
+    
+    leases.release('line1', 'a')
+    assert leases.admit_next('line1', 2) == ('c', 'default')
+
+
+def test_priority_order_within_printer(redis_conn):
+    """High priority jobs are admitted before older lower-priority ones"""
+    leases = PrinterLeases(redis_conn)
+    redis_conn.rpush(pending_key('line1', 'low'), 'bulk')
+    redis_conn.rpush(pending_key('line1', 'high'), 'reprint')
+    
+    assert leases.admit_next('line1', 1) == ('reprint', 'high')
+
+
+def test_printers_do_not_share_slots(redis_conn):
+    """A full printer does not block another printer's jobs"""
+    leases = PrinterLeases(redis_conn)
+    redis_conn.rpush(pending_key('line1', 'default'), 'a', 'b')
+    redis_conn.rpush(pending_key('line2', 'default'), 'c')
+    
+    leases.admit_next('line1', 1)
+    assert leases.admit_next('line1', 1) is None
+    assert leases.admit_next('line2', 1) == ('c', 'default')
+
+
+def test_expired_lease_frees_slot(redis_conn):
+    """A dead worker's lease expires and the slot is reused"""
+    leases = PrinterLeases(redis_conn, ttl=-1)  # Leases expire immediately
+    redis_conn.rpush(pending_key('line1', 'default'), 'a', 'b')
+    
+    leases.admit_next('line1', 1)
+    redis_conn.hset('job:a', 'status', 'printing')
+    assert leases.admit_next('line1', 1) is None
+    
+    assert leases.reclaim_expired('line1') == ['a']
+    assert leases.admit_next('line1', 1) == ('b', 'default')
+
+
+def test_queued_job_keeps_lease_past_ttl(redis_conn, monkeypatch):
+    """A job waiting in RQ for a worker does not lose its slot"""
+    leases = PrinterLeases(redis_conn)
+    redis_conn.rpush(pending_key('line1', 'default'), 'a', 'b')
+    redis_conn.hset('job:a', mapping={'status': 'queued', 'priority': 'default'})
+    leases.admit_next('line1', 1)
+    redis_conn.rpush('rq:queue:default', 'a')
+    
+    later = time.time() + LEASE_TTL + 1
+    monkeypatch.setattr(printer_leases.time, 'time', lambda: later)
+    
+    assert leases.reclaim_expired('line1') == []
+    assert leases.active('line1') == 1
+    assert leases.admit_next('line1', 1) is None
+    
+    # A worker takes it from RQ and dies before renewing the lease
+    redis_conn.lpop('rq:queue:default')
+    monkeypatch.setattr(printer_leases.time, 'time', lambda: later + LEASE_TTL + 1)
+    assert leases.reclaim_expired('line1') == ['a']
+
+
+def test_active_leaves_expired_leases_for_reclaim(redis_conn):
+    """Counting leases does not drop ones whose job still needs recovering"""
+    leases = PrinterLeases(redis_conn, ttl=-1)
+    redis_conn.rpush(pending_key('line1', 'default'), 'a')
+    redis_conn.hset('job:a', 'status', 'printing')
+    leases.admit_next('line1', 1)
+    
+    assert leases.active('line1') == 0
+    assert leases.reclaim_expired('line1') == ['a']
+
+def test_lower_tier_yields_to_waiting_job(redis_conn):
+    """A running batch yields once when a higher-tier job is waiting"""
+    leases = PrinterLeases(redis_conn)
+    assert not leases.should_yield('line1', 'low')
+    
+    redis_conn.rpush(pending_key('line1', 'high'), 'reprint')
+    
+    assert not leases.should_yield('line1', 'high')
+    assert leases.should_yield('line1', 'low')
+    assert not leases.should_yield('line1', 'default')  # one job yields per window
\ No newline at end of file
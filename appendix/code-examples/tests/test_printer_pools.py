@@ -0,0 +1,156 @@
+"""Printer Pool Tests
+
+Tests that large jobs are split into contiguous ranges across healthy pool
+printers, that shard progress rolls up into the original job, and that a
+moved shard never sends a chunk its old printer may still print.
+
+Source: operations/testing.md - Example 117
+"""
+
+import json
+
+import fakeredis
+import pytest
+
+import job_resume
+import printer_pools
+from job_events import EVENTS_KEY
+from printer_breaker import PrinterBreaker
+from printer_leases import PrinterLeases, leases_key
+from printer_pools import SHARDED_KEY, healthy_printers, is_idle, move_shard, plan_shards, shard_job
+from progress_reporter import ProgressReporter
+
+
+class FakeStatusCache:
+    def __init__(self, statuses):
+        self.statuses = statuses
+    
+    def get(self, printer_name):
+        return self.statuses.get(printer_name)
+
+
+class FakeManager:
+    def __init__(self, redis_conn):
+        self.redis_conn = redis_conn
+        self.queued = {}
+    
+    def _queue_job_writes(self, pipe, job_id, job_data, priority):
+        self.queued[job_id] = job_data
+    
+    def dispatch(self, printer_name):
+        pass
+
+
+@pytest.fixture
+def redis_conn():
+    conn = fakeredis.FakeRedis()
+    conn.hset('job:job-1', mapping={
+        'status': 'queued', 'printer': 'packing', 'quantity': 300,
+        'shards': 'job-1.1,job-1.2'
+    })
+    conn.sadd(SHARDED_KEY, 'job-1')
+    for shard_id in ('job-1.1', 'job-1.2'):
+        conn.hset(f"job:{shard_id}", mapping={'status': 'queued', 'parent': 'job-1'})
+    return conn
+
+
+def test_ranges_are_contiguous_and_chunk_aligned():
+    ranges = plan_shards(520, ['zebra1', 'zebra2', 'zebra3'], chunk_size=50)
+    
+    assert ranges == [('zebra1', 1, 200), ('zebra2', 201, 400), ('zebra3', 401, 520)]
+
+
+def test_small_job_not_split():
+    assert plan_shards(150, ['zebra1', 'zebra2', 'zebra3']) == []
+    assert len(plan_shards(250, ['zebra1', 'zebra2', 'zebra3'])) == 2
+
+
+def test_shards_carry_their_box_range():
+    job_data = {
+        'printer': 'zebra1',
+        'labels': [{'box_number': n} for n in range(1, 301)],
+        'pool': {'name': 'packing', 'printers': {'zebra1': {}, 'zebra2': {'ip_address': '10.0.0.2'}}}
+    }
+    shards = shard_job('job-1', job_data, plan_shards(300, ['zebra1', 'zebra2']))
+    
+    assert [shard_id for shard_id, _ in shards] == ['job-1.1', 'job-1.2']
+    second = shards[1][1]
+    assert second['printer'] == 'zebra2'
+    assert second['printer_config'] == {'ip_address': '10.0.0.2'}
+    assert second['labels'][0] == {'box_number': 151}
+    assert second['first_label'] == 151
+    assert 'pool' not in second
+
+
+def test_unhealthy_printers_skipped(redis_conn, monkeypatch):
+    monkeypatch.setattr(printer_pools, 'status_cache', FakeStatusCache({
+        'zebra2': {'status': 'stopped'}, 'zebra3': {'status': 'idle'}
+    }))
+    PrinterBreaker(redis_conn, threshold=1).record_failure('zebra1')
+    
+    assert healthy_printers(redis_conn, ['zebra1', 'zebra2', 'zebra3', 'zebra4']) == ['zebra3', 'zebra4']
+
+
+def test_shard_progress_rolls_up(redis_conn):
+    first = ProgressReporter(redis_conn, 'job-1.1', printer_name='zebra1', parent='job-1')
+    second = ProgressReporter(redis_conn, 'job-1.2', printer_name='zebra2', parent='job-1')
+    
+    first.set_status('printing', current_label=40)
+    # The worker records failed labels with the chunk's checkpoint
+    redis_conn.rpush('job:job-1.2:failed', 7)
+    second.set_status('printing', current_label=25)
+    
+    parent = redis_conn.hgetall('job:job-1')
+    assert parent[b'status'] == b'printing'
+    assert parent[b'current_label'] == b'65'
+    assert parent[b'failed'] == b'1'
+    
+    events = [fields for _, fields in redis_conn.xrange(EVENTS_KEY)]
+    assert events[-1][b'job_id'] == b'job-1'
+    assert events[-1][b'current_label'] == b'65'
+
+
+def test_parent_completes_with_moved_shard(redis_conn):
+    redis_conn.hset('job:job-1', 'shards', 'job-1.1,job-1.2,job-1.3')
+    redis_conn.hset('job:job-1.2', mapping={'status': 'cancelled', 'current_label': 50, 'moved_to': 'job-1.3'})
+    redis_conn.hset('job:job-1.3', mapping={'status': 'queued', 'parent': 'job-1'})
+    
+    ProgressReporter(redis_conn, 'job-1.1', parent='job-1').set_status('completed', current_label=150)
+    assert redis_conn.hget('job:job-1', 'status') == b'printing'
+    
+    ProgressReporter(redis_conn, 'job-1.3', parent='job-1').set_status('completed', current_label=100)
+    assert redis_conn.hget('job:job-1', 'status') == b'completed'
+    assert redis_conn.hget('job:job-1', 'current_label') == b'300'
+    assert not redis_conn.sismember(SHARDED_KEY, 'job-1')
+
+
+def test_idle_check_leaves_expired_leases(redis_conn):
+    """A dead worker's lease does not keep its printer busy, and stays for reclaim"""
+    redis_conn.zadd(leases_key('zebra2'), {'job-1.2': 0})
+    leases = PrinterLeases(redis_conn)
+    
+    assert is_idle(redis_conn, leases, 'zebra2')
+    assert redis_conn.zcard(leases_key('zebra2')) == 1
+    
+    leases.renew('zebra2', 'job-1.2')
+    assert not is_idle(redis_conn, leases, 'zebra2')
+
+
+@pytest.mark.parametrize('atomic', [0, 1])
+def test_moved_shard_skips_chunk_its_worker_may_print(redis_conn, monkeypatch, atomic):
+    """A chunk the old printer may still print is flagged, not moved"""
+    monkeypatch.setattr(job_resume, 'redis_conn', redis_conn)
+    monkeypatch.setattr(printer_pools, 'get_printer_config', lambda name: {})
+    redis_conn.hset('job:job-1.1', mapping={
+        'printer': 'zebra1', 'priority': 'default', 'checkpoint': 50,
+        'inflight': '51-100', 'inflight_atomic': atomic, 'runner': 'worker-1'
+    })
+    redis_conn.set('job:job-1.1:data', json.dumps({
+        'labels': [{'box_number': n} for n in range(1, 151)], 'first_label': 1
+    }))
+    manager = FakeManager(redis_conn)
+    
+    assert move_shard(manager, 'job-1', 'job-1.1', 'job-1.3', 'zebra3')
+    
+    assert manager.queued['job-1.3']['first_label'] == 101
+    assert redis_conn.lrange('job:job-1.1:uncertain', 0, -1) == [b'51-100']
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""Printer Status Cache Tests
+
+Tests that one sweep publishes every printer's status through Redis, that
+readers use it without querying CUPS, and that a failed print refreshes
+the printer's entry.
+
+Source: operations/testing.md - Example 111
+"""
+
+import fakeredis
+import pytest
+
+from cups_pool import CUPSConnectionPool
+from printer_status import PrinterStatusCache
+
+
+class FakeCUPS:
+    """Counts IPP calls; printer states can be changed between calls"""
+    
+    def __init__(self, states):
+        self.states = states
+        self.calls = 0
+    
+    def getPrinters(self):
+        self.calls += 1
+        return {name: {'printer-state': state} for name, state in self.states.items()}
+    
+    def getPrinterAttributes(self, name, **kwargs):
+        self.calls += 1
+        return {'printer-state': self.states[name]}
+    
+    def getJobs(self, **kwargs):
+        self.calls += 1
+        return {1: {'job-printer-uri': 'ipp://localhost/printers/line1'}}
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis()
+
+
+def test_sweep_shared_through_redis(redis_conn):
+    cups_conn = FakeCUPS({'line1': 3, 'line2': 5})
+    pool = CUPSConnectionPool(connect=lambda: cups_conn)
+    PrinterStatusCache(redis_conn, pool).refresh()
+    calls = cups_conn.calls
+    
+    reader = PrinterStatusCache(redis_conn, pool)
+    
+    assert reader.get('line1')['status'] == 'idle'
+    assert reader.get('line1')['jobs_in_queue'] == 1
+    assert reader.get('line2')['status'] == 'stopped'
+    assert reader.get('missing') is None
+    assert cups_conn.calls == calls
+
+
+def test_stale_cache_refreshed_by_reader(redis_conn):
+    cups_conn = FakeCUPS({'line1': 4})
+    reader = PrinterStatusCache(redis_conn, CUPSConnectionPool(connect=lambda: cups_conn))
+    
+    assert reader.get('line1')['status'] == 'printing'
+    assert cups_conn.calls == 2
+
+
+def test_failed_print_refreshes_printer(redis_conn):
+    cups_conn = FakeCUPS({'line1': 3})
+    pool = CUPSConnectionPool(connect=lambda: cups_conn)
+    cache = PrinterStatusCache(redis_conn, pool)
+    cache.refresh()
+    
+    cups_conn.states['line1'] = 5
+    assert cache.get('line1')['status'] == 'idle'
+    
+    cache.refresh_printer('line1')
+    
+    assert cache.get('line1')['status'] == 'stopped'
+    assert PrinterStatusCache(redis_conn, pool).get('line1')['status'] == 'stopped'
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""Progress Reporter Tests
+
+Tests that worker progress is buffered, flushed on budget, and always
+flushed on status changes.
+
+Source: operations/testing.md - Example 91
+"""
+
+import fakeredis
+import pytest
+
+from progress_reporter import ProgressReporter
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis()
+
+
+def test_progress_buffered_until_label_budget(redis_conn):
+    """current_label is written once per 20 labels, not per label"""
+    progress = ProgressReporter(redis_conn, 'job-1', flush_interval=60, flush_every=20)
+    
+    for idx in range(1, 20):
+        progress.update(idx)
+    assert redis_conn.hget('job:job-1', 'current_label') is None
+    
+    progress.update(20)
+    assert redis_conn.hget('job:job-1', 'current_label') == b'20'
+
+
+def test_status_change_flushes_progress(redis_conn):
+    """Completion writes buffered progress with it"""
+    progress = ProgressReporter(redis_conn, 'job-1', flush_interval=60, flush_every=20)
+    
+    progress.update(5)
+    progress.set_status('completed')
+    
+    assert redis_conn.hgetall('job:job-1') == {
+        b'current_label': b'5',
+        b'status': b'completed'
+    }
+
+
+def test_time_budget_flushes(redis_conn):
+    """A slow printer still reports progress on the time budget"""
+    progress = ProgressReporter(redis_conn, 'job-1', flush_interval=0, flush_every=20)
+    
+    progress.update(1)
+    assert redis_conn.hget('job:job-1', 'current_label') == b'1'
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""Raw TCP Transport Tests
+
+Tests for the pooled port 9100 transport against a local stand-in printer.
+
+Source: operations/testing.md - Example 88
+"""
+
+import asyncio
+import time
+import pytest
+
+from printer_transport import (
+    AsyncRawSocketTransport, PrintTransportError, RawSocketPool, RawSocketTransport
+)
+from stand_in_printer import StandInPrinter
+
+LABEL = '^XA^FO50,50^A0N,50,50^FDTest^FS^XZ'
+
+
+@pytest.fixture
+def printer():
+    printer = StandInPrinter().start()
+    yield printer
+    printer.stop()
+
+
+def test_labels_share_one_connection(printer):
+    """Consecutive sends reuse the same long-lived socket"""
+    transport = RawSocketTransport(printer.host, printer.port)
+    
+    for _ in range(20):
+        transport.send(LABEL)
+    
+    assert printer.wait_for_labels(20) == 20
+    assert printer.connections == 1
+    transport.close()
+
+
+def test_reconnects_after_printer_drops_connection(printer):
+    """A socket closed by the printer is replaced transparently"""
+    transport = RawSocketTransport(printer.host, printer.port)
+    transport.send(LABEL)
+    printer.wait_for_labels(1)
+    
+    printer.drop_connections()
+    time.sleep(0.05)
+    transport.send(LABEL)
+    
+    assert printer.wait_for_labels(2) == 2
+    assert printer.connections == 2
+    transport.close()
+
+
+def test_async_reconnects_after_printer_drops_connection(printer):
+    """The asyncio transport also replaces a socket closed by the printer"""
+    async def main():
+        transport = AsyncRawSocketTransport(printer.host, printer.port)
+        await transport.send(LABEL)
+        printer.wait_for_labels(1)
+        
+        printer.drop_connections()
+        await asyncio.sleep(0.05)
+        await transport.send(LABEL)
+        transport.close()
+        return transport.connects
+    
+    assert asyncio.run(main()) == 2
+    assert printer.wait_for_labels(2) == 2
+    assert printer.connections == 2
+
+
+def test_unreachable_printer_raises():
+    """Delivery errors surface as PrintTransportError for the retry loop"""
+    printer = StandInPrinter()
+    host, port = printer.host, printer.port
+    printer.server.server_close()  # Nothing listening on the port
+    
+    transport = RawSocketTransport(host, port, timeout=1)
+    with pytest.raises(PrintTransportError):
+        transport.send(LABEL)
+
+
+def test_pool_returns_one_transport_per_printer(printer):
+    """The pool hands out the same transport until the address changes"""
+    pool = RawSocketPool()
+    first = pool.get('zebra_z230_line1', printer.host, printer.port)
+    
+    assert pool.get('zebra_z230_line1', printer.host, printer.port) is first
+    assert pool.get('zebra_z230_line2', printer.host, printer.port) is not first
+    assert pool.get('zebra_z230_line1', printer.host, printer.port + 1) is not first
+    pool.close_all()
\ No newline at end of file
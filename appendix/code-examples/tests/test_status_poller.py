@@ -0,0 +1,40 @@
+"""Unit Tests for Print Job Status Polling
+
+Tests that print server statuses map onto label.print.job, including jobs
+cancelled on the server, which then drop out of polling.
+
+Source: operations/testing.md - Example 129
+"""
+
+from unittest.mock import patch
+
+from odoo.tests.common import TransactionCase
+
+
+class TestStatusPoller(TransactionCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.job = self.env['label.print.job'].create({
+            'mo_id': self.env.ref('mrp.test_mo').id,
+            'quantity': 10,
+            'flask_job_id': 'job-1',
+            'status': 'printing'
+        })
+        self.poller = self.env['print.job.status.poller']
+    
+    def test_cancelled_on_server(self):
+        """A job cancelled on the print server is cancelled in Odoo"""
+        self.poller._apply_status_updates({'job-1': {'status': 'cancelled', 'current_label': 4}})
+        
+        self.assertEqual(self.job.status, 'cancelled')
+        self.assertEqual(self.job.current_label, 4)
+    
+    def test_cancelled_job_not_polled(self):
+        """Cancelled jobs are not fetched from the print server again"""
+        self.job.status = 'cancelled'
+        
+        with patch('requests.get') as get:
+            self.poller.poll_jobs_status(self.job)
+        
+        get.assert_not_called()
\ No newline at end of file
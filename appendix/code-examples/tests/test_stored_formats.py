@@ -0,0 +1,169 @@
+"""Stored Format Tests
+
+Tests that compact template-plus-variables jobs expand to ^XF recall blocks
+with the right field data, that full-ZPL jobs pass through unchanged, and
+that a format or graphic re-sent after a failed chunk is retried like the
+chunk.
+
+Source: operations/testing.md - Example 98
+"""
+
+import fakeredis
+import pytest
+
+import job_resume
+import print_worker
+import printer_registry
+import queue_manager
+from graphic_cache import GraphicCache
+from print_worker import iter_label_chunks
+from printer_breaker import PrinterBreaker
+from printer_leases import PrinterLeases
+from printer_transport import PrintTransportError
+from stored_formats import expand_labels, render_recall
+
+
+TEMPLATE = {
+    'id': 12,
+    'version': 3,
+    'format': 'R:T12V3.ZPL',
+    'zpl': '^XA^DFR:T12V3.ZPL^FS^FO50,50^A0N,40,40^FN1^FS^FO50,100^A0N,30,30^FN2^FS^XZ',
+    'fields': {'1': '{PRODUCT_NAME}', '2': 'Lot: {LOT_NUMBER}'},
+    'variables': {'PRODUCT_NAME': 'Wild Caught Salmon'},
+}
+
+
+class FlakyTransport:
+    """Fails the sends whose number (from 1) is listed, recording titles"""
+    
+    ATOMIC_JOBS = True
+    HIGH_WATERMARK = 1000
+    LOW_WATERMARK = 0
+    
+    def __init__(self, failing):
+        self.failing = set(failing)
+        self.sent = []
+    
+    def send(self, zpl_code, title="Label"):
+        self.sent.append(title)
+        if len(self.sent) in self.failing:
+            raise PrintTransportError('connection reset')
+    
+    def backlog(self):
+        return 0
+
+
+class FakeStatusCache:
+    def refresh_printer(self, printer_name):
+        return {'status': 'idle'}
+
+
+@pytest.fixture
+def redis_conn(monkeypatch):
+    server = fakeredis.FakeServer()
+    conn = fakeredis.FakeRedis(server=server)
+    monkeypatch.setattr(print_worker, 'redis_conn', conn)
+    monkeypatch.setattr(print_worker, 'leases', PrinterLeases(conn))
+    monkeypatch.setattr(print_worker, 'graphics', GraphicCache(conn))
+    monkeypatch.setattr(print_worker, 'breaker', PrinterBreaker(conn))
+    monkeypatch.setattr(print_worker, 'status_cache', FakeStatusCache())
+    monkeypatch.setattr(print_worker.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(queue_manager.redis, 'Redis', lambda **kwargs: fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(printer_registry, 'redis_conn', conn)
+    monkeypatch.setattr(job_resume, 'redis_conn', conn)
+    monkeypatch.setattr(job_resume, 'park_script', conn.register_script(job_resume.PARK_SCRIPT))
+    return conn
+
+
+def run_compact_job(redis_conn, monkeypatch, transport, template=TEMPLATE):
+    monkeypatch.setattr(print_worker, 'get_transport', lambda printer_name: transport)
+    redis_conn.hset('job:job-1', mapping={'status': 'queued', 'printer': 'line1', 'priority': 'default'})
+    print_worker.process_batch_print('job-1', {
+        'printer': 'line1', 'template': template, 'chunk_size': 2,
+        'labels': [{'variables': {'LOT_NUMBER': f'L{i}'}} for i in range(1, 7)],
+    })
+
+
+def test_render_recall_fills_fields():
+    zpl = render_recall(TEMPLATE, {'LOT_NUMBER': 'LOT-2025-000001'})
+    
+    assert zpl == (
+        '^XA^XFR:T12V3.ZPL^FS'
+        '^FN1^FDWild Caught Salmon^FS'
+        '^FN2^FDLot: LOT-2025-000001^FS'
+        '^XZ'
+    )
+
+
+def test_label_variables_override_shared():
+    zpl = render_recall(TEMPLATE, {'PRODUCT_NAME': 'Sockeye', 'LOT_NUMBER': 'L1'})
+    
+    assert '^FN1^FDSockeye^FS' in zpl
+
+
+def test_prefix_characters_are_hex_escaped():
+    zpl = render_recall(TEMPLATE, {'LOT_NUMBER': 'A^B~C_D'})
+    
+    assert '^FN2^FH^FDLot: A_5EB_7EC_5FD^FS' in zpl
+
+
+def test_compact_job_chunks_use_recall_blocks():
+    job_data = {
+        'template': TEMPLATE,
+        'labels': [{'variables': {'LOT_NUMBER': f'L{i}'}, 'box_number': i} for i in range(1, 4)],
+    }
+    
+    chunks = list(iter_label_chunks(expand_labels(job_data), chunk_size=2))
+    
+    assert [(c['first'], c['last']) for c in chunks] == [(1, 2), (3, 3)]
+    assert chunks[0]['zpl'].count('^XFR:T12V3.ZPL^FS') == 2
+    assert '^DF' not in chunks[0]['zpl']
+
+
+def test_full_zpl_job_passes_through():
+    labels = [{'zpl_code': '^XA^FDone^FS^XZ'}]
+    
+    assert list(expand_labels({'labels': labels})) == labels
+
+
+def test_format_resent_after_failed_chunk_is_retried(redis_conn, monkeypatch):
+    """A transient error storing the format again does not fail the job"""
+    # The first chunk fails all 3 attempts, then the format's first re-send
+    transport = FlakyTransport(failing=[2, 3, 4, 5])
+    
+    run_compact_job(redis_conn, monkeypatch, transport)
+    
+    assert transport.sent == [
+        'Format R:T12V3.ZPL', 'Job job-1 labels 1-2', 'Job job-1 labels 1-2', 'Job job-1 labels 1-2',
+        'Format R:T12V3.ZPL', 'Format R:T12V3.ZPL', 'Job job-1 labels 3-4', 'Job job-1 labels 5-6',
+    ]
+    assert redis_conn.hget('job:job-1', 'status') == b'completed'
+    assert redis_conn.hget('job:job-1', 'checkpoint') == b'6'
+    assert redis_conn.lrange('job:job-1:failed', 0, -1) == [b'1', b'2']
+
+
+def test_printer_down_while_storing_format_parks_job(redis_conn, monkeypatch):
+    """Format sends count towards the breaker, which parks the job"""
+    transport = FlakyTransport(failing=range(2, 20))
+    
+    run_compact_job(redis_conn, monkeypatch, transport)
+    
+    assert 'Job job-1 labels 3-4' not in transport.sent
+    assert redis_conn.hget('job:job-1', 'status') == b'parked'
+    assert redis_conn.hget('job:job-1', 'checkpoint') == b'2'
+
+
+def test_graphic_resent_after_failed_chunk_is_retried(redis_conn, monkeypatch):
+    """A transient error downloading a logo again does not fail the job"""
+    logo = '^FO50,20^GFA,16,16,2,FFFF0000FFFF0000FFFF0000FFFF0000^FS'
+    template = dict(TEMPLATE, zpl=TEMPLATE['zpl'].replace('^XZ', f'{logo}^XZ'))
+    # The first chunk fails all 3 attempts, then the logo's first re-download
+    transport = FlakyTransport(failing=[3, 4, 5, 6])
+    
+    run_compact_job(redis_conn, monkeypatch, transport, template)
+    
+    graphic = transport.sent[0]
+    assert graphic.startswith('Graphic R:')
+    assert transport.sent[5:8] == [graphic, graphic, 'Format R:T12V3.ZPL']
+    assert redis_conn.hget('job:job-1', 'status') == b'completed'
+    assert redis_conn.lrange('job:job-1:failed', 0, -1) == [b'1', b'2']
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""Zebra Emulator Tests
+
+Tests that the emulator splits formats across reads, prints at its
+configured speed, holds labels and reports the condition over ~HS while
+out of paper, and backs up the sender when its buffer is full.
+
+Source: operations/testing.md - Example 124
+"""
+
+import socket
+import threading
+import time
+
+import pytest
+
+from printer_transport import RawSocketTransport
+from zebra_emulator import ZPLParser, ZebraEmulator, parse_host_status
+
+LABEL = '^XA^FO50,50^A0N,50,50^FDBox {n}^FS^XZ'
+
+
+@pytest.fixture
+def emulator():
+    emulator = ZebraEmulator(speed=200).start()
+    yield emulator
+    emulator.stop()
+
+
+def query_status(emulator):
+    with socket.create_connection((emulator.host, emulator.port), 2) as sock:
+        sock.sendall(b'~HS')
+        response = b''
+        while response.count(b'\x03') < 3:
+            response += sock.recv(1024)
+    return parse_host_status(response)
+
+
+def test_parser_splits_formats_across_reads():
+    parser = ZPLParser()
+    
+    assert parser.feed(b'^XA^FDone^FS^X') == []
+    assert parser.feed(b'Z~H') == [('label', b'^XA^FDone^FS^XZ')]
+    assert parser.feed(b'S^XA^FDtwo^FS^XZ') == [('command', 'HS'), ('label', b'^XA^FDtwo^FS^XZ')]
+
+
+def test_prints_at_configured_speed(emulator):
+    transport = RawSocketTransport(emulator.host, emulator.port)
+    started = time.monotonic()
+    
+    transport.send('\n'.join(LABEL.format(n=n) for n in range(20)))
+    
+    assert emulator.wait_printed(20)
+    assert time.monotonic() - started >= 20 / 200
+    transport.close()
+
+
+def test_paper_out_holds_labels_and_reports_status(emulator):
+    emulator.set_condition(paper_out=True)
+    transport = RawSocketTransport(emulator.host, emulator.port)
+    transport.send('\n'.join(LABEL.format(n=n) for n in range(3)))
+    
+    deadline = time.monotonic() + 2
+    while query_status(emulator)['formats'] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    status = query_status(emulator)
+    assert status['paper_out'] and status['paused']
+    assert status['formats'] == 3
+    assert emulator.printed == 0
+    
+    emulator.set_condition(paper_out=False)
+    assert emulator.wait_printed(3)
+    assert query_status(emulator)['formats'] == 0
+    transport.close()
+
+
+def test_full_buffer_backs_up_sender():
+    emulator = ZebraEmulator(speed=200, buffer_size=1024).start()
+    emulator.set_condition(head_open=True)
+    transport = RawSocketTransport(emulator.host, emulator.port, timeout=None)
+    batch = '\n'.join(LABEL.format(n=n) for n in range(50000))
+    
+    threading.Thread(target=transport.send, args=(batch,), daemon=True).start()
+    
+    deadline = time.monotonic() + 2
+    while transport.backlog() == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert transport.backlog() > 0
+    assert query_status(emulator)['buffer_full']
+    
+    transport.close()
+    emulator.stop()
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""Zebra Printer Emulator
+
+Local Zebra label printer with realistic timing, for capacity planning and
+for load testing the worker, flow control and retry logic without tying up
+production printers. It takes raw ZPL on TCP (port 9100 on a real printer)
+and, through the zebraemu CUPS backend (cups/zebraemu_backend.py), from a
+CUPS queue.
+
+- Labels are split on ``^XA`` ... ``^XZ`` and printed one at a time at
+  ``speed`` labels per second (0 prints instantly)
+- Unprinted labels are held in a ``buffer_size`` byte receive buffer. When
+  it is full the emulator stops reading, so the sender's socket backs up
+  the way it does against a real printer
+- Paper out, head open and pause stop printing; labels keep arriving until
+  the buffer is full
+- ``~HS`` is answered with the three host status strings, ``~JA`` cancels
+  every buffered label
+    
+    python zebra_emulator.py --port 9100 --speed 4 --buffer 32768
+
+While it runs, type ``paper out``, ``paper in``, ``head open``,
+``head close``, ``pause``, ``resume`` or ``status`` on stdin.
+
+Source: operations/testing.md - Example 122
+"""
+
+import argparse
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+
+DEFAULT_SPEED = 4  # labels/sec, a Z230 at 6 ips on 1.5" labels
+DEFAULT_BUFFER = 32 * 1024  # bytes
+SOCKET_BUFFER = 4096  # kernel receive buffer, small so backpressure shows quickly
+
+STX, ETX = b'\x02', b'\x03'
+
+
+class ZPLParser:
+    """Incremental splitter for ``^XA...^XZ`` formats and ``~`` commands"""
+    
+    def __init__(self):
+        self._data = bytearray()
+    
+    def feed(self, data):
+        """Return ('label', zpl) and ('command', name) items completed by data"""
+        self._data.extend(data)
+        items = []
+        
+        while True:
+            start = self._data.find(b'^XA')
+            tilde = self._data.find(b'~')
+            
+            # Control commands between formats run straight away
+            if tilde != -1 and (start == -1 or tilde < start):
+                if len(self._data) < tilde + 3:
+                    del self._data[:tilde]
+                    break
+                items.append(('command', self._data[tilde + 1:tilde + 3].decode().upper()))
+                del self._data[:tilde + 3]
+                continue
+            
+            if start == -1:
+                # Keep a "^X" that may be the start of the next format
+                del self._data[:max(len(self._data) - 2, 0)]
+                break
+            
+            end = self._data.find(b'^XZ', start)
+            if end == -1:
+                del self._data[:start]
+                break
+            items.append(('label', bytes(self._data[start:end + 3])))
+            del self._data[:end + 3]
+        
+        return items
+
+
+def parse_host_status(response):
+    """Flags from a ~HS response"""
+    first, second = [
+        line.strip(STX + ETX).split(b',') for line in response.split(b'\r\n')[:2]
+    ]
+    return {
+        'paper_out': first[1] == b'1',
+        'paused': first[2] == b'1',
+        'formats': int(first[4]),
+        'buffer_full': first[5] == b'1',
+        'head_open': second[2] == b'1',
+        'labels_remaining': int(second[8])
+    }
+
+
+class ZebraEmulator:
+    """Raw TCP printer with a print speed, receive buffer and fault conditions"""
+    
+    def __init__(self, host='127.0.0.1', port=0, speed=DEFAULT_SPEED, buffer_size=DEFAULT_BUFFER):
+        self.speed = speed
+        self.buffer_size = buffer_size
+        self.paper_out = False
+        self.head_open = False
+        self.paused = False
+        self.printed = 0
+        self.arrivals = []  # time each label finished printing
+        self.status_queries = 0
+        
+        self._queue = deque()
+        self._buffered = 0
+        self._held = 0  # connections waiting for buffer space
+        self._stopped = False
+        self._cond = threading.Condition()
+        
+        emulator = self
+        
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                parser = ZPLParser()
+                while True:
+                    try:
+                        data = self.request.recv(4096)
+                    except OSError:
+                        break
+                    if not data:
+                        break
+                    for kind, value in parser.feed(data):
+                        emulator._handle(kind, value, self.request)
+        
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler, bind_and_activate=False)
+        self.server.allow_reuse_address = True
+        self.server.daemon_threads = True
+        # Accepted sockets inherit the small receive window
+        self.server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+        self.server.server_bind()
+        self.server.server_activate()
+        self.host, self.port = self.server.server_address
+    
+    @property
+    def ready(self):
+        return not (self.paper_out or self.head_open or self.paused)
+    
+    def set_condition(self, **conditions):
+        """Change paper_out, head_open or paused, e.g. set_condition(paper_out=True)"""
+        with self._cond:
+            for name, value in conditions.items():
+                if name not in ('paper_out', 'head_open', 'paused'):
+                    raise ValueError(f"Unknown condition {name}")
+                setattr(self, name, value)
+            self._cond.notify_all()
+    
+    def host_status(self):
+        """The three ~HS strings"""
+        with self._cond:
+            formats = len(self._queue)
+            full = int(bool(self._held) or self._buffered >= self.buffer_size)
+            paused = int(not self.ready)
+            paper_out, head_open = int(self.paper_out), int(self.head_open)
+        
+        lines = (
+            f"030,{paper_out},{paused},1218,{formats:03d},{full},0,0,000,0,0,0",
+            f"000,0,{head_open},0,0,2,4,0,{formats:08d},1,000",
+            "1234,0"
+        )
+        return b''.join(STX + line.encode() + ETX + b'\r\n' for line in lines)
+    
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._print_loop, daemon=True).start()
+        return self
+    
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def wait_printed(self, count, timeout=10):
+        """Block until count labels have printed; False on timeout"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.printed < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+    
+    def _handle(self, kind, value, sock):
+        if kind == 'command':
+            if value == 'HS':
+                with self._cond:
+                    self.status_queries += 1
+                sock.sendall(self.host_status())
+            elif value == 'JA':
+                with self._cond:
+                    self._queue.clear()
+                    self._buffered = 0
+                    self._cond.notify_all()
+            return
+        
+        with self._cond:
+            # A full buffer stops reading this connection until labels print
+            self._held += 1
+            while self._queue and self._buffered + len(value) > self.buffer_size and not self._stopped:
+                self._cond.wait()
+            self._held -= 1
+            self._queue.append(value)
+            self._buffered += len(value)
+            self._cond.notify_all()
+    
+    def _print_loop(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not (self._queue and self.ready):
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                label = self._queue[0]
+            
+            if self.speed:
+                time.sleep(1 / self.speed)
+            
+            with self._cond:
+                # ~JA may have cancelled it while printing
+                if self._queue and self._queue[0] is label:
+                    self._queue.popleft()
+                    self._buffered -= len(label)
+                    self.printed += 1
+                    self.arrivals.append(time.time())
+                    self._cond.notify_all()
+
+
+COMMANDS = {
+    'paper out': {'paper_out': True},
+    'paper in': {'paper_out': False},
+    'head open': {'head_open': True},
+    'head close': {'head_open': False},
+    'pause': {'paused': True},
+    'resume': {'paused': False},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--speed', type=float, default=DEFAULT_SPEED, help='labels/sec (0 = instant)')
+    parser.add_argument('--buffer', type=int, default=DEFAULT_BUFFER, help='receive buffer in bytes')
+    args = parser.parse_args()
+    
+    emulator = ZebraEmulator(args.host, args.port, args.speed, args.buffer).start()
+    print(f"Zebra emulator on {emulator.host}:{emulator.port}, {args.speed} labels/sec")
+    
+    for line in sys.stdin:
+        command = line.strip().lower()
+        if command in COMMANDS:
+            emulator.set_condition(**COMMANDS[command])
+        elif command != 'status':
+            print(f"Commands: {', '.join(COMMANDS)}, status")
+            continue
+        print(f"printed {emulator.printed}, {parse_host_status(emulator.host_status())}")
+    
+    emulator.stop()
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file